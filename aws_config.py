@@ -1,7 +1,10 @@
 # aws_config.py
-import boto3
+import threading
+
 from botocore.config import Config
 
+from aws_lib import backend
+
 # -----------------------------
 # AWS region & boto3 config
 # -----------------------------
@@ -15,17 +18,18 @@ boto3_config = Config(
 # -----------------------------
 # AWS clients/resources
 # -----------------------------
+# (built through aws_lib.backend, so AWS_BACKEND=memory / sqlite:<path> applies)
 def dynamodb_resource():
-    return boto3.resource("dynamodb", region_name=AWS_REGION, config=boto3_config)
+    return backend.resource("dynamodb", region_name=AWS_REGION, config=boto3_config)
 
 def dynamodb_client():
-    return boto3.client("dynamodb", region_name=AWS_REGION, config=boto3_config)
+    return backend.client("dynamodb", region_name=AWS_REGION, config=boto3_config)
 
 def sqs_client():
-    return boto3.client("sqs", region_name=AWS_REGION, config=boto3_config)
+    return backend.client("sqs", region_name=AWS_REGION, config=boto3_config)
 
 def sns_client():
-    return boto3.client("sns", region_name=AWS_REGION, config=boto3_config)
+    return backend.client("sns", region_name=AWS_REGION, config=boto3_config)
 
 # -----------------------------
 # SQS & SNS configuration
@@ -33,7 +37,34 @@ def sns_client():
 DEFAULT_QUEUE_NAME = "cloudkitchen-orders-queue"
 DEFAULT_SNS_TOPIC_NAME = "cloudkitchen-order-notifications"
 
-def get_sqs_url():
+# Resolved queue URLs / topic ARNs, cached for the life of the process
+_resolved = {}
+_resolved_lock = threading.Lock()
+
+# Error codes meaning a cached queue/topic no longer exists
+NOT_FOUND_CODES = {
+    "AWS.SimpleQueueService.NonExistentQueue",
+    "QueueDoesNotExist",
+    "NotFound",
+    "NotFoundException",
+}
+
+def _memoized(key, resolve):
+    with _resolved_lock:
+        if key not in _resolved:
+            _resolved[key] = resolve()
+        return _resolved[key]
+
+def forget_resolved():
+    """Drop cached queue URLs/topic ARNs so the next lookup resolves again."""
+    with _resolved_lock:
+        _resolved.clear()
+
+def is_not_found(error):
+    """True if a botocore ClientError means the queue/topic is gone."""
+    return error.response.get("Error", {}).get("Code") in NOT_FOUND_CODES
+
+def _resolve_sqs_url():
     sqs = sqs_client()
     try:
         resp = sqs.get_queue_url(QueueName=DEFAULT_QUEUE_NAME)
@@ -49,13 +80,14 @@ def get_sqs_url():
         )
         return resp["QueueUrl"]
 
-def get_sns_topic_arn():
-    sns = sns_client()
-    # Check if topic exists
-    topics = sns.list_topics()["Topics"]
-    for t in topics:
-        if t["TopicArn"].endswith(DEFAULT_SNS_TOPIC_NAME):
-            return t["TopicArn"]
-    # Topic does not exist → create it
-    resp = sns.create_topic(Name=DEFAULT_SNS_TOPIC_NAME)
+def _resolve_sns_topic_arn():
+    # create_topic is idempotent: it returns the existing topic's ARN,
+    # so no list_topics paging is needed
+    resp = sns_client().create_topic(Name=DEFAULT_SNS_TOPIC_NAME)
     return resp["TopicArn"]
+
+def get_sqs_url():
+    return _memoized(("sqs", DEFAULT_QUEUE_NAME), _resolve_sqs_url)
+
+def get_sns_topic_arn():
+    return _memoized(("sns", DEFAULT_SNS_TOPIC_NAME), _resolve_sns_topic_arn)
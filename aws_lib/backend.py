@@ -0,0 +1,82 @@
+"""
+Where AWS calls go.
+
+    AWS_BACKEND=aws                      real AWS (default)
+    AWS_BACKEND=memory                   in-process stand-ins (aws_lib.memory_backend)
+    AWS_BACKEND=sqlite:/tmp/kitchen.db   the same, persisted to SQLite and shared
+                                         between processes (web app + order worker)
+
+Set it in the environment, or as settings.AWS_BACKEND for the Django app.
+Every boto3 client/resource in the project is built through `client()` /
+`resource()` here, which also registers the tracing hooks, so the choice
+applies to the aws_lib wrappers, aws_config and lambda_function alike. It
+must be made before the first client is created.
+"""
+import os
+import threading
+
+import boto3
+
+from . import tracing
+
+BACKEND_ENV = "AWS_BACKEND"
+
+_lock = threading.Lock()
+_configured = False
+_backend = None
+
+
+def configure(spec=None):
+    """Select the backend from `spec` (or $AWS_BACKEND). Returns the MemoryBackend, or None for AWS."""
+    global _configured, _backend
+    spec = spec or os.getenv(BACKEND_ENV) or "aws"
+    with _lock:
+        if spec == "aws":
+            _backend = None
+        else:
+            from .memory_backend import MemoryBackend
+            from .memory_store import MemoryStore, SQLiteStore
+
+            if spec == "memory":
+                store = MemoryStore()
+            elif spec.startswith("sqlite:"):
+                store = SQLiteStore(spec[len("sqlite:"):])
+            else:
+                raise ValueError(f"Unknown {BACKEND_ENV} {spec!r}: use aws, memory or sqlite:<path>")
+            _backend = MemoryBackend(store)
+
+            # botocore still wants a region and credentials (for presigning)
+            os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+            os.environ.setdefault("AWS_ACCESS_KEY_ID", "local")
+            os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "local")
+        _configured = True
+        return _backend
+
+
+def active():
+    """The MemoryBackend in use, or None when calls go to AWS."""
+    if not _configured:
+        configure()
+    return _backend
+
+
+def _prepare(low_level, backend):
+    tracing.instrument(low_level)
+    if backend is not None:
+        backend.attach(low_level)
+
+
+def client(service_name, session=None, **kwargs):
+    """boto3 client wired to the selected backend."""
+    backend = active()  # first, so the local credentials are in place
+    obj = (session or boto3).client(service_name, **kwargs)
+    _prepare(obj, backend)
+    return obj
+
+
+def resource(service_name, session=None, **kwargs):
+    """boto3 resource wired to the selected backend."""
+    backend = active()
+    obj = (session or boto3).resource(service_name, **kwargs)
+    _prepare(obj.meta.client, backend)
+    return obj
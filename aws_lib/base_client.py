@@ -1,23 +1,111 @@
+import threading
+from datetime import datetime, timedelta, timezone
+
 import boto3
 
+from . import backend
+
+# Error codes that mean the cached credentials are no longer usable
+AUTH_ERROR_CODES = {
+    "ExpiredToken",
+    "ExpiredTokenException",
+    "InvalidClientTokenId",
+    "UnrecognizedClientException",
+    "RequestExpired",
+}
+
+# Rebuild a pooled client when its credentials expire within this window
+CREDENTIAL_REFRESH_MARGIN = timedelta(minutes=5)
+
+
+class _PoolEntry:
+    """A cached boto3 client/resource plus the credentials it was built with."""
+
+    def __init__(self, obj, credentials):
+        self.obj = obj
+        self.credentials = credentials
+        self.stale = False
+
+    def expiring(self):
+        expiry = getattr(self.credentials, "_expiry_time", None)
+        if expiry is None:
+            return False
+        return expiry - datetime.now(timezone.utc) < CREDENTIAL_REFRESH_MARGIN
+
+
 class AWSBaseClient:
     """
-    Base AWS client that creates a NEW boto3 session every time
-    to avoid expired Cloud9 temporary credentials.
+    Base AWS client with a per-thread pool of boto3 clients/resources.
+
+    Cloud9 hands out short-lived credentials, so a pooled client is rebuilt
+    (with a new session) when its credentials are about to expire or after
+    AWS rejects a call with an auth error. Otherwise it is reused, keeping
+    the HTTP connection and endpoint resolution warm between calls.
     """
 
+    _local = threading.local()
+    _stats_lock = threading.Lock()
+    _stats = {"hits": 0, "misses": 0, "refreshes": 0}
+
     def __init__(self, service_name, region_name="us-east-1"):
         self.service_name = service_name
         self.region_name = region_name
 
     @property
     def client(self):
-        # ALWAYS returns a fresh client with fresh credentials
-        session = boto3.Session()
-        return session.client(self.service_name, region_name=self.region_name)
+        return self._pooled("client")
 
     @property
     def resource(self):
-        # ALWAYS returns a fresh resource with fresh credentials
+        return self._pooled("resource")
+
+    # pool internals
+    def _pooled(self, kind):
+        pool = getattr(self._local, "pool", None)
+        if pool is None:
+            pool = self._local.pool = {}
+
+        key = (self.service_name, self.region_name, kind)
+        entry = pool.get(key)
+        if entry and not entry.stale and not entry.expiring():
+            self._count("hits")
+            return entry.obj
+
+        self._count("refreshes" if entry else "misses")
+        entry = pool[key] = self._build(kind)
+        return entry.obj
+
+    def _build(self, kind):
         session = boto3.Session()
-        return session.resource(self.service_name, region_name=self.region_name)
+        factory = backend.client if kind == "client" else backend.resource
+        obj = factory(self.service_name, session=session, region_name=self.region_name)
+        entry = _PoolEntry(obj, session.get_credentials())
+
+        low_level = obj if kind == "client" else obj.meta.client
+        low_level.meta.events.register(
+            "after-call", lambda parsed=None, **kwargs: self._check_auth(entry, parsed)
+        )
+        return entry
+
+    @staticmethod
+    def _check_auth(entry, parsed):
+        code = (parsed or {}).get("Error", {}).get("Code")
+        if code in AUTH_ERROR_CODES:
+            entry.stale = True
+
+    @classmethod
+    def _count(cls, name):
+        with cls._stats_lock:
+            cls._stats[name] += 1
+
+    def invalidate(self):
+        """Drop this thread's cached client/resource for the service."""
+        pool = getattr(self._local, "pool", {})
+        for kind in ("client", "resource"):
+            pool.pop((self.service_name, self.region_name, kind), None)
+
+    @classmethod
+    def pool_stats(cls):
+        """Process-wide pool hit/miss/refresh counters."""
+        with cls._stats_lock:
+            return dict(cls._stats)
@@ -1,5 +1,14 @@
 from .base_client import AWSBaseClient
+from .tracing import propagate
+from boto3.dynamodb.conditions import ConditionExpressionBuilder
+from concurrent.futures import ThreadPoolExecutor
 from decimal import Decimal
+import random
+import time
+
+# BatchGetItem / BatchWriteItem per-call limits
+BATCH_GET_LIMIT = 100
+BATCH_WRITE_LIMIT = 25
 
 class DynamoDBClient(AWSBaseClient):
     def __init__(self):
@@ -28,26 +37,325 @@ class DynamoDBClient(AWSBaseClient):
         item = resp.get("Item")
         return self._deserialize(item) if item else {}
 
-    def scan(self, table):
-        tbl = self.resource.Table(table)
-        resp = tbl.scan()
-        items = resp.get("Items", [])
-        return [self._deserialize(i) for i in items]
+    def scan(self, table, **scan_kwargs):
+        return list(self.iter_scan(table, **scan_kwargs))
+
+    def iter_scan(self, table, **scan_kwargs):
+        """
+        Lazily yield every item in the table, page by page.
+        Follows LastEvaluatedKey so results are not cut off at the 1 MB page limit.
+        """
+        yield from self._iter_scan(self._call_client(), table, scan_kwargs)
+
+    def _iter_scan(self, client, table, scan_kwargs):
+        while True:
+            resp = self._scan_call(client, table, **scan_kwargs)
+            yield from resp.get("Items", [])
+
+            last_key = resp.get("LastEvaluatedKey")
+            if not last_key:
+                return
+            scan_kwargs["ExclusiveStartKey"] = last_key
+
+    def scan_page(self, table, limit=None, start_key=None, **scan_kwargs):
+        """One page of a Scan. Returns (items, last_evaluated_key or None)."""
+        if limit:
+            scan_kwargs["Limit"] = limit
+        if start_key:
+            scan_kwargs["ExclusiveStartKey"] = start_key
+        resp = self._scan_call(self._call_client(), table, **scan_kwargs)
+        return resp.get("Items", []), resp.get("LastEvaluatedKey")
+
+    def query_page(self, table, key_condition, index_name=None, limit=None,
+                   start_key=None, scan_forward=True, **query_kwargs):
+        """
+        One page of a Query (keyset pagination).
+        Returns (items, last_evaluated_key or None); pass the key back as
+        `start_key` to read the next page.
+        """
+        query_kwargs["KeyConditionExpression"] = key_condition
+        query_kwargs["ScanIndexForward"] = scan_forward
+        if index_name:
+            query_kwargs["IndexName"] = index_name
+        if limit:
+            query_kwargs["Limit"] = limit
+        if start_key:
+            query_kwargs["ExclusiveStartKey"] = start_key
+        resp = self._query_call(self._call_client(), table, **query_kwargs)
+        return resp.get("Items", []), resp.get("LastEvaluatedKey")
+
+    def count(self, table):
+        """Number of items in the table (paginated Select=COUNT scan)."""
+        scan_kwargs = {"Select": "COUNT"}
+        client = self._call_client()
+        total = 0
+        while True:
+            resp = self._scan_call(client, table, **scan_kwargs)
+            total += resp.get("Count", 0)
+            if "LastEvaluatedKey" not in resp:
+                return total
+            scan_kwargs["ExclusiveStartKey"] = resp["LastEvaluatedKey"]
+
+    def _call_client(self):
+        """
+        The low-level client that _scan_call/_query_call send through: the
+        resource's, which takes and returns Python types and accepts
+        condition objects like Table.scan/query do.
+        """
+        return self.resource.meta.client
+
+    def _scan_call(self, client, table, **scan_kwargs):
+        """One Scan request; the response's Items come back as plain Python types."""
+        resp = client.scan(TableName=table, **scan_kwargs)
+        resp["Items"] = [self._deserialize(i) for i in resp.get("Items", [])]
+        return resp
+
+    def _query_call(self, client, table, **query_kwargs):
+        """One Query request; the response's Items come back as plain Python types."""
+        resp = client.query(TableName=table, **query_kwargs)
+        resp["Items"] = [self._deserialize(i) for i in resp.get("Items", [])]
+        return resp
+
+    def parallel_scan(self, table, total_segments=4, max_workers=None, **scan_kwargs):
+        """
+        Scan the table as `total_segments` Segment/TotalSegments slices
+        read concurrently on a thread pool. Returns one combined list.
+        """
+        client = self._call_client()  # this thread's pooled client, shared by the workers
+
+        def scan_segment(segment):
+            return list(self._iter_scan(
+                client,
+                table,
+                {**scan_kwargs, "Segment": segment, "TotalSegments": total_segments},
+            ))
+
+        segments = self._map(scan_segment, list(range(total_segments)), max_workers or total_segments)
+        return [item for segment in segments for item in segment]
+
+# batch operations
+
+    def batch_get(self, table, keys, max_workers=4, max_attempts=8, consistent_read=False):
+        """
+        Fetch many items by key. Keys are sent in chunks of 100, on a thread
+        pool when there is more than one; UnprocessedKeys are retried with
+        jittered exponential backoff. `consistent_read` asks for strongly
+        consistent reads.
+        """
+        keys = [self._convert_to_decimal(k) for k in keys]
+        chunks = [keys[i:i + BATCH_GET_LIMIT] for i in range(0, len(keys), BATCH_GET_LIMIT)]
+        client = self.resource.meta.client  # this thread's pooled client, shared by the workers
+
+        def get_chunk(chunk):
+            items = []
+            request = {table: {"Keys": chunk, "ConsistentRead": consistent_read}}
+            for attempt in range(max_attempts):
+                resp = client.batch_get_item(RequestItems=request)
+                items += resp.get("Responses", {}).get(table, [])
+                request = resp.get("UnprocessedKeys")
+                if not request:
+                    return items
+                self._backoff(attempt)
+            raise RuntimeError(f"{len(request[table]['Keys'])} keys still unprocessed in {table}")
+
+        results = self._map(get_chunk, chunks, max_workers)
+        return [self._deserialize(item) for chunk in results for item in chunk]
+
+    def batch_write(self, table, puts=(), deletes=(), max_workers=4, max_attempts=8):
+        """
+        Put and/or delete many items. Requests are sent in chunks of 25, on a
+        thread pool when there is more than one; UnprocessedItems are retried
+        with jittered exponential backoff.
+        """
+        requests = [{"PutRequest": {"Item": self._convert_to_decimal(i)}} for i in puts]
+        requests += [{"DeleteRequest": {"Key": self._convert_to_decimal(k)}} for k in deletes]
+        chunks = [requests[i:i + BATCH_WRITE_LIMIT] for i in range(0, len(requests), BATCH_WRITE_LIMIT)]
+        client = self.resource.meta.client  # this thread's pooled client, shared by the workers
+
+        def write_chunk(chunk):
+            request = {table: chunk}
+            for attempt in range(max_attempts):
+                resp = client.batch_write_item(RequestItems=request)
+                request = resp.get("UnprocessedItems")
+                if not request:
+                    return
+                self._backoff(attempt)
+            raise RuntimeError(f"{len(request[table])} writes still unprocessed in {table}")
+
+        self._map(write_chunk, chunks, max_workers)
+
+    @staticmethod
+    def _map(fn, args, max_workers):
+        """
+        [fn(a) for a in args], on a short-lived thread pool when there is
+        more than one. Workers must not touch the per-thread pool (a new
+        thread would build a new session): `fn` uses a client fetched by the
+        caller, which boto3 allows to be shared between threads.
+        """
+        if len(args) <= 1:
+            return [fn(a) for a in args]
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(args))) as pool:
+            return list(pool.map(propagate(fn), args))
+
+    @staticmethod
+    def _backoff(attempt, base=0.05, cap=5.0):
+        """Full-jitter exponential backoff."""
+        time.sleep(random.uniform(0, min(cap, base * 2 ** attempt)))
 
 # int to decimal
     def _convert_to_decimal(self, data):
-        """Recursively convert ints to Decimal for DynamoDB put_item."""
+        """Recursively convert ints/floats to Decimal for DynamoDB put_item."""
         if isinstance(data, dict):
             return {k: self._convert_to_decimal(v) for k, v in data.items()}
         if isinstance(data, list):
             return [self._convert_to_decimal(v) for v in data]
+        if isinstance(data, bool):
+            return data
         if isinstance(data, int):
             return Decimal(data)
+        if isinstance(data, float):
+            # via str so 0.1 stays 0.1 rather than its binary expansion
+            return Decimal(str(data))
         return data
 
-    def delete(self, table, key):
+    def delete(self, table, key, **kwargs):
         """
         Delete an item from the DynamoDB table.
         """
         tbl = self.resource.Table(table)
-        return tbl.delete_item(Key=key)
+        return tbl.delete_item(Key=key, **kwargs)
+
+
+# low-level (wire format) fast path
+
+def to_wire(value):
+    """Plain Python value -> DynamoDB AttributeValue, in one pass."""
+    if isinstance(value, str):
+        return {"S": value}
+    if isinstance(value, bool):
+        return {"BOOL": value}
+    if isinstance(value, (int, Decimal)):
+        return {"N": str(value)}
+    if isinstance(value, float):
+        if value != value or value in (float("inf"), float("-inf")):
+            raise TypeError(f"DynamoDB cannot store {value}")
+        return {"N": repr(value)}
+    if value is None:
+        return {"NULL": True}
+    if isinstance(value, dict):
+        return {"M": {k: to_wire(v) for k, v in value.items()}}
+    if isinstance(value, (list, tuple)):
+        return {"L": [to_wire(v) for v in value]}
+    if isinstance(value, (bytes, bytearray)):
+        return {"B": bytes(value)}
+    if isinstance(value, (set, frozenset)):
+        if all(isinstance(v, str) for v in value):
+            return {"SS": list(value)}
+        return {"NS": [to_wire(v)["N"] for v in value]}
+    raise TypeError(f"Unsupported type for DynamoDB: {type(value).__name__}")
+
+
+def _number(text):
+    try:
+        return int(text)
+    except ValueError:
+        number = Decimal(text)
+        return int(number) if number % 1 == 0 else float(number)
+
+
+def from_wire(attr):
+    """DynamoDB AttributeValue -> plain Python value, in one pass (no Decimal step)."""
+    (kind, value), = attr.items()
+    if kind == "S":
+        return value
+    if kind == "N":
+        return _number(value)
+    if kind == "M":
+        return {k: from_wire(v) for k, v in value.items()}
+    if kind == "L":
+        return [from_wire(v) for v in value]
+    if kind == "BOOL":
+        return value
+    if kind == "NULL":
+        return None
+    if kind == "SS":
+        return set(value)
+    if kind == "NS":
+        return {_number(v) for v in value}
+    return value  # B / BS
+
+
+def serialize_item(item):
+    return {k: to_wire(v) for k, v in item.items()}
+
+
+def deserialize_item(item):
+    return {k: from_wire(v) for k, v in item.items()}
+
+
+class LowLevelDynamoDBClient(DynamoDBClient):
+    """
+    Same API as DynamoDBClient, built on the low-level client.
+
+    Items go straight between wire format and plain Python types in a single
+    pass, skipping the resource layer's Decimal conversion and our second
+    walk in `_deserialize`/`_convert_to_decimal`. Batch operations are
+    inherited and still use the resource layer.
+    """
+
+    def put(self, table, item):
+        return self.client.put_item(TableName=table, Item=serialize_item(item))
+
+    def get(self, table, key):
+        resp = self.client.get_item(TableName=table, Key=serialize_item(key))
+        item = resp.get("Item")
+        return deserialize_item(item) if item else {}
+
+    def delete(self, table, key, **kwargs):
+        resp = self.client.delete_item(TableName=table, Key=serialize_item(key), **kwargs)
+        if "Attributes" in resp:
+            resp["Attributes"] = deserialize_item(resp["Attributes"])
+        return resp
+
+    def _call_client(self):
+        return self.client
+
+    def _scan_call(self, client, table, **scan_kwargs):
+        resp = client.scan(TableName=table, **self._wire_kwargs(scan_kwargs))
+        return self._plain_response(resp)
+
+    def _query_call(self, client, table, **query_kwargs):
+        resp = client.query(TableName=table, **self._wire_kwargs(query_kwargs))
+        return self._plain_response(resp)
+
+    @staticmethod
+    def _wire_kwargs(kwargs):
+        """Build condition objects into expression strings and serialize values/keys."""
+        kwargs = dict(kwargs)
+        names = dict(kwargs.pop("ExpressionAttributeNames", {}))
+        values = dict(kwargs.pop("ExpressionAttributeValues", {}))
+        builder = ConditionExpressionBuilder()
+
+        for param, is_key in (("KeyConditionExpression", True), ("FilterExpression", False)):
+            condition = kwargs.get(param)
+            if condition is None or isinstance(condition, str):
+                continue
+            built = builder.build_expression(condition, is_key_condition=is_key)
+            kwargs[param] = built.condition_expression
+            names.update(built.attribute_name_placeholders)
+            values.update(built.attribute_value_placeholders)
+
+        if names:
+            kwargs["ExpressionAttributeNames"] = names
+        if values:
+            kwargs["ExpressionAttributeValues"] = serialize_item(values)
+        if "ExclusiveStartKey" in kwargs:
+            kwargs["ExclusiveStartKey"] = serialize_item(kwargs["ExclusiveStartKey"])
+        return kwargs
+
+    @staticmethod
+    def _plain_response(resp):
+        resp["Items"] = [deserialize_item(i) for i in resp.get("Items", [])]
+        if "LastEvaluatedKey" in resp:
+            resp["LastEvaluatedKey"] = deserialize_item(resp["LastEvaluatedKey"])
+        return resp
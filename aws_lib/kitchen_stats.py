@@ -0,0 +1,139 @@
+from decimal import Decimal
+
+from botocore.exceptions import ClientError
+
+STATS_TABLE = "Stats"
+STATS_KEY = {"stat_id": "dashboard"}
+
+# Inventory items below this qty are tracked as low stock
+LOW_STOCK_THRESHOLD = 5
+
+
+class KitchenStats:
+    """
+    Materialized dashboard counters kept in a single Stats item:
+
+        total_orders, PENDING, COMPLETED, FAILED   order counts (atomic ADD)
+        archived_orders                            orders moved to S3 (order_archive)
+        low_stock                                  {item_id: {"name", "qty"}}
+
+    Writers keep it current as orders and inventory change, so the dashboard
+    needs one get_item instead of scanning Orders and Inventory. Order
+    counters are bumped best-effort after the order write has committed,
+    never inside the order's own transaction, so this single item is not a
+    point of contention for order processing; `rebuild()` recomputes
+    everything from full scans (manage.py rebuild_stats) to correct drift.
+    `table` is a boto3 DynamoDB Table resource for the Stats table.
+    """
+
+    def __init__(self, table):
+        self.table = table
+
+    # reads
+    def read(self):
+        item = self.table.get_item(Key=STATS_KEY).get("Item", {})
+        low_stock = sorted(
+            ({"name": v["name"], "qty": int(v["qty"])} for v in item.get("low_stock", {}).values()),
+            key=lambda i: i["name"]
+        )
+        counts = {
+            k: int(v) for k, v in item.items()
+            if isinstance(v, Decimal)
+        }
+        counts.setdefault("total_orders", 0)
+        return {**counts, "low_stock": low_stock}
+
+    # order counters
+    def add_orders(self, changes):
+        """Apply {counter: delta} atomically, e.g. {"total_orders": 1, "PENDING": 1}."""
+        self.table.update_item(
+            Key=STATS_KEY,
+            UpdateExpression="ADD " + ", ".join(f"#c{i} :d{i}" for i in range(len(changes))),
+            ExpressionAttributeNames={f"#c{i}": name for i, name in enumerate(changes)},
+            ExpressionAttributeValues={f":d{i}": Decimal(delta) for i, delta in enumerate(changes.values())},
+        )
+
+    def try_add_orders(self, changes):
+        """
+        add_orders for callers whose own write already committed: a failure
+        is logged, not raised (rebuild_stats reconciles). Returns success.
+        """
+        try:
+            self.add_orders(changes)
+        except Exception as e:
+            print(f"Dashboard counters not updated {changes}: {e}")
+            return False
+        return True
+
+    def order_created(self, count=1):
+        return self.try_add_orders({"total_orders": count, "PENDING": count})
+
+    def order_deleted(self, status):
+        return self.try_add_orders({"total_orders": -1, status: -1})
+
+    def order_finished(self, status, count=1):
+        """PENDING -> `status` for `count` orders."""
+        return self.try_add_orders({"PENDING": -count, status: count})
+
+    # low stock set
+    def item_stock(self, item_id, name, qty):
+        """Track an inventory item's qty: in the low-stock set below the threshold, out otherwise."""
+        if qty >= LOW_STOCK_THRESHOLD:
+            self.item_removed(item_id)
+            return
+
+        entry = {"name": name, "qty": Decimal(qty)}
+        try:
+            self._set_low_stock(item_id, entry)
+        except ClientError as e:
+            if e.response["Error"]["Code"] != "ValidationException":
+                raise
+            # low_stock map does not exist yet
+            self.table.update_item(
+                Key=STATS_KEY,
+                UpdateExpression="SET low_stock = if_not_exists(low_stock, :empty)",
+                ExpressionAttributeValues={":empty": {}},
+            )
+            self._set_low_stock(item_id, entry)
+
+    def item_removed(self, item_id):
+        try:
+            self.table.update_item(
+                Key=STATS_KEY,
+                UpdateExpression="REMOVE low_stock.#id",
+                ExpressionAttributeNames={"#id": item_id},
+            )
+        except ClientError as e:
+            if e.response["Error"]["Code"] != "ValidationException":
+                raise
+
+    def _set_low_stock(self, item_id, entry):
+        self.table.update_item(
+            Key=STATS_KEY,
+            UpdateExpression="SET low_stock.#id = :entry",
+            ExpressionAttributeNames={"#id": item_id},
+            ExpressionAttributeValues={":entry": entry},
+        )
+
+    # reconciliation
+    def rebuild(self, orders, inventory):
+        """
+        Recompute every counter from full Orders/Inventory listings.
+        archived_orders is kept, since archived orders are no longer in the table.
+        """
+        current = self.table.get_item(Key=STATS_KEY).get("Item", {})
+        item = {**STATS_KEY, "total_orders": Decimal(0), "low_stock": {}}
+        if "archived_orders" in current:
+            item["archived_orders"] = current["archived_orders"]
+        for o in orders:
+            item["total_orders"] += 1
+            status = o.get("order_status", "UNKNOWN")
+            item[status] = item.get(status, Decimal(0)) + 1
+
+        for i in inventory:
+            qty = i.get("qty", 0)
+            if qty < LOW_STOCK_THRESHOLD:
+                item["low_stock"][i["item_id"]] = {"name": i.get("name", ""), "qty": Decimal(qty)}
+
+        self.table.put_item(Item=item)
+        return item
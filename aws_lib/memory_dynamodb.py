@@ -0,0 +1,826 @@
+"""
+In-memory DynamoDB for the local backend (see aws_lib.backend).
+
+Works on wire-format items (AttributeValue dicts), exactly what botocore
+sends, so the resource layer, condition builders and hand-written
+expressions all behave as they do against AWS. Supports the expression
+syntax we use: conditions and filters (comparisons, AND/OR/NOT, BETWEEN,
+IN, attribute_exists & co., size), key conditions, projections and
+SET/REMOVE/ADD/DELETE updates, plus GSIs, batches and transactions.
+"""
+import copy
+import functools
+import json
+import re
+import time
+import zlib
+from decimal import Decimal
+
+from .memory_store import MemoryService, ServiceError
+
+MISSING = object()
+
+
+def validation(message):
+    return ServiceError("ValidationException", message)
+
+
+# values
+def plain(attr):
+    """AttributeValue -> comparable Python value."""
+    (kind, value), = attr.items()
+    if kind == "N":
+        return Decimal(value)
+    if kind == "M":
+        return {k: plain(v) for k, v in value.items()}
+    if kind == "L":
+        return [plain(v) for v in value]
+    if kind == "NS":
+        return frozenset(Decimal(v) for v in value)
+    if kind in ("SS", "BS"):
+        return frozenset(value)
+    if kind == "NULL":
+        return None
+    return value
+
+
+def number(value):
+    text = format(value, "f") if isinstance(value, Decimal) else str(value)
+    if "." in text:
+        text = text.rstrip("0").rstrip(".")
+    return {"N": text}
+
+
+# expressions
+_TOKEN = re.compile(r"\s*(?:(#\w+)|(:\w+)|(\d+)|([A-Za-z_]\w*)|(<>|<=|>=|[=<>()\[\],.+-]))")
+
+COMPARATORS = {
+    "=": lambda a, b: a == b,
+    "<>": lambda a, b: a != b,
+    "<": lambda a, b: a < b,
+    "<=": lambda a, b: a <= b,
+    ">": lambda a, b: a > b,
+    ">=": lambda a, b: a >= b,
+}
+
+
+def tokenize(expression):
+    tokens, pos = [], 0
+    expression = expression.strip()
+    while pos < len(expression):
+        match = _TOKEN.match(expression, pos)
+        if not match or match.end() == pos:
+            raise validation(f"Invalid expression near: {expression[pos:pos + 20]!r}")
+        name, value, digits, word, symbol = match.groups()
+        if name:
+            tokens.append(("name", name))
+        elif value:
+            tokens.append(("value", value))
+        elif digits:
+            tokens.append(("int", int(digits)))
+        elif word:
+            tokens.append(("word", word))
+        else:
+            tokens.append(("sym", symbol))
+        pos = match.end()
+    return tokens
+
+
+class Parser:
+    """Recursive-descent parser producing nested tuples."""
+
+    def __init__(self, expression):
+        self.tokens = tokenize(expression)
+        self.pos = 0
+
+    def peek(self, offset=0):
+        index = self.pos + offset
+        return self.tokens[index] if index < len(self.tokens) else (None, None)
+
+    def take(self, kind=None, value=None):
+        token = self.peek()
+        if (kind and token[0] != kind) or (value and str(token[1]).upper() != value.upper()):
+            raise validation(f"Syntax error: expected {value or kind}, got {token[1]!r}")
+        self.pos += 1
+        return token
+
+    def accept(self, value):
+        token = self.peek()
+        if token[0] in ("sym", "word") and str(token[1]).upper() == value.upper():
+            self.pos += 1
+            return True
+        return False
+
+    def done(self):
+        if self.pos != len(self.tokens):
+            raise validation(f"Syntax error: unexpected {self.peek()[1]!r}")
+
+    # paths and operands
+    def path(self):
+        kind, value = self.peek()
+        if kind not in ("name", "word"):
+            raise validation(f"Syntax error: expected an attribute, got {value!r}")
+        self.pos += 1
+        segments = [("attr", value)]
+        while True:
+            if self.accept("."):
+                kind, value = self.take()
+                if kind not in ("name", "word"):
+                    raise validation("Syntax error in document path")
+                segments.append(("attr", value))
+            elif self.accept("["):
+                segments.append(("index", self.take("int")[1]))
+                self.take("sym", "]")
+            else:
+                return ("path", tuple(segments))
+
+    def operand(self):
+        kind, value = self.peek()
+        if kind == "value":
+            self.pos += 1
+            return ("value", value)
+        if kind == "word" and self.peek(1) == ("sym", "("):
+            function = value.lower()
+            self.pos += 2
+            args = [self.operand()]
+            while self.accept(","):
+                args.append(self.operand())
+            self.take("sym", ")")
+            return ("call", function, tuple(args))
+        return self.path()
+
+    # conditions
+    def condition(self):
+        node = self.conjunction()
+        while self.accept("OR"):
+            node = ("or", node, self.conjunction())
+        return node
+
+    def conjunction(self):
+        node = self.negation()
+        while self.accept("AND"):
+            node = ("and", node, self.negation())
+        return node
+
+    def negation(self):
+        if self.accept("NOT"):
+            return ("not", self.negation())
+        return self.predicate()
+
+    def predicate(self):
+        if self.accept("("):
+            node = self.condition()
+            self.take("sym", ")")
+            return node
+
+        left = self.operand()
+        if left[0] == "call" and left[1] != "size":
+            return left
+        if self.accept("BETWEEN"):
+            low = self.operand()
+            self.take("word", "AND")
+            return ("between", left, low, self.operand())
+        if self.accept("IN"):
+            self.take("sym", "(")
+            options = [self.operand()]
+            while self.accept(","):
+                options.append(self.operand())
+            self.take("sym", ")")
+            return ("in", left, tuple(options))
+        kind, symbol = self.peek()
+        if kind != "sym" or symbol not in COMPARATORS:
+            raise validation(f"Syntax error: expected a comparison, got {symbol!r}")
+        self.pos += 1
+        return ("compare", symbol, left, self.operand())
+
+    # updates
+    def update(self):
+        actions = []
+        while self.peek()[0]:
+            clause = self.take("word")[1].upper()
+            while True:
+                path = self.path()
+                if clause == "SET":
+                    self.take("sym", "=")
+                    value = self.operand()
+                    if self.peek() in (("sym", "+"), ("sym", "-")):
+                        op = self.take()[1]
+                        value = ("arith", op, value, self.operand())
+                    actions.append(("SET", path, value))
+                elif clause == "REMOVE":
+                    actions.append(("REMOVE", path, None))
+                elif clause in ("ADD", "DELETE"):
+                    actions.append((clause, path, self.operand()))
+                else:
+                    raise validation(f"Invalid UpdateExpression clause {clause}")
+                if not self.accept(","):
+                    break
+        return actions
+
+    def projection(self):
+        paths = [self.path()]
+        while self.accept(","):
+            paths.append(self.path())
+        return paths
+
+
+@functools.lru_cache(maxsize=1024)
+def parse_condition(expression):
+    parser = Parser(expression)
+    node = parser.condition()
+    parser.done()
+    return node
+
+
+@functools.lru_cache(maxsize=1024)
+def parse_update(expression):
+    parser = Parser(expression)
+    actions = parser.update()
+    parser.done()
+    return actions
+
+
+@functools.lru_cache(maxsize=256)
+def parse_projection(expression):
+    parser = Parser(expression)
+    paths = parser.projection()
+    parser.done()
+    return paths
+
+
+class Evaluator:
+    """Evaluates parsed expressions against one wire-format item."""
+
+    def __init__(self, names=None, values=None):
+        self.names = names or {}
+        self.values = values or {}
+
+    def segments(self, path):
+        resolved = []
+        for kind, value in path[1]:
+            if kind == "attr" and value.startswith("#"):
+                if value not in self.names:
+                    raise validation(f"Unresolved attribute name placeholder {value}")
+                value = self.names[value]
+            resolved.append((kind, value))
+        return resolved
+
+    def resolve(self, item, path):
+        node = {"M": item}
+        for kind, key in self.segments(path):
+            if kind == "attr":
+                node = node.get("M", {}).get(key, MISSING) if isinstance(node, dict) else MISSING
+            else:
+                items = node.get("L") if isinstance(node, dict) else None
+                node = items[key] if items is not None and key < len(items) else MISSING
+            if node is MISSING:
+                return MISSING
+        return node
+
+    def value(self, placeholder):
+        if placeholder not in self.values:
+            raise validation(f"Unresolved attribute value placeholder {placeholder}")
+        return self.values[placeholder]
+
+    def operand(self, item, node):
+        """Operand -> AttributeValue (or MISSING)."""
+        kind = node[0]
+        if kind == "value":
+            return self.value(node[1])
+        if kind == "path":
+            return self.resolve(item, node)
+        if kind == "call":
+            name, args = node[1], node[2]
+            if name == "size":
+                attr = self.operand(item, args[0])
+                if attr is MISSING:
+                    return MISSING
+                (type_, value), = attr.items()
+                return number(len(value))
+            if name == "if_not_exists":
+                attr = self.operand(item, args[0])
+                return self.operand(item, args[1]) if attr is MISSING else attr
+            if name == "list_append":
+                first, second = (self.operand(item, a) for a in args)
+                return {"L": first.get("L", []) + second.get("L", [])}
+            raise validation(f"Invalid function name {name}")
+        if kind == "arith":
+            left, right = self.operand(item, node[2]), self.operand(item, node[3])
+            if left is MISSING or right is MISSING:
+                raise validation("The provided expression refers to an attribute that does not exist in the item")
+            if "N" not in left or "N" not in right:
+                raise validation("An operand in the update expression has an incorrect data type")
+            a, b = Decimal(left["N"]), Decimal(right["N"])
+            return number(a + b if node[1] == "+" else a - b)
+        raise validation(f"Invalid operand {node!r}")
+
+    def test(self, item, node):
+        kind = node[0]
+        if kind == "and":
+            return self.test(item, node[1]) and self.test(item, node[2])
+        if kind == "or":
+            return self.test(item, node[1]) or self.test(item, node[2])
+        if kind == "not":
+            return not self.test(item, node[1])
+        if kind == "compare":
+            left, right = self.operand(item, node[2]), self.operand(item, node[3])
+            if left is MISSING or right is MISSING:
+                return node[1] == "<>"
+            return self.compare(node[1], left, right)
+        if kind == "between":
+            value, low, high = (self.operand(item, n) for n in node[1:])
+            if MISSING in (value, low, high):
+                return False
+            return self.compare(">=", value, low) and self.compare("<=", value, high)
+        if kind == "in":
+            value = self.operand(item, node[1])
+            return value is not MISSING and any(
+                self.compare("=", value, self.operand(item, option)) for option in node[2]
+            )
+        if kind == "call":
+            return self.function(item, node[1], node[2])
+        raise validation(f"Invalid condition {node!r}")
+
+    def compare(self, op, left, right):
+        (left_type, _), = left.items()
+        (right_type, _), = right.items()
+        if op not in ("=", "<>") and (left_type != right_type or left_type not in ("N", "S", "B")):
+            return False
+        a, b = plain(left), plain(right)
+        if op in ("=", "<>") and left_type != right_type:
+            return op == "<>"
+        return COMPARATORS[op](a, b)
+
+    def function(self, item, name, args):
+        if name == "attribute_exists":
+            return self.operand(item, args[0]) is not MISSING
+        if name == "attribute_not_exists":
+            return self.operand(item, args[0]) is MISSING
+        attr = self.operand(item, args[0])
+        other = self.operand(item, args[1]) if len(args) > 1 else MISSING
+        if attr is MISSING or other is MISSING:
+            return False
+        if name == "attribute_type":
+            return next(iter(attr)) == plain(other)
+        if name == "begins_with":
+            (kind, value), = attr.items()
+            return kind in ("S", "B") and value.startswith(plain(other))
+        if name == "contains":
+            (kind, value), = attr.items()
+            if kind == "S":
+                return "S" in other and other["S"] in value
+            if kind in ("SS", "NS", "BS"):
+                return plain(other) in plain(attr)
+            if kind == "L":
+                return other in value
+            return False
+        raise validation(f"Invalid function name {name}")
+
+    # updates
+    def apply(self, item, actions):
+        """Apply parsed update actions to a copy of `item`; returns the new item."""
+        updated = copy.deepcopy(item)
+        for clause, path, operand in actions:
+            if clause == "SET":
+                self.assign(updated, path, self.operand(item, operand))
+            elif clause == "REMOVE":
+                self.remove(updated, path)
+            else:
+                value = self.operand(item, operand)
+                current = self.resolve(updated, path)
+                self.assign(updated, path, self.add_or_delete(clause, current, value))
+        return updated
+
+    def add_or_delete(self, clause, current, value):
+        (kind, raw), = value.items()
+        if clause == "ADD" and kind == "N":
+            if current is MISSING:
+                return value
+            if "N" not in current:
+                raise validation("An operand in the update expression has an incorrect data type")
+            return number(Decimal(current["N"]) + Decimal(raw))
+        if kind not in ("SS", "NS", "BS"):
+            raise validation(f"{clause} only supports numbers and sets")
+        existing = [] if current is MISSING else current.get(kind)
+        if existing is None:
+            raise validation("An operand in the update expression has an incorrect data type")
+        if clause == "ADD":
+            merged = list(existing) + [v for v in raw if v not in existing]
+        else:
+            merged = [v for v in existing if v not in raw]
+        return {kind: merged} if merged else MISSING
+
+    def parent(self, item, path):
+        segments = self.segments(path)
+        node = {"M": item}
+        for kind, key in segments[:-1]:
+            if kind == "attr":
+                node = node.get("M", {}).get(key) if "M" in node else None
+            else:
+                items = node.get("L")
+                node = items[key] if items is not None and key < len(items) else None
+            if node is None:
+                raise validation("The document path provided in the update expression is invalid for update")
+        return node, segments[-1]
+
+    def assign(self, item, path, value):
+        node, (kind, key) = self.parent(item, path)
+        if value is MISSING:
+            self.remove(item, path)
+            return
+        if kind == "attr":
+            if "M" not in node:
+                raise validation("The document path provided in the update expression is invalid for update")
+            node["M"][key] = value
+        else:
+            items = node.get("L")
+            if items is None:
+                raise validation("The document path provided in the update expression is invalid for update")
+            if key < len(items):
+                items[key] = value
+            else:
+                items.append(value)
+
+    def remove(self, item, path):
+        node, (kind, key) = self.parent(item, path)
+        if kind == "attr" and "M" in node:
+            node["M"].pop(key, None)
+        elif kind == "index" and "L" in node and key < len(node["L"]):
+            del node["L"][key]
+
+    def project(self, item, paths):
+        projected = {}
+        for path in paths:
+            segments = self.segments(path)
+            if len(segments) == 1 or all(kind == "attr" for kind, _ in segments):
+                value = self.resolve(item, path)
+                if value is MISSING:
+                    continue
+                node = projected
+                for _, key in segments[:-1]:
+                    node = node.setdefault(key, {"M": {}})["M"]
+                node[segments[-1][1]] = copy.deepcopy(value)
+        return projected
+
+
+# tables
+def _key_names(key_schema):
+    hash_key = next(k["AttributeName"] for k in key_schema if k["KeyType"] == "HASH")
+    range_key = next((k["AttributeName"] for k in key_schema if k["KeyType"] == "RANGE"), None)
+    return hash_key, range_key
+
+
+def _sort_value(attr):
+    value = plain(attr)
+    return (0, value, "") if isinstance(value, Decimal) else (1, Decimal(0), value)
+
+
+class MemoryDynamoDB(MemoryService):
+    """DynamoDB operations; one store collection per table."""
+
+    # table metadata
+    def table(self, name):
+        meta = self.store.get("dynamodb:tables", name)
+        if meta is None:
+            raise ServiceError("ResourceNotFoundException", f"Requested resource not found: Table: {name} not found")
+        return meta
+
+    def _describe(self, meta):
+        description = copy.deepcopy(meta)
+        description["ItemCount"] = self.store.count(f"dynamodb:items:{meta['TableName']}")
+        description["TableStatus"] = "ACTIVE"
+        for index in description.get("GlobalSecondaryIndexes", []):
+            index["IndexStatus"] = "ACTIVE"
+        return description
+
+    def op_create_table(self, region, TableName, KeySchema, AttributeDefinitions, **params):
+        if self.store.get("dynamodb:tables", TableName) is not None:
+            raise ServiceError("ResourceInUseException", f"Table already exists: {TableName}")
+        meta = {
+            "TableName": TableName,
+            "TableArn": f"arn:aws:dynamodb:{region}:{self.store.account_id}:table/{TableName}",
+            "KeySchema": KeySchema,
+            "AttributeDefinitions": AttributeDefinitions,
+            "CreationDateTime": time.time(),
+            "BillingModeSummary": {"BillingMode": params.get("BillingMode", "PROVISIONED")},
+        }
+        for kind in ("GlobalSecondaryIndexes", "LocalSecondaryIndexes"):
+            if params.get(kind):
+                meta[kind] = params[kind]
+        self.store.put("dynamodb:tables", TableName, meta)
+        return {"TableDescription": self._describe(meta)}
+
+    def op_describe_table(self, region, TableName):
+        return {"Table": self._describe(self.table(TableName))}
+
+    def op_delete_table(self, region, TableName):
+        meta = self.table(TableName)
+        self.store.delete("dynamodb:tables", TableName)
+        self.store.drop(f"dynamodb:items:{TableName}")
+        return {"TableDescription": meta}
+
+    def op_list_tables(self, region, **params):
+        return {"TableNames": [name for name, _ in self.store.items("dynamodb:tables")]}
+
+    def op_update_table(self, region, TableName, AttributeDefinitions=(), GlobalSecondaryIndexUpdates=(), **params):
+        # indexes are evaluated from the items at query time, so a new one is backfilled at once
+        meta = self.table(TableName)
+        defined = {a["AttributeName"] for a in meta["AttributeDefinitions"]}
+        meta["AttributeDefinitions"] += [a for a in AttributeDefinitions if a["AttributeName"] not in defined]
+        indexes = meta.setdefault("GlobalSecondaryIndexes", [])
+        for update in GlobalSecondaryIndexUpdates:
+            if "Create" in update:
+                if any(i["IndexName"] == update["Create"]["IndexName"] for i in indexes):
+                    raise validation(f"Index already exists: {update['Create']['IndexName']}")
+                indexes.append(update["Create"])
+            elif "Delete" in update:
+                meta["GlobalSecondaryIndexes"] = indexes = [
+                    i for i in indexes if i["IndexName"] != update["Delete"]["IndexName"]
+                ]
+        self.store.put("dynamodb:tables", TableName, meta)
+        return {"TableDescription": self._describe(meta)}
+
+    def op_update_time_to_live(self, region, TableName, TimeToLiveSpecification):
+        meta = self.table(TableName)
+        meta["TimeToLive"] = TimeToLiveSpecification
+        self.store.put("dynamodb:tables", TableName, meta)
+        return {"TimeToLiveSpecification": TimeToLiveSpecification}
+
+    def op_describe_time_to_live(self, region, TableName):
+        spec = self.table(TableName).get("TimeToLive")
+        if not spec:
+            return {"TimeToLiveDescription": {"TimeToLiveStatus": "DISABLED"}}
+        return {"TimeToLiveDescription": {
+            "TimeToLiveStatus": "ENABLED" if spec["Enabled"] else "DISABLED",
+            "AttributeName": spec["AttributeName"],
+        }}
+
+    # items
+    def _key(self, meta, key):
+        """Validated primary key -> store key."""
+        names = [n for n in _key_names(meta["KeySchema"]) if n]
+        if set(key) != set(names):
+            raise validation("The provided key element does not match the schema")
+        return json.dumps([key[n] for n in names], sort_keys=True)
+
+    def _item_key(self, meta, item):
+        names = [n for n in _key_names(meta["KeySchema"]) if n]
+        missing = [n for n in names if n not in item]
+        if missing:
+            raise validation(f"One or more parameter values were invalid: Missing the key {missing[0]} in the item")
+        return self._key(meta, {n: item[n] for n in names})
+
+    def _get(self, table, store_key):
+        return self.store.get(f"dynamodb:items:{table}", store_key)
+
+    def _check(self, item, condition, names, values):
+        if not condition:
+            return True
+        return Evaluator(names, values).test(item or {}, parse_condition(condition))
+
+    def _condition_failed(self, old, params):
+        error = ServiceError("ConditionalCheckFailedException", "The conditional request failed")
+        if old is not None and params.get("ReturnValuesOnConditionCheckFailure") == "ALL_OLD":
+            error.extra["Item"] = old
+        return error
+
+    def _put(self, TableName, Item, ConditionExpression=None, ExpressionAttributeNames=None,
+             ExpressionAttributeValues=None, **params):
+        meta = self.table(TableName)
+        store_key = self._item_key(meta, Item)
+        old = self._get(TableName, store_key)
+        if not self._check(old, ConditionExpression, ExpressionAttributeNames, ExpressionAttributeValues):
+            raise self._condition_failed(old, params)
+        return old, lambda: self.store.put(f"dynamodb:items:{TableName}", store_key, Item)
+
+    def _update(self, TableName, Key, UpdateExpression=None, ConditionExpression=None,
+                ExpressionAttributeNames=None, ExpressionAttributeValues=None, **params):
+        meta = self.table(TableName)
+        store_key = self._key(meta, Key)
+        old = self._get(TableName, store_key)
+        if not self._check(old, ConditionExpression, ExpressionAttributeNames, ExpressionAttributeValues):
+            raise self._condition_failed(old, params)
+        evaluator = Evaluator(ExpressionAttributeNames, ExpressionAttributeValues)
+        new = evaluator.apply(old or dict(Key), parse_update(UpdateExpression)) if UpdateExpression else dict(old or Key)
+        if any(new.get(k) != v for k, v in Key.items()):
+            raise validation("Cannot update attribute: this attribute is part of the key")
+        return old, new, lambda: self.store.put(f"dynamodb:items:{TableName}", store_key, new)
+
+    def _delete(self, TableName, Key, ConditionExpression=None, ExpressionAttributeNames=None,
+                ExpressionAttributeValues=None, **params):
+        meta = self.table(TableName)
+        store_key = self._key(meta, Key)
+        old = self._get(TableName, store_key)
+        if not self._check(old, ConditionExpression, ExpressionAttributeNames, ExpressionAttributeValues):
+            raise self._condition_failed(old, params)
+        return old, lambda: self.store.delete(f"dynamodb:items:{TableName}", store_key)
+
+    def op_put_item(self, region, **params):
+        old, write = self._put(**params)
+        write()
+        return {"Attributes": old} if old and params.get("ReturnValues") == "ALL_OLD" else {}
+
+    def op_get_item(self, region, TableName, Key, ProjectionExpression=None,
+                    ExpressionAttributeNames=None, **params):
+        item = self._get(TableName, self._key(self.table(TableName), Key))
+        if item is None:
+            return {}
+        if ProjectionExpression:
+            item = Evaluator(ExpressionAttributeNames).project(item, parse_projection(ProjectionExpression))
+        return {"Item": item}
+
+    def op_update_item(self, region, **params):
+        old, new, write = self._update(**params)
+        write()
+        returns = params.get("ReturnValues", "NONE")
+        if returns == "ALL_NEW":
+            return {"Attributes": new}
+        if returns == "ALL_OLD":
+            return {"Attributes": old} if old else {}
+        if returns in ("UPDATED_NEW", "UPDATED_OLD"):
+            source = new if returns == "UPDATED_NEW" else (old or {})
+            changed = {k for k in set(new) | set(old or {}) if new.get(k) != (old or {}).get(k)}
+            return {"Attributes": {k: source[k] for k in changed if k in source}}
+        return {}
+
+    def op_delete_item(self, region, **params):
+        old, write = self._delete(**params)
+        write()
+        return {"Attributes": old} if old and params.get("ReturnValues") == "ALL_OLD" else {}
+
+    # reads
+    def _schema(self, meta, index_name):
+        """(hash, range, projection, key attribute names) for the table or one of its indexes."""
+        table_keys = [n for n in _key_names(meta["KeySchema"]) if n]
+        if not index_name:
+            hash_key, range_key = _key_names(meta["KeySchema"])
+            return hash_key, range_key, None, table_keys
+        indexes = meta.get("GlobalSecondaryIndexes", []) + meta.get("LocalSecondaryIndexes", [])
+        index = next((i for i in indexes if i["IndexName"] == index_name), None)
+        if index is None:
+            raise validation(f"The table does not have the specified index: {index_name}")
+        hash_key, range_key = _key_names(index["KeySchema"])
+        keys = table_keys + [k for k in (hash_key, range_key) if k and k not in table_keys]
+        return hash_key, range_key, index["Projection"], keys
+
+    @staticmethod
+    def _projected(item, projection, keys):
+        if not projection or projection["ProjectionType"] == "ALL":
+            return item
+        wanted = set(keys) | set(projection.get("NonKeyAttributes", []))
+        return {k: v for k, v in item.items() if k in wanted}
+
+    def _page(self, rows, keys, projection, params):
+        """Apply ExclusiveStartKey/Limit/filter/projection to ordered (sort_key, item) rows."""
+        start = params.get("ExclusiveStartKey")
+        names = params.get("ExpressionAttributeNames")
+        evaluator = Evaluator(names, params.get("ExpressionAttributeValues"))
+        if start:
+            start_sort = self._row_sort(start, keys, params["_order"])
+            rows = [r for r in rows if r[0] > start_sort] if params["_forward"] else [r for r in rows if r[0] < start_sort]
+
+        limit = params.get("Limit")
+        evaluated = rows[:limit] if limit else rows
+        last_key = None
+        if limit and len(rows) > limit:
+            last = evaluated[-1][1]
+            last_key = {k: last[k] for k in keys if k in last}
+
+        condition = params.get("FilterExpression")
+        parsed = parse_condition(condition) if condition else None
+        items = [
+            self._projected(item, projection, keys)
+            for _, item in evaluated
+            if parsed is None or evaluator.test(item, parsed)
+        ]
+        if params.get("ProjectionExpression"):
+            paths = parse_projection(params["ProjectionExpression"])
+            items = [Evaluator(names).project(item, paths) for item in items]
+
+        resp = {"Count": len(items), "ScannedCount": len(evaluated)}
+        if params.get("Select") != "COUNT":
+            resp["Items"] = items
+        if last_key:
+            resp["LastEvaluatedKey"] = last_key
+        return resp
+
+    @staticmethod
+    def _row_sort(item, keys, order):
+        """Sort tuple: the order attributes (index/range key) then the item's full key."""
+        return tuple(_sort_value(item[k]) if k in item else (2, Decimal(0), "") for k in order) + (
+            json.dumps([item.get(k) for k in keys], sort_keys=True),
+        )
+
+    def op_scan(self, region, TableName, IndexName=None, Segment=None, TotalSegments=None, **params):
+        meta = self.table(TableName)
+        hash_key, range_key, projection, keys = self._schema(meta, IndexName)
+        rows = []
+        for store_key, item in self.store.items(f"dynamodb:items:{TableName}"):
+            if TotalSegments and zlib.crc32(store_key.encode()) % TotalSegments != Segment:
+                continue
+            if IndexName and (hash_key not in item or (range_key and range_key not in item)):
+                continue
+            rows.append((self._row_sort(item, keys, []), item))
+        rows.sort(key=lambda r: r[0])
+        return self._page(rows, keys, projection, {**params, "_order": [], "_forward": True})
+
+    def op_query(self, region, TableName, KeyConditionExpression, IndexName=None,
+                 ScanIndexForward=True, **params):
+        meta = self.table(TableName)
+        hash_key, range_key, projection, keys = self._schema(meta, IndexName)
+        names = params.get("ExpressionAttributeNames")
+        evaluator = Evaluator(names, params.get("ExpressionAttributeValues"))
+        condition = parse_condition(KeyConditionExpression)
+
+        # the key condition must pin the hash key: "hash = :v [AND range condition]"
+        parts = [condition[1], condition[2]] if condition[0] == "and" else [condition]
+        pinned = None
+        for part in parts:
+            if part[0] == "compare" and part[1] == "=" and part[2][0] == "path":
+                if evaluator.segments(part[2]) == [("attr", hash_key)]:
+                    pinned = evaluator.operand({}, part[3])
+        if pinned is None:
+            raise validation("Query condition missed key schema element: " + hash_key)
+
+        order = [range_key] if range_key else []
+        rows = []
+        if not IndexName and not range_key:
+            item = self._get(TableName, json.dumps([pinned], sort_keys=True))
+            candidates = [item] if item is not None else []
+        else:
+            candidates = (item for _, item in self.store.items(f"dynamodb:items:{TableName}"))
+        for item in candidates:
+            if item.get(hash_key) != pinned or (range_key and range_key not in item):
+                continue
+            if evaluator.test(item, condition):
+                rows.append((self._row_sort(item, keys, order), item))
+        rows.sort(key=lambda r: r[0], reverse=not ScanIndexForward)
+        return self._page(rows, keys, projection, {**params, "_order": order, "_forward": ScanIndexForward})
+
+    # batches and transactions
+    def op_batch_get_item(self, region, RequestItems, **params):
+        responses = {}
+        for table, request in RequestItems.items():
+            meta = self.table(table)
+            names = request.get("ExpressionAttributeNames")
+            paths = parse_projection(request["ProjectionExpression"]) if request.get("ProjectionExpression") else None
+            items = responses.setdefault(table, [])
+            for key in request["Keys"]:
+                item = self._get(table, self._key(meta, key))
+                if item is not None:
+                    items.append(Evaluator(names).project(item, paths) if paths else item)
+        return {"Responses": responses, "UnprocessedKeys": {}}
+
+    def op_batch_write_item(self, region, RequestItems, **params):
+        writes = []
+        for table, requests in RequestItems.items():
+            if len(requests) > 25:
+                raise validation("Too many items requested for the BatchWriteItem call")
+            for request in requests:
+                if "PutRequest" in request:
+                    writes.append(self._put(TableName=table, Item=request["PutRequest"]["Item"])[1])
+                else:
+                    writes.append(self._delete(TableName=table, Key=request["DeleteRequest"]["Key"])[1])
+        for write in writes:
+            write()
+        return {"UnprocessedItems": {}}
+
+    def op_transact_write_items(self, region, TransactItems, **params):
+        if len(TransactItems) > 100:
+            raise validation("Member must have length less than or equal to 100")
+
+        writes, reasons, seen = [], [], set()
+        for entry in TransactItems:
+            (action, request), = entry.items()
+            meta = self.table(request["TableName"])
+            key = request.get("Key") or {k: request["Item"][k] for k in _key_names(meta["KeySchema"]) if k}
+            target = (request["TableName"], self._key(meta, key))
+            if target in seen:
+                raise validation("Transaction request cannot include multiple operations on one item")
+            seen.add(target)
+            try:
+                if action == "Put":
+                    writes.append(self._put(**request)[1])
+                elif action == "Update":
+                    writes.append(self._update(**request)[2])
+                elif action == "Delete":
+                    writes.append(self._delete(**request)[1])
+                elif action == "ConditionCheck":
+                    self._delete(**request)  # checks the condition, write discarded
+                reasons.append({"Code": "None"})
+            except ServiceError as e:
+                if e.code != "ConditionalCheckFailedException":
+                    raise
+                reasons.append({"Code": "ConditionalCheckFailed", "Message": e.message, **e.extra})
+
+        if any(r["Code"] != "None" for r in reasons):
+            codes = ", ".join(r["Code"] for r in reasons)
+            error = ServiceError(
+                "TransactionCanceledException",
+                f"Transaction cancelled, please refer cancellation reasons for specific reasons [{codes}]"
+            )
+            error.extra["CancellationReasons"] = reasons
+            raise error
+        for write in writes:
+            write()
+        return {}
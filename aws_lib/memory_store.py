@@ -0,0 +1,183 @@
+"""
+Storage for the local AWS backend (see aws_lib.backend).
+
+State is kept as named collections of key -> JSON-style value. MemoryStore
+holds them in process; SQLiteStore keeps them in a SQLite file so several
+processes (web server + order worker) share one set of tables and queues.
+Every backend operation runs inside `store.transaction()`, which makes it
+atomic across threads (and, with SQLite, across processes).
+"""
+import base64
+import json
+import os
+import pickle
+import re
+import sqlite3
+import threading
+from collections import defaultdict
+
+# Account in generated ARNs/queue URLs; the default matches the topic ARN in lambda_function
+ACCOUNT_ID = os.getenv("AWS_BACKEND_ACCOUNT_ID", "326603068904")
+
+
+class ServiceError(Exception):
+    """An AWS-style error: becomes a botocore ClientError with this code."""
+
+    def __init__(self, code, message, status=400):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+        self.status = status
+        self.extra = {}
+
+
+class MemoryService:
+    """Base for the emulated services: `call` dispatches Operation -> op_operation, atomically."""
+
+    def __init__(self, store):
+        self.store = store
+
+    def call(self, operation, params, region):
+        method = getattr(self, "op_" + re.sub(r"(?<!^)([A-Z])", r"_\1", operation).lower(), None)
+        if method is None:
+            raise ServiceError("UnknownOperationException", f"{operation} is not supported by the memory backend")
+        with self.store.transaction():
+            return method(region=region, **params)
+
+
+class MemoryStore:
+    """
+    Process-local, thread-safe collections. Values are stored pickled, so
+    callers (and botocore's in-place response transforms) never share them.
+    """
+
+    account_id = ACCOUNT_ID
+
+    def __init__(self):
+        self._collections = defaultdict(dict)
+        self._lock = threading.RLock()
+
+    def transaction(self):
+        return self._lock
+
+    def get(self, collection, key):
+        value = self._collections[collection].get(key)
+        return None if value is None else pickle.loads(value)
+
+    def put(self, collection, key, value):
+        self._collections[collection][key] = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+    def delete(self, collection, key):
+        self._collections[collection].pop(key, None)
+
+    def items(self, collection, prefix=""):
+        """(key, value) pairs in key order."""
+        data = self._collections[collection]
+        keys = sorted(k for k in data if k.startswith(prefix))
+        return [(k, pickle.loads(data[k])) for k in keys]
+
+    def count(self, collection):
+        return len(self._collections[collection])
+
+    def drop(self, collection):
+        self._collections.pop(collection, None)
+
+    def clear(self):
+        with self._lock:
+            self._collections.clear()
+
+
+# SQLite values are JSON; bytes (S3 bodies, binary attributes) are tagged base64
+def _encode(value):
+    if isinstance(value, bytes):
+        return {"__b64__": base64.b64encode(value).decode()}
+    raise TypeError(f"Cannot store {type(value).__name__}")
+
+
+def _decode(obj):
+    if len(obj) == 1 and "__b64__" in obj:
+        return base64.b64decode(obj["__b64__"])
+    return obj
+
+
+class SQLiteStore:
+    """Collections in a SQLite file (WAL mode), one connection per thread."""
+
+    account_id = ACCOUNT_ID
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        with self.transaction():
+            self._db().execute(
+                "CREATE TABLE IF NOT EXISTS kv ("
+                " collection TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL,"
+                " PRIMARY KEY (collection, key)) WITHOUT ROWID"
+            )
+
+    def _db(self):
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = self._local.db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            self._local.depth = 0
+        return db
+
+    def transaction(self):
+        return _SQLiteTransaction(self)
+
+    def get(self, collection, key):
+        row = self._db().execute(
+            "SELECT value FROM kv WHERE collection = ? AND key = ?", (collection, key)
+        ).fetchone()
+        return json.loads(row[0], object_hook=_decode) if row else None
+
+    def put(self, collection, key, value):
+        self._db().execute(
+            "INSERT OR REPLACE INTO kv (collection, key, value) VALUES (?, ?, ?)",
+            (collection, key, json.dumps(value, default=_encode)),
+        )
+
+    def delete(self, collection, key):
+        self._db().execute("DELETE FROM kv WHERE collection = ? AND key = ?", (collection, key))
+
+    def items(self, collection, prefix=""):
+        rows = self._db().execute(
+            "SELECT key, value FROM kv WHERE collection = ? AND key >= ? ORDER BY key",
+            (collection, prefix),
+        )
+        result = []
+        for key, value in rows:
+            if not key.startswith(prefix):
+                break
+            result.append((key, json.loads(value, object_hook=_decode)))
+        return result
+
+    def count(self, collection):
+        return self._db().execute("SELECT COUNT(*) FROM kv WHERE collection = ?", (collection,)).fetchone()[0]
+
+    def drop(self, collection):
+        self._db().execute("DELETE FROM kv WHERE collection = ?", (collection,))
+
+    def clear(self):
+        with self.transaction():
+            self._db().execute("DELETE FROM kv")
+
+
+class _SQLiteTransaction:
+    """Re-entrant BEGIN IMMEDIATE ... COMMIT on the thread's connection."""
+
+    def __init__(self, store):
+        self.store = store
+
+    def __enter__(self):
+        db = self.store._db()
+        if self.store._local.depth == 0:
+            db.execute("BEGIN IMMEDIATE")
+        self.store._local.depth += 1
+
+    def __exit__(self, exc_type, *exc):
+        self.store._local.depth -= 1
+        if self.store._local.depth == 0:
+            self.store._db().execute("ROLLBACK" if exc_type else "COMMIT")
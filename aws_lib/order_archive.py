@@ -0,0 +1,176 @@
+"""
+Cold storage for finished orders.
+
+OrderArchive moves COMPLETED/FAILED orders older than a cutoff out of the
+Orders table into gzip-compressed NDJSON files in S3, partitioned by the
+day the order was created:
+
+    s3://<bucket>/archive/orders/dt=2026-10-01/COMPLETED-<first order_id>.ndjson.gz
+
+Candidates come from Queries on the (order_status, created_at) index, so the
+job never scans the table. Orders are deleted from DynamoDB (BatchWriteItem)
+only after the file holding them is uploaded, which keeps the hot table at
+active orders plus a short tail of history. `find()` reads the archive back
+for historical lookups, one day partition at a time.
+"""
+import gzip
+import json
+import tempfile
+from datetime import datetime, timedelta, timezone
+
+from boto3.dynamodb.conditions import Key
+
+ARCHIVE_PREFIX = "archive/orders"
+ARCHIVED_STATUSES = ("COMPLETED", "FAILED")
+
+# Orders GSI on (order_status, created_at), see infra_setup.py
+ORDERS_STATUS_INDEX = "order_status-created_at-index"
+
+# Rows per archive file (bounds temp space and the delete batch per upload)
+ROWS_PER_FILE = 50000
+
+# Archive file bodies are buffered in memory up to this size, then on disk
+SPOOL_MAX_BYTES = 8 * 1024 * 1024
+
+# Longest date range a single find() may read
+MAX_LOOKUP_DAYS = 366
+
+
+class _PartFile:
+    """One archive file being written: gzip NDJSON into a spooled temp file."""
+
+    def __init__(self, key, day):
+        self.key = key
+        self.day = day
+        self.order_ids = []
+        self._spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES)
+        self._gzip = gzip.GzipFile(fileobj=self._spool, mode="wb")
+
+    def write(self, order):
+        self._gzip.write((json.dumps(order, sort_keys=True, default=str) + "\n").encode())
+        self.order_ids.append(order["order_id"])
+
+    def finish(self):
+        """Close the gzip stream; returns the file object rewound for upload."""
+        self._gzip.close()
+        self._spool.seek(0)
+        return self._spool
+
+    def discard(self):
+        self._gzip.close()
+        self._spool.close()
+
+
+class OrderArchive:
+    """
+    `ddb` is a DynamoDBClient, `s3` an S3Client. When `stats` (KitchenStats)
+    is given, the dashboard counters are moved from the order statuses to
+    `archived_orders` as orders leave the table.
+    """
+
+    def __init__(self, ddb, s3, bucket, table="Orders", prefix=ARCHIVE_PREFIX, stats=None):
+        self.ddb = ddb
+        self.s3 = s3
+        self.bucket = bucket
+        self.table = table
+        self.prefix = prefix.rstrip("/")
+        self.stats = stats
+
+    # writing
+    def archive(self, older_than_days, statuses=ARCHIVED_STATUSES, rows_per_file=ROWS_PER_FILE,
+                page_size=500, dry_run=False):
+        """
+        Archive orders in `statuses` created more than `older_than_days` ago.
+        Returns {"cutoff", "orders", <status>: count, "files": [keys]}; with
+        `dry_run` only counts what would be moved.
+        """
+        cutoff = (datetime.now(timezone.utc) - timedelta(days=older_than_days)).isoformat(timespec="microseconds")
+        summary = {"cutoff": cutoff, "orders": 0, "files": []}
+
+        for status in statuses:
+            summary[status] = 0
+            part = None
+            for order in self._expired(status, cutoff, page_size):
+                day = order["created_at"][:10]
+                if part and (part.day != day or len(part.order_ids) >= rows_per_file):
+                    self._commit(part, status, summary, dry_run)
+                    part = None
+                if part is None:
+                    part = _PartFile(f"{self.prefix}/dt={day}/{status}-{order['order_id']}.ndjson.gz", day)
+                part.write(order)
+            if part:
+                self._commit(part, status, summary, dry_run)
+        return summary
+
+    def _expired(self, status, cutoff, page_size):
+        """Orders with `status` created before `cutoff`, oldest first."""
+        start_key = None
+        while True:
+            orders, start_key = self.ddb.query_page(
+                self.table,
+                Key("order_status").eq(status) & Key("created_at").lt(cutoff),
+                index_name=ORDERS_STATUS_INDEX,
+                limit=page_size,
+                start_key=start_key,
+            )
+            yield from orders
+            if not start_key:
+                return
+
+    def _commit(self, part, status, summary, dry_run):
+        """Upload one file, then delete its orders from the table."""
+        count = len(part.order_ids)
+        if dry_run:
+            part.discard()
+        else:
+            body = part.finish()
+            try:
+                self.s3.upload_fileobj(self.bucket, part.key, body, content_type="application/x-ndjson")
+            finally:
+                body.close()
+            self.ddb.batch_write(self.table, deletes=[{"order_id": i} for i in part.order_ids])
+            if self.stats:
+                self.stats.try_add_orders({"total_orders": -count, status: -count, "archived_orders": count})
+        summary["orders"] += count
+        summary[status] += count
+        summary["files"].append(part.key)
+
+    # reading
+    def find(self, start, end, statuses=None, **match):
+        """
+        Yield archived orders created from `start` to `end` (dates, inclusive),
+        optionally limited to `statuses` and to orders whose fields equal
+        `match`, e.g. find(day, day, order_id="..."). Files of other statuses
+        are skipped without being read.
+        """
+        if (end - start).days >= MAX_LOOKUP_DAYS:
+            raise ValueError(f"Archive lookups are limited to {MAX_LOOKUP_DAYS} days")
+
+        day = start
+        while day <= end:
+            seen = set()  # a re-run after a partial delete can archive an order twice
+            for key in self.partition_keys(day):
+                status = key.rsplit("/", 1)[1].split("-", 1)[0]
+                if statuses and status not in statuses:
+                    continue
+                for order in self.read(key):
+                    if order["order_id"] in seen:
+                        continue
+                    if all(order.get(k) == v for k, v in match.items()):
+                        seen.add(order["order_id"])
+                        yield order
+            day += timedelta(days=1)
+
+    def partition_keys(self, day):
+        """Keys of the archive files for orders created on `day`."""
+        paginator = self.s3.client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=f"{self.prefix}/dt={day.isoformat()}/"):
+            for obj in page.get("Contents", []):
+                yield obj["Key"]
+
+    def read(self, key):
+        """Stream the orders in one archive file."""
+        body = self.s3.client.get_object(Bucket=self.bucket, Key=key)["Body"]
+        with gzip.GzipFile(fileobj=body, mode="rb") as lines:
+            for line in lines:
+                yield json.loads(line)
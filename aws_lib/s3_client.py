@@ -1,9 +1,101 @@
+import threading
+import time
+
+from boto3.s3.transfer import TransferConfig
+
 from .base_client import AWSBaseClient
 
+# Managed transfer settings for server-side uploads: multipart above 8 MB,
+# parts uploaded in parallel
+UPLOAD_TRANSFER_CONFIG = TransferConfig(
+    multipart_threshold=8 * 1024 * 1024,
+    multipart_chunksize=8 * 1024 * 1024,
+    max_concurrency=8,
+    use_threads=True,
+)
+
 class S3Client(AWSBaseClient):
     def __init__(self):
         super().__init__("s3")
 
     def upload_file(self, bucket, key, file_path):
-        self.client.upload_file(file_path, bucket, key)
+        self.client.upload_file(file_path, bucket, key, Config=UPLOAD_TRANSFER_CONFIG)
         return f"s3://{bucket}/{key}"
+
+    def upload_fileobj(self, bucket, key, fileobj, content_type=None):
+        """Managed (multipart when large) upload of a file-like object."""
+        extra = {"ContentType": content_type} if content_type else None
+        self.client.upload_fileobj(fileobj, bucket, key, ExtraArgs=extra, Config=UPLOAD_TRANSFER_CONFIG)
+        return f"s3://{bucket}/{key}"
+
+    def presigned_post(self, bucket, key, content_type, max_bytes, expires_in=300):
+        """
+        Presigned POST policy letting a browser upload one object straight to S3.
+        The upload must use exactly `key` and `content_type` and be at most `max_bytes`.
+        Returns {"url", "fields"}.
+        """
+        return self.client.generate_presigned_post(
+            bucket,
+            key,
+            Fields={"Content-Type": content_type},
+            Conditions=[
+                {"Content-Type": content_type},
+                ["content-length-range", 1, max_bytes],
+            ],
+            ExpiresIn=expires_in
+        )
+
+
+class PresignedUrlCache:
+    """
+    Reuses presigned GET URLs per S3 key until shortly before they expire,
+    so repeated requests get the identical URL, which lets browsers and
+    proxies cache the image.
+
+    A signature covers its signing time, so URLs signed separately always
+    differ: without `store` each worker process hands out its own URL.
+    `store` is an optional shared cache with get/set(key, value, timeout)
+    (e.g. a Django cache) through which workers reuse one signed URL.
+    """
+
+    def __init__(self, s3, bucket, expires_in=3600, refresh_before=300, store=None):
+        self.s3 = s3
+        self.bucket = bucket
+        self.expires_in = expires_in
+        self.refresh_before = refresh_before
+        self.store = store
+        self._urls = {}
+        self._lock = threading.Lock()
+
+    def get_url(self, key):
+        """Returns (url, seconds until it expires)."""
+        now = int(time.time())
+        cache_key = f"presigned:{self.bucket}:{key}"
+
+        with self._lock:
+            entry = self._urls.get(cache_key)
+        if entry is None and self.store is not None:
+            entry = self.store.get(cache_key)
+        if entry and entry[1] - now > self.refresh_before:
+            with self._lock:
+                self._urls[cache_key] = entry
+            return entry[0], entry[1] - now
+
+        lifetime = self.expires_in
+        expires_at = now + lifetime
+        url = self.s3.client.generate_presigned_url(
+            "get_object",
+            Params={
+                "Bucket": self.bucket,
+                "Key": key,
+                "ResponseCacheControl": f"private, max-age={lifetime - self.refresh_before}",
+            },
+            ExpiresIn=lifetime
+        )
+
+        entry = (url, expires_at)
+        with self._lock:
+            self._urls[cache_key] = entry
+        if self.store is not None:
+            self.store.set(cache_key, entry, lifetime - self.refresh_before)
+        return url, lifetime
@@ -1,4 +1,5 @@
 from .base_client import AWSBaseClient
+from .sns_utils import publish_batch
 
 class SNSClient(AWSBaseClient):
     def __init__(self):
@@ -9,3 +10,7 @@ class SNSClient(AWSBaseClient):
             TopicArn=topic_arn,
             Message=message
         )
+
+    def publish_batch(self, topic_arn, messages):
+        """Publish many messages, 10 per PublishBatch call. Returns failed entries."""
+        return publish_batch(self.client, topic_arn, messages)
@@ -0,0 +1,171 @@
+import os
+import threading
+import time
+from decimal import Decimal
+
+from botocore.exceptions import ClientError
+
+# PublishBatch accepts at most 10 entries per call
+PUBLISH_BATCH_SIZE = 10
+
+# Error codes meaning the topic no longer exists (e.g. it was recreated)
+TOPIC_NOT_FOUND_CODES = {"NotFound", "NotFoundException"}
+
+# Repeat alerts for the same item are suppressed for this long
+ALERT_WINDOW_SECONDS = int(os.getenv("LOW_STOCK_ALERT_WINDOW_SECONDS", "900"))
+
+
+def publish_batch(sns, topic_arn, messages):
+    """
+    Publish messages with PublishBatch, 10 per call.
+    `sns` is a low-level boto3 SNS client. Returns the failed entries.
+    """
+    failed = []
+    for start in range(0, len(messages), PUBLISH_BATCH_SIZE):
+        chunk = messages[start:start + PUBLISH_BATCH_SIZE]
+        resp = sns.publish_batch(
+            TopicArn=topic_arn,
+            PublishBatchRequestEntries=[
+                {"Id": str(start + i), "Message": message}
+                for i, message in enumerate(chunk)
+            ]
+        )
+        failed += resp.get("Failed", [])
+    return failed
+
+
+class LowStockAlerts:
+    """
+    Collects low-stock events for one Lambda invocation or web request and
+    sends them as a single PublishBatch.
+
+    Events are deduped per item, and an item is only alerted if it has not
+    been alerted within `window_seconds`. The "last alerted at" marker lives
+    on the Inventory item itself (`last_alerted_at`) and is claimed with a
+    conditional update, so suppression holds across invocations and workers.
+    Claims of alerts that fail to publish are released again.
+
+    If the topic is not found and `refresh_topic` is given, it is called for
+    the current ARN (e.g. after dropping a cached one) and the publish is
+    retried once.
+    """
+
+    def __init__(self, sns, topic_arn, inventory_table, window_seconds=ALERT_WINDOW_SECONDS, refresh_topic=None):
+        self.sns = sns
+        self.topic_arn = topic_arn
+        self.refresh_topic = refresh_topic
+        self.inventory_table = inventory_table
+        self.window_seconds = window_seconds
+        self._pending = {}
+
+    def add(self, item_id, name, qty):
+        """Record a low-stock event. Later events for the same item replace earlier ones."""
+        self._pending[item_id] = (name, qty)
+
+    def flush(self, background=False):
+        """
+        Send the collected alerts. With background=True the send runs on a
+        daemon thread (returned) so it stays off the request path.
+        """
+        pending, self._pending = self._pending, {}
+        if not pending:
+            return None
+        if background:
+            thread = threading.Thread(target=self._send, args=(pending,), daemon=True)
+            thread.start()
+            return thread
+        self._send(pending)
+        return None
+
+    def _claim(self, item_id):
+        """
+        Set last_alerted_at unless the item was alerted inside the window.
+        Returns the claim (timestamp, previous last_alerted_at) or None.
+        """
+        now = Decimal(int(time.time()))
+        try:
+            resp = self.inventory_table.update_item(
+                Key={"item_id": item_id},
+                UpdateExpression="SET last_alerted_at = :now",
+                ConditionExpression=(
+                    "attribute_exists(item_id) AND "
+                    "(attribute_not_exists(last_alerted_at) OR last_alerted_at < :cutoff)"
+                ),
+                ExpressionAttributeValues={
+                    ":now": now,
+                    ":cutoff": now - self.window_seconds,
+                },
+                ReturnValues="UPDATED_OLD",
+            )
+        except ClientError as e:
+            if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+                raise
+            return None
+        return now, resp.get("Attributes", {}).get("last_alerted_at")
+
+    def _release(self, item_id, claim):
+        """Undo a claim whose alert was not published, unless another sender has claimed since."""
+        claimed_at, previous = claim
+        update = {"UpdateExpression": "REMOVE last_alerted_at", "ExpressionAttributeValues": {":claimed": claimed_at}}
+        if previous is not None:
+            update = {
+                "UpdateExpression": "SET last_alerted_at = :previous",
+                "ExpressionAttributeValues": {":claimed": claimed_at, ":previous": previous},
+            }
+        try:
+            self.inventory_table.update_item(
+                Key={"item_id": item_id},
+                ConditionExpression="last_alerted_at = :claimed",
+                **update
+            )
+        except ClientError as e:
+            if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+                raise
+
+    def _publish(self, messages):
+        try:
+            return publish_batch(self.sns, self.topic_arn, messages)
+        except ClientError as e:
+            if self.refresh_topic is None or e.response["Error"]["Code"] not in TOPIC_NOT_FOUND_CODES:
+                raise
+            self.topic_arn = self.refresh_topic()
+            return publish_batch(self.sns, self.topic_arn, messages)
+
+    def _send(self, pending):
+        """
+        Claim each item, publish, then release the claims of alerts that were
+        not published, so a failure does not suppress them for the window.
+        An item whose claim errors (e.g. TransactionConflictException while an
+        order transaction holds it) is skipped, not the whole send.
+        """
+        claims, published = [], set()
+        try:
+            for item_id, (name, qty) in pending.items():
+                try:
+                    claim = self._claim(item_id)
+                except Exception as e:
+                    print(f"Low stock alert for {name} not claimed: {e}")
+                    continue
+                if claim:
+                    claims.append((item_id, claim, f"Low stock alert: {name} has qty {qty}"))
+
+            for start in range(0, len(claims), PUBLISH_BATCH_SIZE):
+                chunk = claims[start:start + PUBLISH_BATCH_SIZE]
+                try:
+                    failed = self._publish([message for _, _, message in chunk])
+                except Exception as e:
+                    print(f"Error sending low stock alerts: {e}")
+                    continue
+                failed_ids = set()
+                for entry in failed:
+                    print(f"Low stock alert failed: {entry.get('Code')} {entry.get('Message')}")
+                    failed_ids.add(int(entry["Id"]))
+                published.update(start + i for i in range(len(chunk)) if i not in failed_ids)
+        finally:
+            for i, (item_id, claim, _) in enumerate(claims):
+                if i in published:
+                    continue
+                try:
+                    self._release(item_id, claim)
+                except Exception as e:
+                    print(f"Low stock alert claim on {item_id} not released: {e}")
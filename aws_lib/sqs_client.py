@@ -1,5 +1,12 @@
+import threading
+import time
+
 from .base_client import AWSBaseClient
 
+# SendMessageBatch accepts at most 10 entries per call
+SEND_BATCH_SIZE = 10
+
+
 class SQSClient(AWSBaseClient):
     def __init__(self):
         super().__init__("sqs")
@@ -10,10 +17,132 @@ class SQSClient(AWSBaseClient):
             MessageBody=body
         )
 
-    def receive_messages(self, queue_url, max_messages=1):
+    def send_messages_batch(self, queue_url, bodies, max_retries=3):
+        """
+        Send many messages with SendMessageBatch, 10 per call.
+        Only the entries SQS reports as failed are retried (with backoff).
+        Returns the bodies that still failed after `max_retries`.
+        """
+        failed = []
+        for start in range(0, len(bodies), SEND_BATCH_SIZE):
+            pending = {str(i): body for i, body in enumerate(bodies[start:start + SEND_BATCH_SIZE])}
+
+            for attempt in range(max_retries + 1):
+                if attempt:
+                    time.sleep(0.1 * 2 ** attempt)
+                resp = self.client.send_message_batch(
+                    QueueUrl=queue_url,
+                    Entries=[{"Id": i, "MessageBody": b} for i, b in pending.items()]
+                )
+                retryable = {}
+                for entry in resp.get("Failed", []):
+                    if entry.get("SenderFault"):
+                        failed.append(pending[entry["Id"]])  # retrying won't help
+                    else:
+                        retryable[entry["Id"]] = pending[entry["Id"]]
+                pending = retryable
+                if not pending:
+                    break
+
+            failed += pending.values()
+        return failed
+
+    def receive_messages(self, queue_url, max_messages=1, wait_seconds=5, visibility_timeout=None):
+        kwargs = {}
+        if visibility_timeout is not None:
+            kwargs["VisibilityTimeout"] = visibility_timeout
         resp = self.client.receive_message(
             QueueUrl=queue_url,
             MaxNumberOfMessages=max_messages,
-            WaitTimeSeconds=5
+            WaitTimeSeconds=wait_seconds,
+            **kwargs
         )
         return resp.get("Messages", [])
+
+    def delete_messages_batch(self, queue_url, receipt_handles):
+        """Delete messages with DeleteMessageBatch, 10 per call. Returns failed entries."""
+        failed = []
+        for start in range(0, len(receipt_handles), SEND_BATCH_SIZE):
+            chunk = receipt_handles[start:start + SEND_BATCH_SIZE]
+            resp = self.client.delete_message_batch(
+                QueueUrl=queue_url,
+                Entries=[{"Id": str(i), "ReceiptHandle": h} for i, h in enumerate(chunk)]
+            )
+            failed += resp.get("Failed", [])
+        return failed
+
+    def change_visibility_batch(self, queue_url, receipt_handles, timeout):
+        """Reset the visibility timeout of in-flight messages, 10 per call."""
+        for start in range(0, len(receipt_handles), SEND_BATCH_SIZE):
+            chunk = receipt_handles[start:start + SEND_BATCH_SIZE]
+            self.client.change_message_visibility_batch(
+                QueueUrl=queue_url,
+                Entries=[
+                    {"Id": str(i), "ReceiptHandle": h, "VisibilityTimeout": timeout}
+                    for i, h in enumerate(chunk)
+                ]
+            )
+
+
+class BufferedProducer:
+    """
+    Buffers message bodies and sends them with SendMessageBatch once
+    `max_batch` are queued or the oldest has waited `max_wait` seconds.
+    Use as a context manager so the remainder is flushed on exit.
+    Bodies that could not be sent collect in `failed`, and the exceptions
+    that stopped a batch in `errors`.
+    """
+
+    def __init__(self, sqs, queue_url, max_batch=SEND_BATCH_SIZE, max_wait=0.5):
+        self.sqs = sqs
+        self.queue_url = queue_url
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.failed = []
+        self.errors = []
+        self._buffer = []
+        self._lock = threading.Lock()
+        self._send_lock = threading.Lock()  # one flush sends at a time
+        self._timer = None
+
+    def send(self, body):
+        with self._lock:
+            self._buffer.append(body)
+            if len(self._buffer) < self.max_batch:
+                if self._timer is None:
+                    self._timer = threading.Timer(self.max_wait, self.flush)
+                    self._timer.daemon = True
+                    self._timer.start()
+                return
+        self.flush()
+
+    def flush(self):
+        """
+        Send everything buffered. Bodies that could not be sent collect in
+        `failed`. Flushes are serialized, so one that returns has also waited
+        for any flush already sending (e.g. from the timer thread).
+        """
+        with self._send_lock:
+            with self._lock:
+                batch, self._buffer = self._buffer, []
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+            if not batch:
+                return
+            error = None
+            try:
+                failed = self.sqs.send_messages_batch(self.queue_url, batch)
+            except Exception as e:
+                print(f"Error sending message batch: {e}")
+                failed, error = batch, e
+            with self._lock:
+                self.failed += failed
+                if error is not None:
+                    self.errors.append(error)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.flush()
@@ -0,0 +1,233 @@
+"""
+AWS call tracing.
+
+`instrument(client)` registers botocore event hooks that time every API call
+and record its consumed capacity and payload bytes. Each call is added to:
+
+- the process-wide `registry` (exported by the /metrics view), and
+- the active `Trace`, if any: one per web request (kitchen.middleware) or
+  Lambda invocation, held in a context variable.
+
+Thread pools do not inherit context variables; wrap work submitted to them
+with `propagate()` so their calls land in the caller's trace.
+"""
+import contextlib
+import contextvars
+import json
+import threading
+import time
+from collections import defaultdict
+
+_current = contextvars.ContextVar("aws_trace", default=None)
+
+
+class OperationStats:
+    """Running totals for one service.Operation."""
+
+    __slots__ = ("calls", "errors", "seconds", "capacity", "bytes_out", "bytes_in")
+
+    def __init__(self):
+        self.calls = self.errors = self.bytes_out = self.bytes_in = 0
+        self.seconds = self.capacity = 0.0
+
+    def add(self, seconds, error, capacity, bytes_out, bytes_in):
+        self.calls += 1
+        self.errors += error
+        self.seconds += seconds
+        self.capacity += capacity
+        self.bytes_out += bytes_out
+        self.bytes_in += bytes_in
+
+
+class Trace:
+    """AWS calls made while serving one request / invocation, by operation."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.operations = defaultdict(OperationStats)
+        self._lock = threading.Lock()
+
+    def add(self, operation, *stats):
+        with self._lock:
+            self.operations[operation].add(*stats)
+
+    def totals(self):
+        """(calls, seconds, capacity units) over every operation so far."""
+        with self._lock:
+            ops = list(self.operations.values())
+        return (
+            sum(o.calls for o in ops),
+            sum(o.seconds for o in ops),
+            sum(o.capacity for o in ops),
+        )
+
+    def server_timing(self, total_seconds):
+        """Server-Timing header value: the whole request, all AWS time, then each operation."""
+        calls, seconds, _ = self.totals()
+        entries = [
+            f"app;dur={total_seconds * 1000:.1f}",
+            f'aws;dur={seconds * 1000:.1f};desc="{calls} calls"',
+        ]
+        with self._lock:
+            ops = sorted(self.operations.items(), key=lambda kv: -kv[1].seconds)
+        entries += [f'{name};dur={o.seconds * 1000:.1f};desc="{o.calls}x"' for name, o in ops]
+        return ", ".join(entries)
+
+
+class MetricsRegistry:
+    """Process-wide AWS call and per-view totals, rendered in Prometheus text format."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.operations = defaultdict(OperationStats)
+        self.views = defaultdict(lambda: {"requests": 0, "seconds": 0.0, "aws_calls": 0, "aws_seconds": 0.0})
+
+    def record_call(self, operation, *stats):
+        with self._lock:
+            self.operations[operation].add(*stats)
+
+    def record_view(self, view, seconds, trace):
+        calls, aws_seconds, _ = trace.totals()
+        with self._lock:
+            totals = self.views[view]
+            totals["requests"] += 1
+            totals["seconds"] += seconds
+            totals["aws_calls"] += calls
+            totals["aws_seconds"] += aws_seconds
+
+    def prometheus(self):
+        with self._lock:
+            operations = {k: (o.calls, o.errors, o.seconds, o.capacity, o.bytes_out, o.bytes_in)
+                          for k, o in self.operations.items()}
+            views = {k: dict(v) for k, v in self.views.items()}
+
+        lines = []
+
+        def metric(name, kind, help_text, samples):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                label_text = ",".join(f'{k}="{v}"' for k, v in labels.items())
+                lines.append(f"{name}{{{label_text}}} {value}")
+
+        def op_labels(operation):
+            service, op = operation.split(".", 1)
+            return {"service": service, "operation": op}
+
+        for index, (name, kind, help_text) in enumerate((
+            ("aws_calls_total", "counter", "AWS API calls."),
+            ("aws_call_errors_total", "counter", "AWS API calls that returned an error."),
+            ("aws_call_seconds_total", "counter", "Time spent in AWS API calls, including retries."),
+            ("aws_consumed_capacity_units_total", "counter", "DynamoDB capacity units consumed."),
+            ("aws_request_bytes_total", "counter", "Request payload bytes sent to AWS."),
+            ("aws_response_bytes_total", "counter", "Response payload bytes received from AWS."),
+        )):
+            metric(name, kind, help_text, [
+                (op_labels(op), values[index]) for op, values in sorted(operations.items())
+            ])
+
+        for key, name, help_text in (
+            ("requests", "view_requests_total", "Requests served, by view."),
+            ("seconds", "view_seconds_total", "Time spent serving requests, by view."),
+            ("aws_calls", "view_aws_calls_total", "AWS API calls made while serving requests, by view."),
+            ("aws_seconds", "view_aws_seconds_total", "Time spent in AWS API calls, by view."),
+        ):
+            metric(name, "counter", help_text, [({"view": v}, t[key]) for v, t in sorted(views.items())])
+
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+
+# traces
+def current_trace():
+    return _current.get()
+
+
+@contextlib.contextmanager
+def trace():
+    """Collect the AWS calls made in this context (and in `propagate()`d work)."""
+    t = Trace()
+    token = _current.set(t)
+    try:
+        yield t
+    finally:
+        _current.reset(token)
+
+
+def propagate(fn):
+    """Wrap `fn` to run in a copy of the caller's context, e.g. on a thread pool."""
+    ctx = contextvars.copy_context()
+    return lambda *args, **kwargs: ctx.copy().run(fn, *args, **kwargs)
+
+
+@contextlib.contextmanager
+def stage(name, **fields):
+    """
+    Time a block and print one JSON line with its duration and the AWS calls
+    it made, e.g. {"stage": "fetch_recipes", "ms": 12.3, "aws_calls": 1, ...}.
+    Starts a trace if none is active.
+    """
+    with contextlib.ExitStack() as stack:
+        t = current_trace() or stack.enter_context(trace())
+        calls, seconds, capacity = t.totals()
+        started = time.perf_counter()
+        yield fields
+        end_calls, end_seconds, end_capacity = t.totals()
+        print(json.dumps({
+            "stage": name,
+            "ms": round((time.perf_counter() - started) * 1000, 1),
+            "aws_calls": end_calls - calls,
+            "aws_ms": round((end_seconds - seconds) * 1000, 1),
+            "capacity_units": round(end_capacity - capacity, 2),
+            **fields,
+        }))
+
+
+# botocore hooks
+def instrument(client):
+    """Register tracing hooks on a low-level boto3 client. Returns the client."""
+    events = client.meta.events
+    service = client.meta.service_model.service_name
+    if service == "dynamodb":
+        events.register("before-parameter-build.dynamodb", _request_capacity)
+    events.register("before-call", _before_call)
+    events.register("after-call", lambda **kwargs: _after_call(service, **kwargs))
+    events.register("after-call-error", lambda **kwargs: _after_call(service, **kwargs))
+    return client
+
+
+def _request_capacity(params, model, **kwargs):
+    # DynamoDB only reports consumed capacity when asked for it
+    if "ReturnConsumedCapacity" in model.input_shape.members:
+        params.setdefault("ReturnConsumedCapacity", "TOTAL")
+
+
+def _before_call(model, params, context, **kwargs):
+    body = params.get("body") if isinstance(params, dict) else None
+    context["trace_started"] = time.perf_counter()
+    context["trace_operation"] = model.name
+    context["trace_bytes_out"] = len(body) if isinstance(body, (bytes, str)) else 0
+
+
+def _after_call(service, context, http_response=None, parsed=None, exception=None, **kwargs):
+    started = context.pop("trace_started", None)
+    if started is None:
+        return
+    seconds = time.perf_counter() - started
+    parsed = parsed or {}
+    error = exception is not None or "Error" in parsed
+    bytes_in = len(http_response.content or b"") if http_response is not None else 0
+
+    consumed = parsed.get("ConsumedCapacity") or []
+    if isinstance(consumed, dict):
+        consumed = [consumed]
+    capacity = sum(c.get("CapacityUnits", 0) for c in consumed)
+
+    stats = (seconds, int(error), capacity, context.pop("trace_bytes_out", 0), bytes_in)
+    operation = f"{service}.{context.pop('trace_operation')}"
+    registry.record_call(operation, *stats)
+    t = _current.get()
+    if t is not None:
+        t.add(operation, *stats)
@@ -0,0 +1,91 @@
+"""
+Micro-benchmark: DynamoDB item conversion on a 10k-item scan.
+
+Compares the resource-layer path DynamoDBClient uses today (boto3
+TypeDeserializer -> Decimal, then DynamoDBClient._deserialize) with the
+single-pass wire-format path used by LowLevelDynamoDBClient, for both
+reads (scan results) and writes (put_item payloads).
+
+    python benchmarks/bench_deserialize.py [--items 10000] [--repeat 5]
+"""
+import argparse
+import os
+import sys
+import timeit
+import uuid
+
+from boto3.dynamodb.types import TypeDeserializer, TypeSerializer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from aws_lib.dynamodb_client import DynamoDBClient, deserialize_item, serialize_item
+
+
+def make_items(n):
+    """Order- and recipe-shaped items, as plain Python."""
+    items = []
+    for i in range(n):
+        if i % 2:
+            items.append({
+                "order_id": str(uuid.uuid4()),
+                "recipe": str(uuid.uuid4()),
+                "order_status": "COMPLETED",
+                "created_at": "2026-10-18T12:00:00.000000+00:00",
+            })
+        else:
+            items.append({
+                "recipe_id": str(uuid.uuid4()),
+                "name": f"recipe {i}",
+                "ingredients": {"bun": 1, "patty": 2, "tomato": 3, "cheese": 1, "sauce": 0.5},
+                "s3_key": None,
+            })
+    return items
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--items", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    client = DynamoDBClient.__new__(DynamoDBClient)  # conversion only, no AWS session
+    ser, deser = TypeSerializer(), TypeDeserializer()
+
+    plain = make_items(args.items)
+    wire = [serialize_item(i) for i in plain]
+
+    def resource_read():
+        return [
+            client._deserialize({k: deser.deserialize(v) for k, v in item.items()})
+            for item in wire
+        ]
+
+    def wire_read():
+        return [deserialize_item(item) for item in wire]
+
+    def resource_write():
+        return [
+            {k: ser.serialize(v) for k, v in client._convert_to_decimal(item).items()}
+            for item in plain
+        ]
+
+    def wire_write():
+        return [serialize_item(item) for item in plain]
+
+    assert resource_read() == wire_read()
+
+    print(f"{args.items} items, best of {args.repeat}")
+    for label, current, fast in (
+        ("read (scan)", resource_read, wire_read),
+        ("write (put)", resource_write, wire_write),
+    ):
+        t_current = min(timeit.repeat(current, number=1, repeat=args.repeat))
+        t_fast = min(timeit.repeat(fast, number=1, repeat=args.repeat))
+        print(
+            f"{label:12} resource+_deserialize {t_current * 1000:8.1f} ms   "
+            f"single-pass {t_fast * 1000:8.1f} ms   {t_current / t_fast:4.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,367 @@
+"""
+End-to-end order pipeline benchmark, fully offline.
+
+Runs against in-process AWS stand-ins (moto) and drives orders through the
+real code: the create_order view -> SQS -> lambda_function.lambda_handler ->
+DynamoDB/SNS, plus dashboard loads. For every inventory x recipe size it
+reports p50/p95/p99 latency per stage, orders/sec and AWS calls per order.
+
+    pip install "moto[dynamodb,sqs,sns,s3]"
+    python benchmarks/bench_order_pipeline.py --inventory 100,100000 --recipes 10,1000 \\
+        --orders 500 --json bench.json
+    python benchmarks/bench_order_pipeline.py --baseline bench.json   # exit 1 on more AWS calls
+
+Orders are created in waves of --batch-size (an SQS receive / Lambda batch);
+end-to-end latency is from the create_order call to the handler committing
+the wave. AWS call counts are deterministic for a given --seed, so the
+baseline check catches extra scans or round trips before deploy.
+
+With AWS_BACKEND=memory (or sqlite:<path>) the same run uses aws_lib's local
+backend instead of moto, so the numbers show the app's own overhead.
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Fake credentials and the account in the Lambda's hard-coded topic ARN,
+# set before any boto3 client exists
+os.environ.update({
+    "AWS_ACCESS_KEY_ID": "testing",
+    "AWS_SECRET_ACCESS_KEY": "testing",
+    "AWS_SESSION_TOKEN": "testing",
+    "AWS_DEFAULT_REGION": "us-east-1",
+    "MOTO_ACCOUNT_ID": "326603068904",
+})
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "cloudkitchen.settings")
+
+from botocore.client import BaseClient
+
+if (os.getenv("AWS_BACKEND") or "aws") == "aws":
+    from moto import mock_aws  # hooks into clients created from here on
+
+import django
+
+django.setup()
+
+from django.contrib.auth.models import User
+from django.test import RequestFactory
+
+import aws_config
+import infra_setup
+import lambda_function
+from aws_lib import backend
+from aws_lib.dynamodb_client import DynamoDBClient
+from aws_lib.kitchen_stats import STATS_KEY
+from aws_lib.sqs_client import SQSClient
+from kitchen import views
+from kitchen.inventory_snapshot import inventory_snapshot
+from kitchen.recipe_cache import recipe_cache
+
+LOW_STOCK_TOPIC = lambda_function.SNS_TOPIC_ARN.rsplit(":", 1)[1]
+
+
+class CallCounter:
+    """Counts botocore API calls ("service.Operation") for the current phase."""
+
+    def __init__(self):
+        self.phase = None
+        self.calls = {}
+        self._original = BaseClient._make_api_call
+
+    def install(self):
+        counter, original = self, self._original
+
+        def counted(client, operation_name, api_params):
+            if counter.phase:
+                key = f"{client.meta.service_model.service_name}.{operation_name}"
+                counter.calls.setdefault(counter.phase, Counter())[key] += 1
+            return original(client, operation_name, api_params)
+
+        BaseClient._make_api_call = counted
+
+    def uninstall(self):
+        BaseClient._make_api_call = self._original
+
+    @contextlib.contextmanager
+    def counting(self, phase):
+        self.phase = phase
+        try:
+            yield
+        finally:
+            self.phase = None
+
+    def per_unit(self, phases, units):
+        total = Counter()
+        for phase in phases:
+            total.update(self.calls.get(phase, {}))
+        return {
+            "total": round(sum(total.values()) / units, 3),
+            "by_operation": {op: round(n / units, 3) for op, n in sorted(total.items())},
+        }
+
+
+def percentiles(samples):
+    """p50/p95/p99 of latencies in seconds, as milliseconds."""
+    if not samples:
+        return {}
+    if len(samples) == 1:
+        p50 = p95 = p99 = samples[0]
+    else:
+        cuts = statistics.quantiles(samples, n=100, method="inclusive")
+        p50, p95, p99 = cuts[49], cuts[94], cuts[98]
+    return {
+        "p50": round(p50 * 1000, 3),
+        "p95": round(p95 * 1000, 3),
+        "p99": round(p99 * 1000, 3),
+    }
+
+
+# setup
+def create_infra():
+    with contextlib.redirect_stdout(io.StringIO()):
+        infra_setup.create_table(infra_setup.ORDERS_TABLE, "order_id", indexes=[("order_status", "created_at")])
+        infra_setup.create_table(infra_setup.INVENTORY_TABLE, "item_id", indexes=["name"])
+        infra_setup.create_table(infra_setup.RECIPES_TABLE, "recipe_id")
+        infra_setup.create_table(infra_setup.STATS_TABLE, "stat_id")
+        infra_setup.create_topic(LOW_STOCK_TOPIC)
+
+
+def seed(ddb, rng, inventory_size, recipe_count, ingredients_per_recipe, stock):
+    inventory = [
+        {"item_id": f"item-{i}", "name": f"ingredient-{i}", "qty": stock}
+        for i in range(inventory_size)
+    ]
+    names = [i["name"] for i in inventory]
+    recipes = [
+        {
+            "recipe_id": f"recipe-{r}",
+            "name": f"Recipe {r}",
+            "ingredients": {
+                name: rng.randint(1, 3)
+                for name in rng.sample(names, min(ingredients_per_recipe, len(names)))
+            },
+        }
+        for r in range(recipe_count)
+    ]
+    ddb.batch_write("Inventory", puts=inventory)
+    ddb.batch_write("Recipes", puts=recipes)
+    ddb.put("Stats", {**STATS_KEY, "total_orders": 0, "PENDING": 0, "COMPLETED": 0, "FAILED": 0})
+    return [r["recipe_id"] for r in recipes]
+
+
+def reset_process_caches():
+    """Forget everything cached from the previous scenario's (now discarded) AWS state."""
+    lambda_function.item_ids_by_name.clear()
+    aws_config.forget_resolved()
+    recipe_cache.invalidate()
+    inventory_snapshot.invalidate()
+
+
+# pipeline
+def signed_in(request, user):
+    """Attach `user` the way AuthenticationMiddleware does (user and auser)."""
+    async def auser():
+        return user
+    request.user = user
+    request.auser = auser
+    return request
+
+
+def run_wave(loop, factory, user, sqs, recipe_ids, rng, size, samples):
+    """Create `size` orders through the view, then receive and handle them like Lambda."""
+    started = []
+    for _ in range(size):
+        request = signed_in(factory.post("/orders/create/", {"recipe": rng.choice(recipe_ids)}), user)
+        t0 = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            response = loop.run_until_complete(views.create_order(request))
+        samples["create_order"].append(time.perf_counter() - t0)
+        if response.status_code != 302:
+            raise RuntimeError(f"create_order returned {response.status_code}")
+        started.append(t0)
+
+    queue_url = aws_config.get_sqs_url()
+    handled = 0
+    while handled < size:
+        messages = sqs.receive_messages(queue_url, max_messages=10, wait_seconds=0)
+        if not messages:
+            raise RuntimeError(f"Queue drained after {handled} of {size} orders")
+        event = {"Records": [
+            {"messageId": m["MessageId"], "receiptHandle": m["ReceiptHandle"],
+             "body": m["Body"], "eventSource": "aws:sqs"}
+            for m in messages
+        ]}
+        t0 = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = lambda_function.lambda_handler(event, None)
+        samples["lambda_batch"].append(time.perf_counter() - t0)
+
+        failed = {f["itemIdentifier"] for f in result["batchItemFailures"]}
+        done = [m["ReceiptHandle"] for m in messages if m["MessageId"] not in failed]
+        if done:
+            sqs.delete_messages_batch(queue_url, done)
+        handled += len(messages)
+
+    finished = time.perf_counter()
+    samples["end_to_end"] += [finished - t0 for t0 in started]
+
+
+def run_scenario(args, counter, inventory_size, recipe_count):
+    rng = random.Random(args.seed)
+    local = backend.active()
+    if local is None:
+        mock = mock_aws()
+    else:
+        local.reset()
+        mock = contextlib.nullcontext()
+    with mock:
+        reset_process_caches()
+        create_infra()
+        ddb = DynamoDBClient()
+        recipe_ids = seed(ddb, rng, inventory_size, recipe_count, args.ingredients_per_recipe, args.stock)
+
+        factory = RequestFactory()
+        user = User(username="bench")
+        sqs = SQSClient()
+        loop = asyncio.new_event_loop()
+        samples = {"create_order": [], "lambda_batch": [], "end_to_end": [], "dashboard": []}
+
+        started = time.perf_counter()
+        remaining = args.orders
+        while remaining:
+            size = min(args.batch_size, remaining)
+            with counter.counting("orders"):
+                run_wave(loop, factory, user, sqs, recipe_ids, rng, size, samples)
+            remaining -= size
+        elapsed = time.perf_counter() - started
+
+        for _ in range(args.dashboard_loads):
+            request = signed_in(factory.get("/"), user)
+            with counter.counting("dashboard"):
+                t0 = time.perf_counter()
+                response = loop.run_until_complete(views.dashboard(request))
+                samples["dashboard"].append(time.perf_counter() - t0)
+            if response.status_code != 200:
+                raise RuntimeError(f"dashboard returned {response.status_code}")
+
+        loop.close()
+        outcome = views.kitchen_stats().read()
+
+    return {
+        "inventory": inventory_size,
+        "recipes": recipe_count,
+        "orders": args.orders,
+        "seconds": round(elapsed, 3),
+        "orders_per_sec": round(args.orders / elapsed, 2),
+        "latency_ms": {stage: percentiles(s) for stage, s in samples.items()},
+        "aws_calls_per_order": counter.per_unit(["orders"], args.orders),
+        "aws_calls_per_dashboard": counter.per_unit(["dashboard"], max(args.dashboard_loads, 1)),
+        "outcome": {k: outcome.get(k, 0) for k in ("total_orders", "PENDING", "COMPLETED", "FAILED")},
+    }
+
+
+# reporting
+def scenario_key(result):
+    return result["inventory"], result["recipes"]
+
+
+def compare(results, baseline, max_increase):
+    """AWS call regressions against a previous --json file, as readable lines."""
+    previous = {scenario_key(r): r for r in baseline["scenarios"]}
+    regressions = []
+    for result in results:
+        before = previous.get(scenario_key(result))
+        if not before:
+            continue
+        for metric in ("aws_calls_per_order", "aws_calls_per_dashboard"):
+            old_ops = before[metric]["by_operation"]
+            for op, calls in result[metric]["by_operation"].items():
+                allowed = old_ops.get(op, 0) * (1 + max_increase)
+                if calls > allowed:
+                    regressions.append(
+                        f"inventory={result['inventory']} recipes={result['recipes']} "
+                        f"{metric} {op}: {old_ops.get(op, 0)} -> {calls}"
+                    )
+    return regressions
+
+
+def print_result(r):
+    print(f"\ninventory={r['inventory']} recipes={r['recipes']} orders={r['orders']}: "
+          f"{r['orders_per_sec']} orders/sec ({r['seconds']} s)")
+    for stage, p in r["latency_ms"].items():
+        if p:
+            print(f"  {stage:13} p50 {p['p50']:9.2f} ms   p95 {p['p95']:9.2f} ms   p99 {p['p99']:9.2f} ms")
+    for label, metric in (("per order", "aws_calls_per_order"), ("per dashboard", "aws_calls_per_dashboard")):
+        ops = ", ".join(f"{op} {n:g}" for op, n in r[metric]["by_operation"].items())
+        print(f"  AWS calls {label}: {r[metric]['total']:g} ({ops})")
+    print(f"  outcome: {r['outcome']}")
+
+
+def int_list(text):
+    return [int(v) for v in text.split(",") if v]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--inventory", type=int_list, default=[100, 1000], help="Comma-separated inventory sizes.")
+    parser.add_argument("--recipes", type=int_list, default=[10, 100], help="Comma-separated recipe counts.")
+    parser.add_argument("--orders", type=int, default=200, help="Orders per scenario.")
+    parser.add_argument("--batch-size", type=int, default=10, help="Orders per SQS receive / Lambda batch.")
+    parser.add_argument("--ingredients-per-recipe", type=int, default=5)
+    parser.add_argument("--stock", type=int, default=1000000, help="Starting qty of every inventory item.")
+    parser.add_argument("--dashboard-loads", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", help="Write machine-readable results to this file.")
+    parser.add_argument("--baseline", help="Previous --json results; exit 1 if AWS calls increased.")
+    parser.add_argument("--max-increase", type=float, default=0.05,
+                        help="Allowed fractional increase in calls per operation vs the baseline.")
+    args = parser.parse_args()
+
+    counter = CallCounter()
+    counter.install()
+    results = []
+    try:
+        for inventory_size in args.inventory:
+            for recipe_count in args.recipes:
+                counter.calls.clear()
+                result = run_scenario(args, counter, inventory_size, recipe_count)
+                print_result(result)
+                results.append(result)
+    finally:
+        counter.uninstall()
+
+    report = {
+        "benchmark": "order_pipeline",
+        "python": platform.python_version(),
+        "parameters": {k: v for k, v in vars(args).items() if k not in ("json", "baseline")},
+        "scenarios": results,
+    }
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nWrote {args.json}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.max_increase)
+        if regressions:
+            print("\nAWS call regressions:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print("\nNo AWS call regressions against the baseline.")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,15 @@ ASGI config for cloudkitchen project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+The dashboard and create_order views are async and fan their AWS calls out
+concurrently; serve them with an ASGI server, e.g.
+    uvicorn cloudkitchen.asgi:application --workers 4
+
+The other views are sync. Under ASGI Django runs each one through
+sync_to_async(thread_sensitive=True), so within one worker process they
+are serialized on a single thread: one slow sync view delays every other
+sync view in that worker. Size --workers for the sync traffic.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
 """
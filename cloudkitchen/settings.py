@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -41,6 +42,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'kitchen.middleware.aws_tracing_middleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -134,6 +136,41 @@ CSRF_TRUSTED_ORIGINS = [
 ]
 
 
+# Recipes read-through cache (kitchen/recipe_cache.py).
+# Set SHARED_BACKEND to a CACHES alias (e.g. redis/memcached) to keep
+# multiple gunicorn workers coherent after recipe edits.
+RECIPE_CACHE = {
+    "TTL": 60,
+    "MAX_SIZE": 1024,
+    "SHARED_BACKEND": None,
+}
+
+# Shared Inventory snapshot (kitchen/inventory_snapshot.py)
+INVENTORY_SNAPSHOT = {
+    "TTL": 5,
+}
+
+# Threads used by async views to run AWS calls concurrently
+AWS_FANOUT_WORKERS = 16
+
+# Clients allowed to read /metrics without logging in (the Prometheus
+# scraper); signed-in staff can always read it. Matched against REMOTE_ADDR,
+# so behind a proxy list the proxy only if it does not forward outside traffic.
+METRICS_ALLOWED_NETWORKS = ["127.0.0.0/8", "::1/128", "10.0.0.0/8", "172.16.0.0/12", "192.168.0.0/16"]
+
+# Finished orders older than AFTER_DAYS are moved to gzip NDJSON in S3
+# (manage.py archive_orders, aws_lib/order_archive.py)
+ORDER_ARCHIVE = {
+    "BUCKET": os.getenv("S3_RECIPE_BUCKET", "cloudkitchen-recipes"),
+    "PREFIX": "archive/orders",
+    "AFTER_DAYS": 30,
+}
+
+# "aws", "memory" or "sqlite:<path>" (local stand-ins), see aws_lib/backend.py.
+# Use sqlite when the order worker runs in its own process.
+AWS_BACKEND = os.getenv("AWS_BACKEND", "aws")
+
+
 LOGIN_URL = "login"
 LOGIN_REDIRECT_URL = "dashboard"
 LOGOUT_REDIRECT_URL = "login"
@@ -1,12 +1,14 @@
 # infra_setup.py
 import os
+import time
 from aws_config import dynamodb_resource, sqs_client, sns_client
-import boto3
+from aws_lib import backend
 
 # Get environment variables
 ORDERS_TABLE = os.getenv("DDB_ORDERS_TABLE", "Orders")
 INVENTORY_TABLE = os.getenv("DDB_INVENTORY_TABLE", "Inventory")
 RECIPES_TABLE = os.getenv("DDB_RECIPES_TABLE", "Recipes")
+STATS_TABLE = os.getenv("DDB_STATS_TABLE", "Stats")
 QUEUE_NAME = os.getenv("SQS_ORDER_QUEUE_NAME", "cloudkitchen-orders")
 SNS_TOPIC_NAME = os.getenv("SNS_ORDER_TOPIC_NAME", "cloudkitchen-order-notifications")
 S3_BUCKET_NAME = os.getenv("S3_RECIPE_BUCKET", "cloudkitchen-recipes")
@@ -16,25 +18,87 @@ AWS_REGION = os.getenv("AWS_REGION", "us-east-1")
 ddb = dynamodb_resource()
 sqs = sqs_client()
 sns = sns_client()
-s3 = boto3.client("s3", region_name=AWS_REGION)
+s3 = backend.client("s3", region_name=AWS_REGION)
 
 # --- DynamoDB Tables ---
-def create_table(table_name, partition_key):
-    """Create a DynamoDB table if it doesn't exist."""
+def index_spec(keys):
+    """GSI definition named "<hash>[-<range>]-index"; KEYS_ONLY for one attribute, ALL for two."""
+    return {
+        "IndexName": "-".join(keys) + "-index",
+        "KeySchema": [
+            {"AttributeName": a, "KeyType": key_type}
+            for a, key_type in zip(keys, ("HASH", "RANGE"))
+        ],
+        "Projection": {"ProjectionType": "KEYS_ONLY" if len(keys) == 1 else "ALL"},
+    }
+
+def create_table(table_name, partition_key, indexes=()):
+    """
+    Create a DynamoDB table if it doesn't exist.
+    Each entry in `indexes` is an attribute name or a (hash, range) pair and
+    gets a global secondary index (see index_spec). Indexes missing from an
+    existing table are added to it.
+    """
+    index_keys = [(i,) if isinstance(i, str) else tuple(i) for i in indexes]
     try:
         table = ddb.Table(table_name)
         table.load()
         print(f"Table '{table_name}' already exists.")
-    except Exception:
-        table = ddb.create_table(
+        add_missing_indexes(table, index_keys)
+    except ddb.meta.client.exceptions.ResourceNotFoundException:
+        attributes = [partition_key]
+        for keys in index_keys:
+            attributes += [a for a in keys if a not in attributes]
+
+        create_args = dict(
             TableName=table_name,
-            AttributeDefinitions=[{"AttributeName": partition_key, "AttributeType": "S"}],
+            AttributeDefinitions=[{"AttributeName": a, "AttributeType": "S"} for a in attributes],
             KeySchema=[{"AttributeName": partition_key, "KeyType": "HASH"}],
             BillingMode="PAY_PER_REQUEST"
         )
+        if index_keys:
+            create_args["GlobalSecondaryIndexes"] = [index_spec(keys) for keys in index_keys]
+        table = ddb.create_table(**create_args)
         table.wait_until_exists()
         print(f"Created table '{table_name}' successfully.")
 
+def add_missing_indexes(table, index_keys, poll_seconds=10):
+    """
+    Add GSIs that an existing table lacks, one UpdateTable call each
+    (DynamoDB builds one new index at a time), waiting while each backfills.
+    """
+    existing = {i["IndexName"] for i in table.global_secondary_indexes or []}
+    for keys in index_keys:
+        spec = index_spec(keys)
+        if spec["IndexName"] in existing:
+            continue
+        ddb.meta.client.update_table(
+            TableName=table.name,
+            AttributeDefinitions=[{"AttributeName": a, "AttributeType": "S"} for a in keys],
+            GlobalSecondaryIndexUpdates=[{"Create": spec}],
+        )
+        print(f"Creating index '{spec['IndexName']}' on '{table.name}' (existing items are backfilled)...")
+        while True:
+            table.reload()
+            statuses = {i["IndexName"]: i.get("IndexStatus") for i in table.global_secondary_indexes or []}
+            if statuses.get(spec["IndexName"]) == "ACTIVE":
+                break
+            time.sleep(poll_seconds)
+        print(f"Index '{spec['IndexName']}' on '{table.name}' is active.")
+
+def enable_ttl(table_name, attribute):
+    """Let DynamoDB expire items once `attribute` (epoch seconds) has passed."""
+    client = ddb.meta.client
+    current = client.describe_time_to_live(TableName=table_name)["TimeToLiveDescription"]
+    if current.get("TimeToLiveStatus") in ("ENABLED", "ENABLING"):
+        print(f"TTL already enabled on '{table_name}' ({current.get('AttributeName')}).")
+        return
+    client.update_time_to_live(
+        TableName=table_name,
+        TimeToLiveSpecification={"Enabled": True, "AttributeName": attribute}
+    )
+    print(f"Enabled TTL on '{table_name}' ({attribute}).")
+
 # --- SQS Queue ---
 def create_queue(queue_name):
     resp = sqs.create_queue(QueueName=queue_name)
@@ -64,15 +128,34 @@ def create_bucket(bucket_name, region=AWS_REGION):
     print(f"Created S3 bucket '{bucket_name}' in region '{region}'.")
     return bucket_name
 
+def configure_bucket_cors(bucket_name, origins=("*",)):
+    """Allow browsers to POST recipe images straight to the bucket (presigned POST)."""
+    s3.put_bucket_cors(
+        Bucket=bucket_name,
+        CORSConfiguration={
+            "CORSRules": [{
+                "AllowedMethods": ["POST", "GET"],
+                "AllowedOrigins": list(origins),
+                "AllowedHeaders": ["*"],
+                "MaxAgeSeconds": 3600,
+            }]
+        }
+    )
+    print(f"Configured CORS on S3 bucket '{bucket_name}'.")
+
 # --- Main setup ---
 if __name__ == "__main__":
-    create_table(ORDERS_TABLE, "order_id")
-    create_table(INVENTORY_TABLE, "item_id")
+    create_table(ORDERS_TABLE, "order_id", indexes=[("order_status", "created_at")])
+    # backstop for finished orders the archive job (manage.py archive_orders) missed
+    enable_ttl(ORDERS_TABLE, "expires_at")
+    create_table(INVENTORY_TABLE, "item_id", indexes=["name"])
     create_table(RECIPES_TABLE, "recipe_id")
+    create_table(STATS_TABLE, "stat_id")
 
     QUEUE_URL = create_queue(QUEUE_NAME)
     TOPIC_ARN = create_topic(SNS_TOPIC_NAME)
     BUCKET_NAME = create_bucket(S3_BUCKET_NAME)
+    configure_bucket_cors(BUCKET_NAME)
 
     print("\nInfrastructure setup completed successfully.")
     print(f"Orders Queue URL: {QUEUE_URL}")
@@ -1,6 +1,12 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class KitchenConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'kitchen'
+
+    def ready(self):
+        # before any view builds an AWS client
+        from aws_lib import backend
+        backend.configure(getattr(settings, "AWS_BACKEND", None))
@@ -0,0 +1,154 @@
+"""
+Menu-wide production capacity.
+
+Builds a recipe x ingredient requirement matrix and an inventory vector so
+"how many of each dish can we cook" is one vectorized pass over the whole
+menu instead of one max_production() call (and inventory scan) per recipe.
+"""
+import numpy as np
+
+try:
+    from scipy.optimize import LinearConstraint, milp
+except ImportError:  # the "lp" plan falls back to a greedy heuristic
+    milp = None
+
+
+class CapacityEngine:
+    def __init__(self, recipes, inventory):
+        """
+        recipes:   [{"recipe_id", "name", "ingredients": {name: qty}}]
+        inventory: [{"name", "qty"}]; the first row per name is used, like the
+                   order Lambda's name lookup
+
+        Recipes that need no ingredient (none listed, or all qty 0) have no
+        meaningful capacity; they are kept out of the matrix and reported in
+        summary() as invalid.
+        """
+        self.recipes, self.invalid = [], []
+        for recipe in recipes:
+            needs = any(qty > 0 for qty in (recipe.get("ingredients") or {}).values())
+            (self.recipes if needs else self.invalid).append(recipe)
+
+        stock = {}
+        for item in inventory:
+            if item.get("name"):
+                stock.setdefault(item["name"], item.get("qty", item.get("quantity", 0)) or 0)
+
+        names = sorted({n for r in self.recipes for n in r["ingredients"]} | set(stock))
+        self.ingredients = names
+        column = {n: j for j, n in enumerate(names)}
+
+        self.requirements = np.zeros((len(self.recipes), len(names)))
+        for i, recipe in enumerate(self.recipes):
+            for name, qty in recipe["ingredients"].items():
+                self.requirements[i, column[name]] = qty
+
+        self.stock = np.array([float(stock.get(n, 0)) for n in names])
+
+    def max_production(self):
+        """Max portions of each recipe if it were the only one cooked."""
+        if not self.recipes:
+            return np.zeros(0, dtype=int)
+        needed = self.requirements > 0
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ratios = np.where(needed, self.stock / self.requirements, np.inf)
+        portions = np.floor(ratios.min(axis=1))
+        portions[~needed.any(axis=1)] = 0
+        return portions.astype(int)
+
+    def balanced_plan(self):
+        """
+        Greedy mixed plan that cooks every recipe in step: whole rounds of one
+        portion each while stock allows, then single portions in menu order,
+        dropping recipes that no longer fit.
+        """
+        plan = np.zeros(len(self.recipes), dtype=int)
+        remaining = self.stock.copy()
+        active = [i for i in range(len(self.recipes)) if self.requirements[i].any()]
+
+        while active:
+            demand = self.requirements[active].sum(axis=0)
+            used = demand > 0
+            rounds = int(np.floor((remaining[used] / demand[used]).min()))
+            if rounds > 0:
+                plan[active] += rounds
+                remaining -= rounds * demand
+
+            # a full round no longer fits: one more portion each, in menu order
+            for i in active:
+                if np.all(self.requirements[i] <= remaining):
+                    plan[i] += 1
+                    remaining -= self.requirements[i]
+            active = [i for i in active if np.all(self.requirements[i] <= remaining)]
+
+        return plan
+
+    def lp_plan(self):
+        """
+        Plan maximizing total portions (integer LP via scipy.optimize.milp).
+        Without scipy, greedily cooks the cheapest recipes first.
+        """
+        n = len(self.recipes)
+        if n == 0:
+            return np.zeros(0, dtype=int)
+
+        if milp is not None:
+            result = milp(
+                c=-np.ones(n),
+                constraints=LinearConstraint(self.requirements.T, ub=self.stock),
+                integrality=np.ones(n),
+                bounds=(0, np.inf),
+            )
+            if result.success:
+                return np.round(result.x).astype(int)
+
+        plan = np.zeros(n, dtype=int)
+        remaining = self.stock.copy()
+        for i in np.argsort(self.requirements.sum(axis=1)):
+            needed = self.requirements[i] > 0
+            if not needed.any():
+                continue
+            plan[i] = int(np.floor((remaining[needed] / self.requirements[i, needed]).min()))
+            remaining -= plan[i] * self.requirements[i]
+        return plan
+
+    def summary(self, strategy=None):
+        """
+        JSON-ready capacity for every recipe, plus an optional mixed plan.
+        Invalid recipes (no ingredients) are listed with max_production and
+        plan portions of None and an "invalid" reason.
+        """
+        capacity = self.max_production()
+        result = {
+            "recipes": [
+                {
+                    "recipe_id": r["recipe_id"],
+                    "name": r.get("name", r["recipe_id"]),
+                    "max_production": int(capacity[i]),
+                }
+                for i, r in enumerate(self.recipes)
+            ] + [
+                {
+                    "recipe_id": r["recipe_id"],
+                    "name": r.get("name", r["recipe_id"]),
+                    "max_production": None,
+                    "invalid": "no ingredients",
+                }
+                for r in self.invalid
+            ]
+        }
+        if strategy:
+            plan = self.lp_plan() if strategy == "lp" else self.balanced_plan()
+            used = plan @ self.requirements if len(plan) else np.zeros(len(self.ingredients))
+            result["plan"] = {
+                "strategy": strategy,
+                "portions": {
+                    **{r["recipe_id"]: int(plan[i]) for i, r in enumerate(self.recipes)},
+                    **{r["recipe_id"]: None for r in self.invalid},
+                },
+                "inventory_after": {
+                    name: float(left) if left % 1 else int(left)
+                    for name, left in zip(self.ingredients, self.stock - used)
+                },
+            }
+        return result
@@ -0,0 +1,157 @@
+"""
+Streaming exports of Orders and Inventory (CSV or NDJSON, optionally gzip).
+
+Rows come from paginated Scans (or, for orders filtered by status, Queries
+on the status index) and are encoded chunk by chunk, so memory use stays
+flat however large the table is. Used by the export views and
+manage.py export_data.
+"""
+import csv
+import io
+import json
+import zlib
+from datetime import date, timedelta
+
+from boto3.dynamodb.conditions import Attr, Key
+
+# Orders GSI on (order_status, created_at), see infra_setup.py
+ORDERS_STATUS_INDEX = "order_status-created_at-index"
+
+DATASETS = {
+    "orders": {
+        "table": "Orders",
+        "fields": ["order_id", "recipe", "recipe_name", "order_status", "created_at"],
+    },
+    "inventory": {
+        "table": "Inventory",
+        "fields": ["item_id", "name", "qty"],
+    },
+}
+FORMATS = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+
+# Encoded rows are handed out in chunks of about this many bytes
+CHUNK_BYTES = 64 * 1024
+
+
+def parse_day(value, end=False):
+    """
+    YYYY-MM-DD -> created_at bound as an ISO string (None if empty). With
+    `end` the bound is the start of the next day, for an inclusive range.
+    Raises ValueError for other input.
+    """
+    if not value:
+        return None
+    day = date.fromisoformat(value)
+    return (day + timedelta(days=1) if end else day).isoformat()
+
+
+def iter_orders(ddb, status=None, since=None, until=None, recipe_names=None):
+    """
+    Orders created in [since, until) (ISO strings, both optional), oldest
+    first when `status` is given (a Query on the status index), in table
+    order otherwise (a filtered Scan). `recipe_names` fills recipe_name.
+    """
+    table = DATASETS["orders"]["table"]
+    if status:
+        # a bare date sorts before every timestamp on that day, so between()
+        # still excludes `until` itself
+        condition = Key("order_status").eq(status)
+        if since and until:
+            condition &= Key("created_at").between(since, until)
+        elif since:
+            condition &= Key("created_at").gte(since)
+        elif until:
+            condition &= Key("created_at").lt(until)
+        orders = _iter_query(ddb, table, condition)
+    else:
+        condition = None
+        if since:
+            condition = Attr("created_at").gte(since)
+        if until:
+            before = Attr("created_at").lt(until)
+            condition = condition & before if condition else before
+        orders = ddb.iter_scan(table, **({"FilterExpression": condition} if condition else {}))
+
+    for order in orders:
+        if recipe_names is not None:
+            order["recipe_name"] = recipe_names.get(order.get("recipe"), "")
+        yield order
+
+
+def _iter_query(ddb, table, condition):
+    start_key = None
+    while True:
+        items, start_key = ddb.query_page(table, condition, index_name=ORDERS_STATUS_INDEX, start_key=start_key)
+        yield from items
+        if not start_key:
+            return
+
+
+def iter_inventory(ddb):
+    return ddb.iter_scan(DATASETS["inventory"]["table"])
+
+
+def iter_rows(ddb, dataset, status=None, since=None, until=None, recipe_names=None):
+    """Rows of `dataset`; the status/date filters apply to orders only."""
+    if dataset == "orders":
+        return iter_orders(ddb, status, since, until, recipe_names)
+    return iter_inventory(ddb)
+
+
+# encoding
+def encode_csv(rows, fields):
+    """CSV bytes in ~CHUNK_BYTES chunks, header first; fields not in `fields` are dropped."""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fields, extrasaction="ignore")
+    writer.writeheader()
+    for row in rows:
+        writer.writerow(row)
+        if buffer.tell() >= CHUNK_BYTES:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+def encode_ndjson(rows, fields=None):
+    """One JSON object per line, in ~CHUNK_BYTES chunks."""
+    lines, size = [], 0
+    for row in rows:
+        line = json.dumps(row, sort_keys=True, default=str) + "\n"
+        lines.append(line)
+        size += len(line)
+        if size >= CHUNK_BYTES:
+            yield "".join(lines).encode()
+            lines, size = [], 0
+    if lines:
+        yield "".join(lines).encode()
+
+
+ENCODERS = {
+    "csv": encode_csv,
+    "ndjson": encode_ndjson,
+}
+
+
+def gzip_chunks(chunks, level=6):
+    """Compress a stream of byte chunks into one gzip stream."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits 31 = gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_chunks(rows, dataset, fmt, compress=False):
+    """Encoded (and optionally gzipped) byte chunks for `rows` of `dataset`."""
+    chunks = ENCODERS[fmt](rows, DATASETS[dataset]["fields"])
+    return gzip_chunks(chunks) if compress else chunks
+
+
+def filename(dataset, fmt, compress=False):
+    return f"{dataset}.{fmt}" + (".gz" if compress else "")
@@ -1,8 +1,8 @@
 from django import forms
-from aws_lib.dynamodb_client import DynamoDBClient
+from .recipe_cache import recipe_cache
 
-# Initialize DynamoDB client
-ddb = DynamoDBClient()
+# Browser uploads (presigned POST) land under this S3 prefix
+UPLOAD_KEY_PREFIX = "recipes/uploads/"
 
 
 class CreateOrderForm(forms.Form):
@@ -17,8 +17,8 @@ class CreateOrderForm(forms.Form):
         """
         super().__init__(*args, **kwargs)
 
-        # Load all recipes
-        recipes = ddb.scan("Recipes")
+        # Load all recipes (cached)
+        recipes = recipe_cache.all()
 
         # Populate choices (value = recipe_id, display = recipe name)
         self.fields['recipe'].choices = [
@@ -56,9 +56,21 @@ class RecipeForm(forms.Form):
         help_text="Format: item1:qty1,item2:qty2"
     )
 
-    # Optional image upload (stored on S3)
+    # Optional image: the browser uploads it straight to S3 and submits the key
+    s3_key = forms.CharField(required=False, widget=forms.HiddenInput)
+
+    # Fallback for non-browser clients: upload the file through Django
     image = forms.ImageField(required=False)
 
+    def clean_s3_key(self):
+        """
+        Only accept keys issued by the upload-policy endpoint.
+        """
+        key = self.cleaned_data["s3_key"].strip()
+        if key and (not key.startswith(UPLOAD_KEY_PREFIX) or ".." in key):
+            raise forms.ValidationError("Invalid image upload.")
+        return key
+
     def clean_ingredients(self):
         """
         Custom validation for the ingredients field.
@@ -0,0 +1,157 @@
+import threading
+import time
+
+from botocore.exceptions import ClientError
+from decimal import Decimal
+from django.conf import settings
+
+from aws_lib.dynamodb_client import DynamoDBClient
+
+# Defaults, overridable with settings.INVENTORY_SNAPSHOT
+DEFAULTS = {
+    "TTL": 5,  # seconds before the Inventory table is re-scanned
+}
+
+
+class InventoryItem:
+    """Compact inventory row."""
+
+    __slots__ = ("item_id", "name", "qty")
+
+    def __init__(self, item_id, name, qty):
+        self.item_id = item_id
+        self.name = name
+        self.qty = qty
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["item_id"], data.get("name", ""), data.get("qty", data.get("quantity", 0)))
+
+    def as_dict(self):
+        return {"item_id": self.item_id, "name": self.name, "qty": self.qty}
+
+
+class InventorySnapshot:
+    """
+    Shared in-memory copy of the Inventory table with an O(1) name index.
+
+    Concurrent requests that find the snapshot expired share a single scan.
+    Writes made through `put()`/`delete()` are applied to the snapshot
+    incrementally; `version` increases with every refresh or write.
+    """
+
+    def __init__(self, ddb, table="Inventory", **options):
+        config = {**DEFAULTS, **getattr(settings, "INVENTORY_SNAPSHOT", {}), **options}
+        self.ddb = ddb
+        self.table = table
+        self.ttl = config["TTL"]
+
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._by_id = {}
+        self._by_name = {}
+        self._loaded_at = None
+        self.version = 0
+
+    # reads
+    def items(self):
+        """Every inventory item, as InventoryItem objects."""
+        self._ensure_fresh()
+        with self._lock:
+            return list(self._by_id.values())
+
+    def dicts(self):
+        """Every inventory item, as plain dicts (for cloudkitchen_lib)."""
+        return [item.as_dict() for item in self.items()]
+
+    def by_name(self, name):
+        """The item with this name (first one seen, like the order Lambda), or None."""
+        self._ensure_fresh()
+        with self._lock:
+            return self._by_name.get(name)
+
+    # writes
+    def put(self, item_id, name, qty):
+        """Store an item in DynamoDB and in the snapshot."""
+        self.ddb.put(self.table, {"item_id": item_id, "name": name, "qty": qty})
+        item = InventoryItem(item_id, name, qty)
+        with self._lock:
+            self._by_id[item_id] = item
+            if self._by_name.get(name) is None or self._by_name[name].item_id == item_id:
+                self._by_name[name] = item
+            self.version += 1
+
+    def set_qty(self, item_id, qty):
+        """
+        Update an existing item's qty in DynamoDB and in the snapshot. Only
+        qty is written, so other attributes (e.g. last_alerted_at) are kept.
+        Returns False if the item no longer exists.
+        """
+        try:
+            self.ddb.resource.Table(self.table).update_item(
+                Key={"item_id": item_id},
+                UpdateExpression="SET qty = :qty",
+                ConditionExpression="attribute_exists(item_id)",
+                ExpressionAttributeValues={":qty": Decimal(qty)},
+            )
+        except ClientError as e:
+            if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+                raise
+            self.invalidate()
+            return False
+        with self._lock:
+            old = self._by_id.get(item_id)
+            if old:
+                item = self._by_id[item_id] = InventoryItem(item_id, old.name, qty)
+                if self._by_name.get(old.name) is old:
+                    self._by_name[old.name] = item
+            self.version += 1
+        return True
+
+    def delete(self, item_id):
+        """Delete an item from DynamoDB and from the snapshot."""
+        self.ddb.delete(self.table, {"item_id": item_id})
+        with self._lock:
+            item = self._by_id.pop(item_id, None)
+            if item and self._by_name.get(item.name) is item:
+                # fall back to another item with the same name, if any
+                others = (i for i in self._by_id.values() if i.name == item.name)
+                replacement = next(others, None)
+                if replacement:
+                    self._by_name[item.name] = replacement
+                else:
+                    del self._by_name[item.name]
+            self.version += 1
+
+    def invalidate(self):
+        with self._lock:
+            self._loaded_at = None
+
+    # internals
+    def _fresh(self):
+        return self._loaded_at is not None and time.monotonic() - self._loaded_at <= self.ttl
+
+    def _ensure_fresh(self):
+        with self._lock:
+            if self._fresh():
+                return
+
+        with self._refresh_lock:
+            with self._lock:
+                if self._fresh():
+                    return  # another request refreshed while we waited
+
+            rows = self.ddb.scan(self.table)
+            by_id, by_name = {}, {}
+            for row in rows:
+                item = InventoryItem.from_dict(row)
+                by_id[item.item_id] = item
+                by_name.setdefault(item.name, item)
+
+            with self._lock:
+                self._by_id, self._by_name = by_id, by_name
+                self._loaded_at = time.monotonic()
+                self.version += 1
+
+
+inventory_snapshot = InventorySnapshot(DynamoDBClient())
@@ -0,0 +1,43 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from aws_lib.dynamodb_client import DynamoDBClient
+from aws_lib.kitchen_stats import KitchenStats, STATS_TABLE
+from aws_lib.order_archive import OrderArchive, ARCHIVED_STATUSES, ROWS_PER_FILE
+from aws_lib.s3_client import S3Client
+
+
+class Command(BaseCommand):
+    help = "Move COMPLETED/FAILED orders older than N days from DynamoDB to gzip NDJSON files in S3."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--older-than-days", type=int, default=settings.ORDER_ARCHIVE["AFTER_DAYS"],
+                            help="Archive orders created more than this many days ago.")
+        parser.add_argument("--status", action="append", choices=ARCHIVED_STATUSES,
+                            help="Only this status (repeatable). Default: all finished statuses.")
+        parser.add_argument("--rows-per-file", type=int, default=ROWS_PER_FILE,
+                            help="Start a new archive file after this many orders.")
+        parser.add_argument("--dry-run", action="store_true", help="Count the orders without moving them.")
+
+    def handle(self, *args, **opts):
+        ddb = DynamoDBClient()
+        archive = OrderArchive(
+            ddb,
+            S3Client(),
+            settings.ORDER_ARCHIVE["BUCKET"],
+            prefix=settings.ORDER_ARCHIVE["PREFIX"],
+            stats=KitchenStats(ddb.resource.Table(STATS_TABLE)),
+        )
+        summary = archive.archive(
+            opts["older_than_days"],
+            statuses=opts["status"] or ARCHIVED_STATUSES,
+            rows_per_file=opts["rows_per_file"],
+            dry_run=opts["dry_run"],
+        )
+
+        counts = ", ".join(f"{s}={summary[s]}" for s in opts["status"] or ARCHIVED_STATUSES)
+        verb = "Would archive" if opts["dry_run"] else "Archived"
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {summary['orders']} orders created before {summary['cutoff']} "
+            f"({counts}) in {len(summary['files'])} files."
+        ))
@@ -0,0 +1,48 @@
+from boto3.dynamodb.conditions import Attr
+from botocore.exceptions import ClientError
+from django.core.management.base import BaseCommand
+
+from aws_lib.dynamodb_client import DynamoDBClient
+
+# Orders written before created_at existed sort as the oldest
+LEGACY_CREATED_AT = "1970-01-01T00:00:00.000000+00:00"
+
+
+class Command(BaseCommand):
+    help = (
+        "Give orders without created_at a timestamp, so they appear in the "
+        "(order_status, created_at) index used by the status views and the archive."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--created-at", default=LEGACY_CREATED_AT,
+                            help="ISO-8601 timestamp to store (default: %(default)s, i.e. oldest).")
+        parser.add_argument("--dry-run", action="store_true", help="Count the orders without updating them.")
+
+    def handle(self, *args, **opts):
+        ddb = DynamoDBClient()
+        table = ddb.resource.Table("Orders")
+        missing = ddb.iter_scan(
+            "Orders",
+            FilterExpression=Attr("created_at").not_exists(),
+            ProjectionExpression="order_id",
+        )
+
+        updated = 0
+        for order in missing:
+            if not opts["dry_run"]:
+                try:
+                    table.update_item(
+                        Key={"order_id": order["order_id"]},
+                        UpdateExpression="SET created_at = :t",
+                        ConditionExpression="attribute_exists(order_id) AND attribute_not_exists(created_at)",
+                        ExpressionAttributeValues={":t": opts["created_at"]},
+                    )
+                except ClientError as e:
+                    if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+                        raise
+                    continue  # deleted or given a created_at meanwhile
+            updated += 1
+
+        verb = "Would backfill" if opts["dry_run"] else "Backfilled"
+        self.stdout.write(self.style.SUCCESS(f"{verb} created_at on {updated} orders."))
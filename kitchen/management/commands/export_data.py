@@ -0,0 +1,48 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from aws_lib.dynamodb_client import DynamoDBClient
+from kitchen import exports
+from kitchen.recipe_cache import recipe_cache
+from kitchen.views import ORDER_STATUSES
+
+
+class Command(BaseCommand):
+    help = "Stream Orders or Inventory to a CSV/NDJSON file (or stdout), optionally gzipped."
+
+    def add_arguments(self, parser):
+        parser.add_argument("dataset", choices=sorted(exports.DATASETS))
+        parser.add_argument("--format", choices=sorted(exports.FORMATS), default="csv")
+        parser.add_argument("--gzip", action="store_true", help="Gzip the output.")
+        parser.add_argument("--output", "-o", help="File to write (default: stdout).")
+        parser.add_argument("--status", choices=ORDER_STATUSES, help="Orders only: just this status.")
+        parser.add_argument("--from", dest="since", help="Orders only: created on or after YYYY-MM-DD.")
+        parser.add_argument("--to", dest="until", help="Orders only: created on or before YYYY-MM-DD.")
+
+    def handle(self, *args, **opts):
+        dataset = opts["dataset"]
+        try:
+            since = exports.parse_day(opts["since"])
+            until = exports.parse_day(opts["until"], end=True)
+        except ValueError:
+            raise CommandError("--from/--to must be YYYY-MM-DD")
+
+        filters = {}
+        if dataset == "orders":
+            filters = dict(status=opts["status"], since=since, until=until, recipe_names=recipe_cache.names())
+        rows = exports.iter_rows(DynamoDBClient(), dataset, **filters)
+        chunks = exports.export_chunks(rows, dataset, opts["format"], opts["gzip"])
+
+        out = open(opts["output"], "wb") if opts["output"] else sys.stdout.buffer
+        try:
+            for chunk in chunks:
+                out.write(chunk)
+        finally:
+            if opts["output"]:
+                out.close()
+            else:
+                out.flush()
+
+        if opts["output"]:
+            self.stderr.write(self.style.SUCCESS(f"Wrote {dataset} to {opts['output']}."))
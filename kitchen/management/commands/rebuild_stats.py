@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from aws_lib.dynamodb_client import DynamoDBClient
+from aws_lib.kitchen_stats import KitchenStats, STATS_TABLE
+
+
+class Command(BaseCommand):
+    help = "Rebuild the dashboard Stats item from full scans of Orders and Inventory."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--segments", type=int, default=4, help="Parallel scan segments per table.")
+
+    def handle(self, *args, **opts):
+        ddb = DynamoDBClient()
+        orders = ddb.parallel_scan("Orders", total_segments=opts["segments"])
+        inventory = ddb.parallel_scan("Inventory", total_segments=opts["segments"])
+
+        item = KitchenStats(ddb.resource.Table(STATS_TABLE)).rebuild(orders, inventory)
+
+        counts = ", ".join(
+            f"{k}={v}" for k, v in sorted(item.items())
+            if k not in ("stat_id", "low_stock")
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Stats rebuilt: {counts}, {len(item['low_stock'])} low-stock items."
+        ))
@@ -0,0 +1,159 @@
+import os
+import signal
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+
+
+class Heartbeat:
+    """Keeps a batch of in-flight messages invisible while it is being processed."""
+
+    def __init__(self, sqs, queue_url, receipt_handles, visibility_timeout):
+        self.sqs = sqs
+        self.queue_url = queue_url
+        self.receipt_handles = receipt_handles
+        self.visibility_timeout = visibility_timeout
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        # extend at half the timeout so slow orders never become visible again
+        while not self._stop.wait(self.visibility_timeout / 2):
+            try:
+                self.sqs.change_visibility_batch(
+                    self.queue_url, self.receipt_handles, self.visibility_timeout
+                )
+            except Exception as e:
+                print(f"Error extending visibility: {e}")
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+class Command(BaseCommand):
+    help = (
+        "Run a long-polling SQS order worker pool as a local alternative to Lambda. "
+        "Messages are processed by lambda_function.lambda_handler."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--consumers", type=int, default=4, help="Number of consumer threads.")
+        parser.add_argument("--queue-url", help="Queue to poll (defaults to the configured orders queue).")
+        parser.add_argument(
+            "--endpoint-url",
+            help="AWS endpoint for a local stand-in (e.g. ElasticMQ/LocalStack at http://localhost:4566)."
+        )
+        parser.add_argument("--wait-seconds", type=int, default=20, help="Long-poll wait per receive.")
+        parser.add_argument("--visibility-timeout", type=int, default=30)
+        parser.add_argument("--report-every", type=int, default=10, help="Seconds between throughput reports.")
+
+    def handle(self, *args, **opts):
+        if opts["endpoint_url"]:
+            os.environ["AWS_ENDPOINT_URL"] = opts["endpoint_url"]
+
+        # imported late so AWS_ENDPOINT_URL applies to the handler's clients too
+        from aws_config import get_sqs_url
+        from aws_lib.sqs_client import SQSClient
+        from lambda_function import lambda_handler
+
+        self.sqs = SQSClient()
+        self.handler = lambda_handler
+        self.queue_url = opts["queue_url"] or get_sqs_url()
+        self.wait_seconds = opts["wait_seconds"]
+        self.visibility_timeout = opts["visibility_timeout"]
+
+        self.stopping = threading.Event()
+        self.stats_lock = threading.Lock()
+        self.processed = 0
+        self.failed = 0
+
+        def shutdown(signum, frame):
+            self.stdout.write("Shutting down after in-flight batches finish...")
+            self.stopping.set()
+
+        signal.signal(signal.SIGINT, shutdown)
+        signal.signal(signal.SIGTERM, shutdown)
+
+        # the handler builds its boto3 resources per thread (lambda_function.PerThread)
+        consumers = [
+            threading.Thread(target=self.consume, name=f"consumer-{i}")
+            for i in range(opts["consumers"])
+        ]
+        for t in consumers:
+            t.start()
+        self.stdout.write(f"Polling {self.queue_url} with {len(consumers)} consumers.")
+
+        started = last_report = time.monotonic()
+        last_count = 0
+        while any(t.is_alive() for t in consumers):
+            self.stopping.wait(1)
+            now = time.monotonic()
+            if now - last_report >= opts["report_every"]:
+                with self.stats_lock:
+                    count = self.processed
+                rate = (count - last_count) / (now - last_report)
+                self.stdout.write(f"{count} orders processed, {rate:.1f} orders/sec")
+                last_report, last_count = now, count
+            if self.stopping.is_set():
+                for t in consumers:
+                    t.join()
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Stopped. {self.processed} orders processed, {self.failed} left for redelivery, "
+            f"{self.processed / elapsed if elapsed else 0:.1f} orders/sec overall."
+        ))
+
+    def consume(self):
+        while not self.stopping.is_set():
+            try:
+                messages = self.sqs.receive_messages(
+                    self.queue_url,
+                    max_messages=10,
+                    wait_seconds=self.wait_seconds,
+                    visibility_timeout=self.visibility_timeout
+                )
+            except Exception as e:
+                self.stderr.write(f"Error receiving messages: {e}")
+                self.stopping.wait(1)
+                continue
+            if messages:
+                self.process(messages)
+
+    def process(self, messages):
+        """Run one received batch through the Lambda handler and delete what succeeded."""
+        handles = {m["MessageId"]: m["ReceiptHandle"] for m in messages}
+        event = {
+            "Records": [
+                {
+                    "messageId": m["MessageId"],
+                    "receiptHandle": m["ReceiptHandle"],
+                    "body": m["Body"],
+                    "eventSource": "aws:sqs",
+                }
+                for m in messages
+            ]
+        }
+
+        with Heartbeat(self.sqs, self.queue_url, list(handles.values()), self.visibility_timeout):
+            try:
+                result = self.handler(event, None)
+                failed = {f["itemIdentifier"] for f in result.get("batchItemFailures", [])}
+            except Exception as e:
+                self.stderr.write(f"Error processing batch: {e}")
+                failed = set(handles)
+
+        done = [h for message_id, h in handles.items() if message_id not in failed]
+        if done:
+            for entry in self.sqs.delete_messages_batch(self.queue_url, done):
+                self.stderr.write(f"Error deleting message: {entry.get('Message')}")
+
+        with self.stats_lock:
+            self.processed += len(done)
+            self.failed += len(failed)
@@ -0,0 +1,39 @@
+import time
+
+from asgiref.sync import iscoroutinefunction
+from django.utils.decorators import sync_and_async_middleware
+
+from aws_lib import tracing
+
+
+def _finish(request, response, trace, started):
+    """Add the Server-Timing header and fold the request into the per-view metrics."""
+    elapsed = time.perf_counter() - started
+    response["Server-Timing"] = trace.server_timing(elapsed)
+
+    match = getattr(request, "resolver_match", None)
+    view = match.view_name if match else "unresolved"
+    tracing.registry.record_view(view, elapsed, trace)
+    return response
+
+
+@sync_and_async_middleware
+def aws_tracing_middleware(get_response):
+    """
+    Trace the AWS calls made while serving each request; the response gets a
+    Server-Timing header (total, all AWS time, then each operation) and the
+    totals are kept per view for /metrics.
+    """
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            started = time.perf_counter()
+            with tracing.trace() as trace:
+                response = await get_response(request)
+            return _finish(request, response, trace, started)
+    else:
+        def middleware(request):
+            started = time.perf_counter()
+            with tracing.trace() as trace:
+                response = get_response(request)
+            return _finish(request, response, trace, started)
+    return middleware
@@ -0,0 +1,142 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+
+from aws_lib.dynamodb_client import DynamoDBClient
+
+# Defaults, overridable with settings.RECIPE_CACHE
+DEFAULTS = {
+    "TTL": 60,              # seconds before the cached Recipes table is re-read
+    "MAX_SIZE": 1024,       # recipes kept for single-item lookups (LRU)
+    "SHARED_BACKEND": None, # Django cache alias used to keep workers coherent
+}
+
+VERSION_KEY = "kitchen:recipes:version"
+
+
+class RecipeCache:
+    """
+    Process-level read-through cache for the Recipes table.
+
+    `all()` serves the full recipe list from one scan per TTL, `get()` serves
+    single recipes from an LRU, and writes go through `put()`/`delete()`.
+    When SHARED_BACKEND names a Django cache, writes bump a version counter
+    there and every worker drops its local copy when the counter moves.
+    """
+
+    def __init__(self, ddb, table="Recipes", **options):
+        config = {**DEFAULTS, **getattr(settings, "RECIPE_CACHE", {}), **options}
+        self.ddb = ddb
+        self.table = table
+        self.ttl = config["TTL"]
+        self.max_size = config["MAX_SIZE"]
+        self.shared_alias = config["SHARED_BACKEND"]
+
+        self._lock = threading.Lock()
+        self._all = None
+        self._all_loaded_at = 0
+        self._items = OrderedDict()  # recipe_id -> (recipe, loaded_at)
+        self._version = None
+
+    # reads
+    def all(self):
+        """Every recipe, as a list of dicts."""
+        self._sync()
+        with self._lock:
+            if self._all is not None and not self._expired(self._all_loaded_at):
+                return list(self._all)
+
+        recipes = self.ddb.scan(self.table)
+        with self._lock:
+            self._all = recipes
+            self._all_loaded_at = time.monotonic()
+            for recipe in recipes:
+                self._remember(recipe)
+        return list(recipes)
+
+    def get(self, recipe_id):
+        """One recipe, or {} if it does not exist."""
+        self._sync()
+        with self._lock:
+            entry = self._items.get(recipe_id)
+            if entry and not self._expired(entry[1]):
+                self._items.move_to_end(recipe_id)
+                return entry[0]
+
+        recipe = self.ddb.get(self.table, {"recipe_id": recipe_id})
+        if recipe:
+            with self._lock:
+                self._remember(recipe)
+        return recipe
+
+    def names(self):
+        """recipe_id -> recipe name."""
+        return {r["recipe_id"]: r.get("name", r["recipe_id"]) for r in self.all()}
+
+    # writes
+    def put(self, recipe):
+        """Store a recipe in DynamoDB and in the cache."""
+        self.ddb.put(self.table, recipe)
+        with self._lock:
+            self._remember(recipe)
+            if self._all is not None:
+                self._all = [r for r in self._all if r["recipe_id"] != recipe["recipe_id"]]
+                self._all.append(recipe)
+        self._bump()
+
+    def delete(self, recipe_id):
+        """Delete a recipe from DynamoDB and from the cache."""
+        self.ddb.delete(self.table, {"recipe_id": recipe_id})
+        with self._lock:
+            self._items.pop(recipe_id, None)
+            if self._all is not None:
+                self._all = [r for r in self._all if r["recipe_id"] != recipe_id]
+        self._bump()
+
+    def invalidate(self):
+        with self._lock:
+            self._all = None
+            self._items.clear()
+
+    # internals
+    def _expired(self, loaded_at):
+        return time.monotonic() - loaded_at > self.ttl
+
+    def _remember(self, recipe):
+        self._items[recipe["recipe_id"]] = (recipe, time.monotonic())
+        self._items.move_to_end(recipe["recipe_id"])
+        while len(self._items) > self.max_size:
+            self._items.popitem(last=False)
+
+    def _shared(self):
+        return caches[self.shared_alias] if self.shared_alias else None
+
+    def _sync(self):
+        """Drop the local copy if another worker changed recipes."""
+        shared = self._shared()
+        if shared is None:
+            return
+        version = shared.get_or_set(VERSION_KEY, 0, timeout=None)
+        if version != self._version:
+            self.invalidate()
+            self._version = version
+
+    def _bump(self):
+        shared = self._shared()
+        if shared is None:
+            return
+        try:
+            version = shared.incr(VERSION_KEY)
+        except ValueError:
+            shared.set(VERSION_KEY, 1, timeout=None)
+            version = 1
+        if self._version is not None and version != self._version + 1:
+            # another worker wrote in between
+            self.invalidate()
+        self._version = version
+
+
+recipe_cache = RecipeCache(DynamoDBClient())
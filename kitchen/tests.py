@@ -1,3 +1,726 @@
-from django.test import TestCase
+import contextlib
+import io
+import json
+import os
+import tempfile
+import threading
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+import boto3
+from boto3.dynamodb.conditions import Attr, Key
+from botocore.exceptions import ClientError
+from django.contrib.auth.models import AnonymousUser
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase
+
+from aws_lib import backend
+from aws_lib.memory_backend import MemoryBackend
+from aws_lib.memory_store import SQLiteStore
+from aws_lib.s3_client import PresignedUrlCache, S3Client
+from aws_lib.sns_utils import LowStockAlerts
+from aws_lib.sqs_client import BufferedProducer
+
+# Every test talks to the in-process backend (aws_lib/backend.py), never to AWS
+backend.configure("memory")
+
+import aws_config
+import infra_setup
+import lambda_function
+
+REGION = "us-east-1"
+
+
+def error_code(ctx):
+    return ctx.exception.response["Error"]["Code"]
+
+
+class MemoryBackendTestCase(SimpleTestCase):
+    """Starts each test with an empty memory backend."""
+
+    def setUp(self):
+        backend.active().reset()
+
+    def create_table(self, name, key, indexes=()):
+        """Table keyed on `key` (S); `indexes` are (name, hash, range or None) GSIs projecting ALL."""
+        ddb = backend.resource("dynamodb", region_name=REGION)
+        attributes = {key}
+        gsis = []
+        for index_name, hash_key, range_key in indexes:
+            schema = [{"AttributeName": hash_key, "KeyType": "HASH"}]
+            attributes.add(hash_key)
+            if range_key:
+                schema.append({"AttributeName": range_key, "KeyType": "RANGE"})
+                attributes.add(range_key)
+            gsis.append({"IndexName": index_name, "KeySchema": schema, "Projection": {"ProjectionType": "ALL"}})
+        args = dict(
+            TableName=name,
+            KeySchema=[{"AttributeName": key, "KeyType": "HASH"}],
+            AttributeDefinitions=[{"AttributeName": a, "AttributeType": "S"} for a in sorted(attributes)],
+            BillingMode="PAY_PER_REQUEST",
+        )
+        if gsis:
+            args["GlobalSecondaryIndexes"] = gsis
+        return ddb.create_table(**args)
+
+
+# memory backend: DynamoDB
+class MemoryDynamoDBTests(MemoryBackendTestCase):
+    def setUp(self):
+        super().setUp()
+        self.table = self.create_table("Things", "id", [("kind-at-index", "kind", "at")])
+        self.client = self.table.meta.client
+
+    def test_put_get_round_trips_types(self):
+        item = {
+            "id": "a", "n": Decimal("1.5"), "flag": True, "none": None, "blob": b"\x00\x01",
+            "tags": {"x", "y"}, "nested": {"list": [Decimal(1), "two"]},
+        }
+        self.table.put_item(Item=item)
+        self.assertEqual(self.table.get_item(Key={"id": "a"})["Item"], item)
+        self.assertNotIn("Item", self.table.get_item(Key={"id": "missing"}))
+
+    def test_conditional_put(self):
+        self.table.put_item(Item={"id": "a"}, ConditionExpression=Attr("id").not_exists())
+        with self.assertRaises(ClientError) as ctx:
+            self.table.put_item(Item={"id": "a"}, ConditionExpression=Attr("id").not_exists())
+        self.assertEqual(error_code(ctx), "ConditionalCheckFailedException")
+
+    def test_failed_condition_can_return_old_item(self):
+        self.table.put_item(Item={"id": "a", "state": "done"})
+        with self.assertRaises(ClientError) as ctx:
+            self.table.update_item(
+                Key={"id": "a"},
+                UpdateExpression="SET #s = :s",
+                ConditionExpression="#s = :pending",
+                ExpressionAttributeNames={"#s": "state"},
+                ExpressionAttributeValues={":s": "x", ":pending": "pending"},
+                ReturnValuesOnConditionCheckFailure="ALL_OLD",
+            )
+        self.assertEqual(ctx.exception.response["Item"]["state"], {"S": "done"})
+
+    def test_update_expression_actions(self):
+        self.table.put_item(Item={"id": "a", "qty": 10, "log": ["x"], "tags": {"t1"}, "old": 1})
+        resp = self.table.update_item(
+            Key={"id": "a"},
+            UpdateExpression=(
+                "SET qty = qty - :one, log = list_append(log, :more), first = if_not_exists(first, :now) "
+                "REMOVE old ADD tags :tag, hits :one"
+            ),
+            ExpressionAttributeValues={":one": 1, ":more": ["y"], ":now": "t", ":tag": {"t2"}},
+            ReturnValues="ALL_NEW",
+        )
+        self.assertEqual(resp["Attributes"], {
+            "id": "a", "qty": 9, "log": ["x", "y"], "first": "t", "tags": {"t1", "t2"}, "hits": 1,
+        })
+
+    def test_update_of_path_under_missing_map_is_a_validation_error(self):
+        # KitchenStats relies on this to create low_stock on first use
+        self.table.put_item(Item={"id": "a"})
+        with self.assertRaises(ClientError) as ctx:
+            self.table.update_item(
+                Key={"id": "a"},
+                UpdateExpression="SET low_stock.#k = :v",
+                ExpressionAttributeNames={"#k": "i1"},
+                ExpressionAttributeValues={":v": 1},
+            )
+        self.assertEqual(error_code(ctx), "ValidationException")
+
+    def test_query_index_newest_first_with_paging(self):
+        with self.table.batch_writer() as batch:
+            for i in range(7):
+                batch.put_item(Item={"id": f"i{i}", "kind": "k", "at": f"2026-01-0{i + 1}"})
+            batch.put_item(Item={"id": "other", "kind": "z", "at": "2026-01-01"})
+            batch.put_item(Item={"id": "sparse", "kind": "k"})  # no range key: not in the index
+
+        seen, start = [], {}
+        while True:
+            resp = self.table.query(
+                IndexName="kind-at-index",
+                KeyConditionExpression=Key("kind").eq("k") & Key("at").gte("2026-01-02"),
+                ScanIndexForward=False,
+                Limit=4,
+                **start
+            )
+            seen += [item["id"] for item in resp["Items"]]
+            if "LastEvaluatedKey" not in resp:
+                break
+            start = {"ExclusiveStartKey": resp["LastEvaluatedKey"]}
+        self.assertEqual(seen, ["i6", "i5", "i4", "i3", "i2", "i1"])
+
+    def test_query_requires_the_hash_key(self):
+        with self.assertRaises(ClientError) as ctx:
+            self.table.query(IndexName="kind-at-index", KeyConditionExpression=Key("at").eq("x"))
+        self.assertEqual(error_code(ctx), "ValidationException")
+
+    def test_segmented_filtered_scan_covers_each_item_once(self):
+        with self.table.batch_writer() as batch:
+            for i in range(40):
+                batch.put_item(Item={"id": f"i{i}", "n": i})
+        seen = []
+        for segment in range(4):
+            resp = self.table.scan(Segment=segment, TotalSegments=4, FilterExpression=Attr("n").gte(10))
+            seen += [item["id"] for item in resp["Items"]]
+        self.assertCountEqual(seen, [f"i{i}" for i in range(10, 40)])
+
+    def test_batch_write_and_get(self):
+        self.client.batch_write_item(RequestItems={"Things": [
+            {"PutRequest": {"Item": {"id": f"i{i}"}}} for i in range(5)
+        ]})
+        self.client.batch_write_item(RequestItems={"Things": [{"DeleteRequest": {"Key": {"id": "i0"}}}]})
+        resp = self.client.batch_get_item(RequestItems={"Things": {
+            "Keys": [{"id": f"i{i}"} for i in range(5)], "ConsistentRead": True
+        }})
+        self.assertEqual(sorted(i["id"] for i in resp["Responses"]["Things"]), ["i1", "i2", "i3", "i4"])
+        self.assertFalse(resp["UnprocessedKeys"])
+
+    def test_cancelled_transaction_writes_nothing_and_reports_reasons(self):
+        self.table.put_item(Item={"id": "stock", "qty": 1})
+        with self.assertRaises(ClientError) as ctx:
+            self.client.transact_write_items(TransactItems=[
+                {"Put": {"TableName": "Things", "Item": {"id": "new"}}},
+                {"Update": {
+                    "TableName": "Things",
+                    "Key": {"id": "stock"},
+                    "UpdateExpression": "SET qty = qty - :n",
+                    "ConditionExpression": "qty >= :n",
+                    "ExpressionAttributeValues": {":n": 2},
+                    "ReturnValuesOnConditionCheckFailure": "ALL_OLD",
+                }},
+            ])
+        self.assertEqual(error_code(ctx), "TransactionCanceledException")
+        reasons = ctx.exception.response["CancellationReasons"]
+        self.assertEqual([r["Code"] for r in reasons], ["None", "ConditionalCheckFailed"])
+        self.assertEqual(reasons[1]["Item"]["qty"], {"N": "1"})  # not deserialized, as on AWS
+        self.assertNotIn("Item", self.table.get_item(Key={"id": "new"}))
+        self.assertEqual(self.table.get_item(Key={"id": "stock"})["Item"]["qty"], 1)
+
+    def test_transaction_may_not_touch_an_item_twice(self):
+        update = {"Update": {
+            "TableName": "Things", "Key": {"id": "a"},
+            "UpdateExpression": "SET n = :n", "ExpressionAttributeValues": {":n": 1},
+        }}
+        with self.assertRaises(ClientError) as ctx:
+            self.client.transact_write_items(TransactItems=[update, update])
+        self.assertEqual(error_code(ctx), "ValidationException")
+
+    def test_missing_table(self):
+        with self.assertRaises(ClientError) as ctx:
+            self.client.get_item(TableName="Nope", Key={"id": "a"})
+        self.assertEqual(error_code(ctx), "ResourceNotFoundException")
+
+
+# memory backend: SQS, SNS, S3
+class MemorySQSTests(MemoryBackendTestCase):
+    def setUp(self):
+        super().setUp()
+        self.sqs = backend.client("sqs", region_name=REGION)
+        self.url = self.sqs.create_queue(QueueName="q")["QueueUrl"]
+
+    def test_received_message_is_hidden_until_deleted_or_visible_again(self):
+        self.sqs.send_message(QueueUrl=self.url, MessageBody="hello")
+        first = self.sqs.receive_message(QueueUrl=self.url, VisibilityTimeout=30)["Messages"]
+        self.assertEqual([m["Body"] for m in first], ["hello"])
+        self.assertNotIn("Messages", self.sqs.receive_message(QueueUrl=self.url))
+
+        self.sqs.change_message_visibility(QueueUrl=self.url, ReceiptHandle=first[0]["ReceiptHandle"],
+                                           VisibilityTimeout=0)
+        again = self.sqs.receive_message(QueueUrl=self.url, AttributeNames=["ApproximateReceiveCount"])["Messages"]
+        self.assertEqual(again[0]["Attributes"]["ApproximateReceiveCount"], "2")
+
+        self.sqs.delete_message(QueueUrl=self.url, ReceiptHandle=again[0]["ReceiptHandle"])
+        self.sqs.change_message_visibility_batch(QueueUrl=self.url, Entries=[])  # no-op is fine
+        self.assertNotIn("Messages", self.sqs.receive_message(QueueUrl=self.url))
+
+    def test_batches(self):
+        resp = self.sqs.send_message_batch(QueueUrl=self.url, Entries=[
+            {"Id": str(i), "MessageBody": f"m{i}"} for i in range(10)
+        ])
+        self.assertEqual(len(resp["Successful"]), 10)
+        messages = self.sqs.receive_message(QueueUrl=self.url, MaxNumberOfMessages=10)["Messages"]
+        self.assertEqual(sorted(m["Body"] for m in messages), sorted(f"m{i}" for i in range(10)))
+        resp = self.sqs.delete_message_batch(QueueUrl=self.url, Entries=[
+            {"Id": m["MessageId"], "ReceiptHandle": m["ReceiptHandle"]} for m in messages
+        ])
+        self.assertEqual(len(resp["Successful"]), 10)
+
+    def test_unknown_queue(self):
+        with self.assertRaises(ClientError) as ctx:
+            self.sqs.get_queue_url(QueueName="nope")
+        self.assertEqual(error_code(ctx), "QueueDoesNotExist")
+
+
+class MemorySNSTests(MemoryBackendTestCase):
+    def test_published_messages_are_recorded(self):
+        sns = backend.client("sns", region_name=REGION)
+        arn = sns.create_topic(Name="t")["TopicArn"]
+        sns.publish(TopicArn=arn, Message="one")
+        resp = sns.publish_batch(TopicArn=arn, PublishBatchRequestEntries=[
+            {"Id": "a", "Message": "two"}, {"Id": "b", "Message": "three"},
+        ])
+        self.assertEqual(len(resp["Successful"]), 2)
+        self.assertEqual([m["message"] for m in backend.active().services["sns"].published(arn)],
+                         ["one", "two", "three"])
+
+
+class MemoryS3Tests(MemoryBackendTestCase):
+    def setUp(self):
+        super().setUp()
+        self.s3 = backend.client("s3", region_name=REGION)
+        self.s3.create_bucket(Bucket="b")
+
+    def test_objects_and_prefix_listing(self):
+        for key in ("a/1.txt", "a/2.txt", "a/sub/3.txt", "b.txt"):
+            self.s3.put_object(Bucket="b", Key=key, Body=key.encode())
+        self.assertEqual(self.s3.get_object(Bucket="b", Key="a/1.txt")["Body"].read(), b"a/1.txt")
+
+        resp = self.s3.list_objects_v2(Bucket="b", Prefix="a/", Delimiter="/")
+        self.assertEqual([o["Key"] for o in resp["Contents"]], ["a/1.txt", "a/2.txt"])
+        self.assertEqual([p["Prefix"] for p in resp["CommonPrefixes"]], ["a/sub/"])
+
+        with self.assertRaises(ClientError) as ctx:
+            self.s3.get_object(Bucket="b", Key="missing")
+        self.assertEqual(error_code(ctx), "NoSuchKey")
+
+    def test_multipart_upload(self):
+        upload = self.s3.create_multipart_upload(Bucket="b", Key="big")
+        parts = []
+        for number, body in enumerate((b"x" * 10, b"y" * 5), start=1):
+            resp = self.s3.upload_part(Bucket="b", Key="big", UploadId=upload["UploadId"],
+                                       PartNumber=number, Body=body)
+            parts.append({"PartNumber": number, "ETag": resp["ETag"]})
+        self.s3.complete_multipart_upload(Bucket="b", Key="big", UploadId=upload["UploadId"],
+                                          MultipartUpload={"Parts": parts})
+        self.assertEqual(self.s3.get_object(Bucket="b", Key="big")["Body"].read(), b"x" * 10 + b"y" * 5)
+
+
+class SQLiteStoreTests(SimpleTestCase):
+    """Two backends on one SQLite file stand in for the web and worker processes."""
+
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp(suffix=".db")
+        os.close(handle)
+        self.addCleanup(os.remove, self.path)
+
+    def connect(self, service):
+        return MemoryBackend(SQLiteStore(self.path)).attach(boto3.client(service, region_name=REGION))
+
+    def test_state_is_shared_and_failed_operations_roll_back(self):
+        web, worker = self.connect("dynamodb"), self.connect("dynamodb")
+        web.create_table(
+            TableName="T", KeySchema=[{"AttributeName": "id", "KeyType": "HASH"}],
+            AttributeDefinitions=[{"AttributeName": "id", "AttributeType": "S"}],
+            BillingMode="PAY_PER_REQUEST",
+        )
+        web.put_item(TableName="T", Item={"id": {"S": "a"}, "n": {"N": "1"}, "b": {"B": b"\xff"}})
+        self.assertEqual(worker.get_item(TableName="T", Key={"id": {"S": "a"}})["Item"]["b"], {"B": b"\xff"})
+
+        with self.assertRaises(ClientError):
+            worker.transact_write_items(TransactItems=[
+                {"Put": {"TableName": "T", "Item": {"id": {"S": "b"}}}},
+                {"ConditionCheck": {"TableName": "T", "Key": {"id": {"S": "a"}},
+                                    "ConditionExpression": "n > :n",
+                                    "ExpressionAttributeValues": {":n": {"N": "5"}}}},
+            ])
+        self.assertNotIn("Item", web.get_item(TableName="T", Key={"id": {"S": "b"}}))
+
+
+# order Lambda
+class LambdaTestCase(MemoryBackendTestCase):
+    """The order Lambda's tables, as infra_setup creates them, with a few helpers."""
+
+    def setUp(self):
+        super().setUp()
+        self.enterContext(contextlib.redirect_stdout(io.StringIO()))  # setup and Lambda progress lines
+        lambda_function.item_ids_by_name.clear()
+        infra_setup.create_table(infra_setup.ORDERS_TABLE, "order_id", indexes=[("order_status", "created_at")])
+        infra_setup.create_table(infra_setup.INVENTORY_TABLE, "item_id", indexes=["name"])
+        infra_setup.create_table(infra_setup.RECIPES_TABLE, "recipe_id")
+        infra_setup.create_table(infra_setup.STATS_TABLE, "stat_id")
+
+    def stock(self, **qty):
+        for name, n in qty.items():
+            lambda_function.inventory_table.put_item(Item={"item_id": f"id-{name}", "name": name, "qty": n})
+
+    def qty(self, name):
+        return lambda_function.inventory_table.get_item(Key={"item_id": f"id-{name}"})["Item"]["qty"]
+
+    def order(self, order_id, status="PENDING"):
+        lambda_function.orders_table.put_item(Item={
+            "order_id": order_id, "order_status": status, "created_at": "2026-10-01T12:00:00.000000+00:00",
+        })
+
+    def status(self, order_id):
+        return lambda_function.orders_table.get_item(Key={"order_id": order_id})["Item"]["order_status"]
+
+    def counts(self):
+        return lambda_function.stats.read()
+
+
+class PerThreadTests(SimpleTestCase):
+    def test_each_thread_gets_its_own_resource(self):
+        clients = [lambda_function.orders_table.meta.client]
+        thread = threading.Thread(target=lambda: clients.append(lambda_function.orders_table.meta.client))
+        thread.start()
+        thread.join()
+        self.assertIsNot(clients[0], clients[1])
+        self.assertIs(clients[0], lambda_function.orders_table.meta.client)
+
+
+class FetchRecipesTests(LambdaTestCase):
+    def test_fetches_each_recipe_through_the_retrying_batch_get(self):
+        for recipe_id in ("r1", "r2"):
+            lambda_function.recipes_table.put_item(Item={"recipe_id": recipe_id, "ingredients": {"bun": 2}})
+        with mock.patch.object(lambda_function.ddb, "batch_get", wraps=lambda_function.ddb.batch_get) as batch_get:
+            recipes = lambda_function.fetch_recipes({"r1", "r2", "missing"})
+        self.assertEqual(batch_get.call_count, 1)
+        self.assertEqual(sorted(recipes), ["r1", "r2"])
+        self.assertEqual(recipes["r1"]["ingredients"], {"bun": 2})
+
+
+class DeductIngredientsTests(LambdaTestCase):
+    def setUp(self):
+        super().setUp()
+        self.stock(bun=5, patty=1)
+        self.order("o1")
+
+    def test_deducts_and_completes(self):
+        self.assertEqual(lambda_function.deduct_ingredients("o1", {"bun": 2, "patty": 1}), (True, None))
+        self.assertEqual((self.qty("bun"), self.qty("patty")), (3, 0))
+        self.assertEqual(self.status("o1"), "COMPLETED")
+        self.assertEqual(self.counts()["COMPLETED"], 1)
+
+    def test_insufficient_stock_writes_nothing(self):
+        self.assertEqual(lambda_function.deduct_ingredients("o1", {"bun": 2, "patty": 2}), (False, "patty"))
+        self.assertEqual((self.qty("bun"), self.qty("patty")), (5, 1))
+        self.assertEqual(self.status("o1"), "PENDING")
+
+    def test_unknown_ingredient(self):
+        self.assertEqual(lambda_function.deduct_ingredients("o1", {"bun": 1, "truffle": 1}), (False, "truffle"))
+        self.assertEqual(self.qty("bun"), 5)
+
+    def test_short_order_is_marked_failed_once(self):
+        recipe = {"ingredients": {"patty": 2}}
+        self.assertFalse(lambda_function.process_order("o1", recipe))
+        self.assertEqual(self.status("o1"), "FAILED")
+
+        self.assertFalse(lambda_function.process_order("o1", recipe))  # redelivered
+        self.assertEqual(self.status("o1"), "FAILED")
+        self.assertEqual(self.counts()["FAILED"], 1)
+        self.assertEqual(self.qty("patty"), 1)
+
+    def test_redelivered_message_is_skipped(self):
+        recipe = {"ingredients": {"bun": 2}}
+        self.assertTrue(lambda_function.process_order("o1", recipe))
+        self.assertEqual(lambda_function.deduct_ingredients("o1", recipe["ingredients"]), (False, None))
+        self.assertFalse(lambda_function.process_order("o1", recipe))
+        self.assertEqual(self.qty("bun"), 3)
+        self.assertEqual(self.counts()["COMPLETED"], 1)
+
+    def readd(self, name, qty):
+        """Delete `name`'s row and add it back under a new item_id."""
+        lambda_function.inventory_table.delete_item(Key={"item_id": f"id-{name}"})
+        lambda_function.inventory_table.put_item(Item={"item_id": f"new-{name}", "name": name, "qty": qty})
+
+    def test_readded_ingredient_is_resolved_again(self):
+        self.order("o2")
+        self.assertEqual(lambda_function.deduct_ingredients("o1", {"bun": 1}), (True, None))  # caches id-bun
+        self.readd("bun", 4)
+        self.assertEqual(lambda_function.deduct_ingredients("o2", {"bun": 1}), (True, None))
+        self.assertEqual(lambda_function.item_ids_by_name["bun"], "new-bun")
+
+    def test_deleted_order_is_skipped(self):
+        lambda_function.orders_table.delete_item(Key={"order_id": "o1"})
+        self.assertEqual(lambda_function.deduct_ingredients("o1", {"bun": 1}), (False, None))
+        self.assertEqual(self.qty("bun"), 5)
+        self.assertNotIn("Item", lambda_function.orders_table.get_item(Key={"order_id": "o1"}))
+
+
+class PlanFulfillmentTests(SimpleTestCase):
+    def test_first_come_first_served(self):
+        orders = [("o1", {"patty": 1, "bun": 2}), ("o2", {"patty": 2}), ("o3", {"patty": 1}), ("o4", {"bun": 1})]
+        accepted, rejected, demand = lambda_function.plan_fulfillment(orders, {"patty": 2, "bun": 2})
+        # o2 is short once o1 is served; the later, smaller o3 still fits
+        self.assertEqual(accepted, ["o1", "o3"])
+        self.assertEqual(rejected, {"o2": "patty", "o4": "bun"})
+        self.assertEqual(demand, {"patty": 2, "bun": 2})
+
+    def test_missing_ingredient_is_rejected(self):
+        accepted, rejected, demand = lambda_function.plan_fulfillment([("o1", {"truffle": 1})], {})
+        self.assertEqual((accepted, rejected, demand), ([], {"o1": "truffle"}, {}))
+
+
+class FulfilOrdersTests(LambdaTestCase):
+    def setUp(self):
+        super().setUp()
+        self.stock(patty=3, bun=10)
+        for order_id in ("o1", "o2", "o3"):
+            self.order(order_id)
+        self.batch = [
+            ("m1", "o1", {"ingredients": {"patty": 2, "bun": 2}}),
+            ("m2", "o2", {"ingredients": {"patty": 2}}),
+            ("m3", "o3", {"ingredients": {"patty": 1}}),
+        ]
+
+    def test_batch_is_committed_against_one_snapshot(self):
+        self.assertEqual(lambda_function.fulfil_orders(self.batch), ({"patty", "bun"}, []))
+        self.assertEqual([self.status(o) for o in ("o1", "o2", "o3")], ["COMPLETED", "FAILED", "COMPLETED"])
+        self.assertEqual((self.qty("patty"), self.qty("bun")), (0, 8))
+        counts = self.counts()
+        self.assertEqual((counts["COMPLETED"], counts["FAILED"]), (2, 1))
+
+    def test_stale_snapshot_falls_back_to_one_transaction_per_order(self):
+        fetch_ingredients = lambda_function.fetch_ingredients
+
+        def snapshot_then_sell_one(names, **kwargs):
+            found = fetch_ingredients(names, **kwargs)
+            # another invocation takes a patty after the snapshot was read
+            lambda_function.inventory_table.update_item(
+                Key={"item_id": "id-patty"}, UpdateExpression="SET qty = qty - :one",
+                ExpressionAttributeValues={":one": 1},
+            )
+            return found
+
+        with mock.patch.object(lambda_function, "fetch_ingredients", side_effect=snapshot_then_sell_one):
+            self.assertEqual(lambda_function.fulfil_orders(self.batch), ({"patty", "bun"}, []))
+
+        # planned o1 + o3 (3 patties) no longer fits; settled in arrival order instead
+        self.assertEqual([self.status(o) for o in ("o1", "o2", "o3")], ["COMPLETED", "FAILED", "FAILED"])
+        self.assertEqual((self.qty("patty"), self.qty("bun")), (0, 8))
+        counts = self.counts()
+        self.assertEqual((counts["COMPLETED"], counts["FAILED"]), (1, 2))
+
+    def test_readded_ingredient_is_resolved_again(self):
+        lambda_function.resolve_item_ids(["patty", "bun"])  # cache the ids
+        lambda_function.inventory_table.delete_item(Key={"item_id": "id-patty"})
+        lambda_function.inventory_table.put_item(Item={"item_id": "new-patty", "name": "patty", "qty": 3})
+
+        self.assertEqual(lambda_function.fulfil_orders(self.batch), ({"patty", "bun"}, []))
+        self.assertEqual([self.status(o) for o in ("o1", "o2", "o3")], ["COMPLETED", "FAILED", "COMPLETED"])
+        self.assertEqual(lambda_function.inventory_table.get_item(Key={"item_id": "new-patty"})["Item"]["qty"], 0)
+
+    def test_already_processed_order_falls_back_and_is_skipped(self):
+        lambda_function.orders_table.update_item(
+            Key={"order_id": "o1"}, UpdateExpression="SET order_status = :s",
+            ExpressionAttributeValues={":s": "COMPLETED"},
+        )
+        self.assertEqual(lambda_function.fulfil_orders(self.batch), ({"patty"}, []))
+        # o1 is not deducted again, which leaves enough for o2 and o3
+        self.assertEqual([self.status(o) for o in ("o1", "o2", "o3")], ["COMPLETED", "COMPLETED", "COMPLETED"])
+        self.assertEqual((self.qty("patty"), self.qty("bun")), (0, 10))
+
+
+class LowStockAlertsTests(LambdaTestCase):
+    def setUp(self):
+        super().setUp()
+        self.stock(a=1, b=2)
+        self.topic = infra_setup.create_topic("LowStockAlerts")
+        self.alerts = LowStockAlerts(lambda_function.sns, self.topic, lambda_function.inventory_table)
+        self.update_item = lambda_function.inventory_table.update_item
+
+    def published(self):
+        return [m["message"] for m in backend.active().services["sns"].published(self.topic)]
+
+    def claimed(self, name):
+        item = lambda_function.inventory_table.get_item(Key={"item_id": f"id-{name}"})["Item"]
+        return "last_alerted_at" in item
+
+    def failing_for(self, item_id, code):
+        def update_item(**kwargs):
+            if kwargs["Key"]["item_id"] == item_id:
+                raise ClientError({"Error": {"Code": code, "Message": "injected"}}, "UpdateItem")
+            return self.update_item(**kwargs)
+        return mock.patch.object(lambda_function.inventory_table, "update_item", side_effect=update_item)
+
+    def test_alert_is_suppressed_inside_the_window(self):
+        self.alerts.add("id-a", "a", 1)
+        self.alerts.flush()
+        self.alerts.add("id-a", "a", 0)
+        self.alerts.flush()
+        self.assertEqual(self.published(), ["Low stock alert: a has qty 1"])
+
+    def test_claim_error_on_one_item_does_not_strand_the_others(self):
+        self.alerts.add("id-a", "a", 1)
+        self.alerts.add("id-b", "b", 2)
+        with self.failing_for("id-b", "TransactionConflictException"):
+            self.alerts.flush()
+        self.assertEqual(self.published(), ["Low stock alert: a has qty 1"])
+        self.assertFalse(self.claimed("b"))
+
+        self.alerts.add("id-b", "b", 2)
+        self.alerts.flush()
+        self.assertEqual(self.published()[-1], "Low stock alert: b has qty 2")
+
+    def test_claims_are_released_when_publishing_fails(self):
+        self.alerts.add("id-a", "a", 1)
+        with mock.patch.object(lambda_function.sns, "publish_batch", side_effect=RuntimeError("down")):
+            self.alerts.flush()
+        self.assertEqual(self.published(), [])
+        self.assertFalse(self.claimed("a"))
+
+        self.alerts.add("id-a", "a", 1)
+        self.alerts.flush()
+        self.assertEqual(self.published(), ["Low stock alert: a has qty 1"])
+
+    def test_topic_is_resolved_again_when_not_found(self):
+        gone = self.topic.rsplit(":", 1)[0] + ":Gone"
+        alerts = LowStockAlerts(lambda_function.sns, gone, lambda_function.inventory_table,
+                                refresh_topic=lambda: self.topic)
+        alerts.add("id-a", "a", 1)
+        alerts.flush()
+        self.assertEqual(self.published(), ["Low stock alert: a has qty 1"])
+        self.assertEqual(alerts.topic_arn, self.topic)
+
+    def test_alerts_read_the_stock_left_by_this_batch(self):
+        with mock.patch.object(lambda_function.ddb, "batch_get", wraps=lambda_function.ddb.batch_get) as batch_get:
+            lambda_function.alert_low_stock(["a"])
+        self.assertTrue(batch_get.call_args.kwargs["consistent_read"])
+        self.assertEqual(lambda_function.stats.read()["low_stock"], [{"name": "a", "qty": 1}])
+
+
+# views
+class AsyncLoginRequiredTests(SimpleTestCase):
+    def request(self, user):
+        request = RequestFactory().get("/dashboard/")
+        request.user = user
+
+        async def auser():
+            return user
+        request.auser = auser
+        return request
+
+    def test_redirects_anonymous_users_on_every_django_version(self):
+        from kitchen.views import async_login_required
+
+        async def view(request):
+            return HttpResponse("ok")
+
+        signed_in = mock.Mock(is_authenticated=True)
+        for version in ((4, 2, 26, "final", 0), (5, 1, 0, "final", 0)):
+            with self.subTest(version=version), mock.patch("django.VERSION", version):
+                wrapped = async_login_required(view)
+                self.assertEqual(async_to_sync(wrapped)(self.request(AnonymousUser())).status_code, 302)
+                self.assertEqual(async_to_sync(wrapped)(self.request(signed_in)).content, b"ok")
+
+
+class BulkCreateOrdersTests(LambdaTestCase):
+    def post(self, recipe_ids):
+        from kitchen import views
+
+        request = RequestFactory().post("/orders/bulk/", json.dumps(recipe_ids), content_type="application/json")
+        request.user = mock.Mock(is_authenticated=True)
+        with mock.patch.object(views.recipe_cache, "names", return_value={"r1"}):
+            return views.bulk_create_orders(request)
+
+    def test_recreated_queue_is_resolved_again(self):
+        stale = {("sqs", aws_config.DEFAULT_QUEUE_NAME): "https://sqs.us-east-1.amazonaws.com/326603068904/gone"}
+        with mock.patch.dict(aws_config._resolved, stale, clear=True):
+            resp = self.post(["r1", "r1"])
+            url = aws_config.get_sqs_url()
+        self.assertEqual(resp.status_code, 201)
+        self.assertEqual(json.loads(resp.content)["failed_to_queue"], [])
+
+        sqs = backend.client("sqs", region_name=REGION)
+        messages = sqs.receive_message(QueueUrl=url, MaxNumberOfMessages=10)["Messages"]
+        self.assertEqual(len(messages), 2)
+
+
+class PresignedUrlCacheTests(MemoryBackendTestCase):
+    def test_workers_share_a_url_only_through_the_store(self):
+        from django.core.cache.backends.locmem import LocMemCache
+
+        s3 = S3Client()
+        store = LocMemCache("presigned-tests", {})
+        self.addCleanup(store.clear)
+
+        first, second = PresignedUrlCache(s3, "b", store=store), PresignedUrlCache(s3, "b", store=store)
+        url, expires_in = first.get_url("recipes/r1/v1/a.png")
+        self.assertEqual(expires_in, first.expires_in)
+        self.assertEqual(first.get_url("recipes/r1/v1/a.png")[0], url)
+        self.assertEqual(second.get_url("recipes/r1/v1/a.png")[0], url)
+
+
+class OrdersListCursorTests(LambdaTestCase):
+    def get(self, **params):
+        from kitchen import views
+
+        request = RequestFactory().get("/orders/", params)
+        request.user = mock.Mock(is_authenticated=True)
+        with mock.patch.object(views.recipe_cache, "names", return_value={}):
+            return views.orders_list(request)
+
+    def cursor(self, key):
+        from kitchen.views import encode_cursor
+
+        return encode_cursor(key)
+
+    def test_cursor_of_another_shape_is_a_bad_request(self):
+        for i in range(3):
+            self.order(f"o{i}")
+        self.assertEqual(self.get(page_size=2).status_code, 200)
+        self.assertEqual(self.get(page_size=2, cursor=self.cursor({"order_id": "o1"})).status_code, 200)
+
+        tampered = [
+            "not base64!", self.cursor(["o1"]), self.cursor({"order_id": 1}), self.cursor({"recipe": "o1"}),
+        ]
+        for cursor in tampered:
+            with self.subTest(cursor=cursor):
+                self.assertEqual(self.get(cursor=cursor).status_code, 400)
+        # a Scan cursor on the status index, and one for another status
+        self.assertEqual(self.get(status="PENDING", cursor=self.cursor({"order_id": "o1"})).status_code, 400)
+        other = {"order_id": "o1", "order_status": "FAILED", "created_at": "2026-10-01T12:00:00.000000+00:00"}
+        self.assertEqual(self.get(status="PENDING", cursor=self.cursor(other)).status_code, 400)
+        other["order_status"] = "PENDING"
+        self.assertEqual(self.get(status="PENDING", cursor=self.cursor(other)).status_code, 200)
+
+
+class MetricsAccessTests(SimpleTestCase):
+    def get(self, remote_addr, user=None):
+        from kitchen.views import metrics
+
+        request = RequestFactory().get("/metrics", REMOTE_ADDR=remote_addr)
+        request.user = user or AnonymousUser()
+        return metrics(request)
+
+    def test_internal_scrapers_and_staff_only(self):
+        self.assertEqual(self.get("10.1.2.3").status_code, 200)
+        self.assertEqual(self.get("127.0.0.1").status_code, 200)
+        self.assertEqual(self.get("203.0.113.7").status_code, 403)
+        self.assertEqual(self.get("203.0.113.7", mock.Mock(is_staff=False)).status_code, 403)
+        self.assertEqual(self.get("203.0.113.7", mock.Mock(is_staff=True)).status_code, 200)
+
+
+class BufferedProducerTests(SimpleTestCase):
+    def test_exit_waits_for_a_timer_flush_in_progress(self):
+        sending, release = threading.Event(), threading.Event()
+
+        class SlowQueue:
+            def send_messages_batch(self, queue_url, bodies):
+                sending.set()
+                release.wait(5)
+                return list(bodies)  # every body failed
+
+        with BufferedProducer(SlowQueue(), "url", max_wait=0.01) as producer:
+            producer.send("a")
+            self.assertTrue(sending.wait(5))  # the timer's flush has taken the buffer
+            threading.Timer(0.05, release.set).start()
+        self.assertEqual(producer.failed, ["a"])
+
+
+class CapacityEngineTests(SimpleTestCase):
+    def test_recipes_without_ingredients_are_reported_invalid(self):
+        from kitchen.capacity import CapacityEngine
+
+        recipes = [
+            {"recipe_id": "burger", "name": "Burger", "ingredients": {"bun": 2, "patty": 1}},
+            {"recipe_id": "water", "name": "Water", "ingredients": {}},
+            {"recipe_id": "air", "name": "Air", "ingredients": {"bun": 0}},
+        ]
+        summary = CapacityEngine(recipes, [{"name": "bun", "qty": 4}, {"name": "patty", "qty": 5}]).summary("balanced")
+        self.assertEqual(summary["recipes"], [
+            {"recipe_id": "burger", "name": "Burger", "max_production": 2},
+            {"recipe_id": "water", "name": "Water", "max_production": None, "invalid": "no ingredients"},
+            {"recipe_id": "air", "name": "Air", "max_production": None, "invalid": "no ingredients"},
+        ])
+        self.assertEqual(summary["plan"]["portions"], {"burger": 2, "water": None, "air": None})
@@ -13,6 +13,9 @@ urlpatterns = [
     # Orders
     path('orders/', views.orders_list, name='orders_list'),
     path('orders/create/', views.create_order, name='create_order'),
+    path('orders/bulk/', views.bulk_create_orders, name='bulk_create_orders'),
+    path('orders/archive/', views.archived_orders, name='archived_orders'),
+    path('orders/export/', views.export_orders, name='export_orders'),
     path('orders/delete/<str:order_id>/', views.delete_order, name='delete_order'),
 
     # Inventory
@@ -20,16 +23,22 @@ urlpatterns = [
     path('inventory/add/', views.add_inventory, name='add_inventory'),
     path('inventory/edit/<str:item_id>/', views.edit_inventory, name='edit_inventory'),
     path('inventory/delete/<str:item_id>/', views.delete_inventory, name='delete_inventory'),
+    path('inventory/export/', views.export_inventory, name='export_inventory'),
 
     # Recipes
     path('recipes/', views.recipe_list, name='recipe_list'),
     path('recipes/add/', views.add_recipe, name='add_recipe'),
+    path('recipes/upload-policy/', views.recipe_upload_policy, name='recipe_upload_policy'),
     path('recipes/edit/<str:recipe_id>/', views.edit_recipe, name='edit_recipe'),
     path('recipes/delete/<str:recipe_id>/', views.delete_recipe, name='delete_recipe'),
     path('recipes/download/<str:recipe_id>/', views.download_recipe_file, name='download_recipe_file'),
     
     # custom lib
     path("simulate-data/", views.simulator_data, name="simulate_data"),
+    path("capacity/", views.menu_capacity, name="menu_capacity"),
+
+    # Monitoring
+    path("metrics", views.metrics, name="metrics"),
 
 ]
 
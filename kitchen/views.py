@@ -1,19 +1,49 @@
 from django.shortcuts import render, redirect
-from django.http import HttpResponseRedirect, JsonResponse
+from django.http import (
+    HttpResponse, HttpResponseBadRequest, HttpResponseForbidden, HttpResponseRedirect, JsonResponse,
+    StreamingHttpResponse,
+)
 from django.contrib.auth.decorators import login_required
+from django.contrib.auth.views import redirect_to_login
+from django.core.handlers.asgi import ASGIRequest
+from asgiref.sync import sync_to_async
+from django.views.decorators.http import require_POST
+from django.utils.text import get_valid_filename
+from django.utils.cache import patch_cache_control
+from django.conf import settings
+from django.core.cache import caches
+import django
 
 # AWS wrapper clients
 from aws_lib.dynamodb_client import DynamoDBClient
-from aws_lib.sqs_client import SQSClient
+from aws_lib.sqs_client import SQSClient, BufferedProducer
 from aws_lib.sns_client import SNSClient
-
-from .forms import CreateOrderForm, InventoryForm, RecipeForm
-
+from aws_lib.s3_client import S3Client, PresignedUrlCache
+from aws_lib.sns_utils import LowStockAlerts
+from aws_lib.kitchen_stats import KitchenStats, STATS_TABLE
+from aws_lib.order_archive import OrderArchive, ARCHIVED_STATUSES, MAX_LOOKUP_DAYS
+from aws_lib import tracing
+
+from .forms import CreateOrderForm, InventoryForm, RecipeForm, UPLOAD_KEY_PREFIX
+from .recipe_cache import recipe_cache
+from .inventory_snapshot import inventory_snapshot
+from .capacity import CapacityEngine
+from . import exports
+
+import os
 import uuid
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
 import json
-import boto3
+import base64
+import itertools
+import ipaddress
+from boto3.dynamodb.conditions import Attr, Key
+from botocore.exceptions import ClientError
+from datetime import date, datetime, timedelta, timezone
 
-from aws_config import get_sqs_url, get_sns_topic_arn, AWS_REGION
+from aws_config import get_sqs_url, get_sns_topic_arn, forget_resolved, is_not_found
 
 # CloudKitchen lib logic -- custom library uploaded on pypi
 from cloudkitchen_lib.core import (
@@ -27,10 +57,49 @@ from cloudkitchen_lib.core import (
 ddb = DynamoDBClient()     # DynamoDB wrapper
 sqs = SQSClient()          # SQS wrapper
 sns = SNSClient()          # SNS wrapper
+s3 = S3Client()            # S3 wrapper
+
+# Bounded pool for blocking AWS calls issued concurrently by async views
+aws_executor = ThreadPoolExecutor(max_workers=getattr(settings, "AWS_FANOUT_WORKERS", 16))
+
+# Orders GSI on (order_status, created_at), see infra_setup.py
+ORDERS_STATUS_INDEX = "order_status-created_at-index"
+ORDER_STATUSES = ("PENDING", "COMPLETED", "FAILED")
+
+# Order list paging
+DEFAULT_PAGE_SIZE = 25
+MAX_PAGE_SIZE = 100
+
+# Attributes of a page cursor (ExclusiveStartKey): the table key for a Scan,
+# plus the status index keys for a Query on it
+SCAN_CURSOR_KEYS = ("order_id",)
+STATUS_CURSOR_KEYS = ("order_id", "order_status", "created_at")
+
+# Max orders accepted by one bulk intake request
+BULK_ORDER_LIMIT = 500
+
+# Finished orders moved out of DynamoDB (manage.py archive_orders)
+order_archive = OrderArchive(
+    ddb, s3, settings.ORDER_ARCHIVE["BUCKET"], prefix=settings.ORDER_ARCHIVE["PREFIX"]
+)
+ARCHIVE_DEFAULT_LIMIT = 100
+ARCHIVE_MAX_LIMIT = 1000
 
 # S3 for recipe images
 S3_BUCKET_NAME = "cloudkitchen-recipes"
-s3_client = boto3.client("s3", region_name=AWS_REGION)
+
+# Presigned image URLs, shared between workers when the recipe cache is
+_shared_cache = settings.RECIPE_CACHE.get("SHARED_BACKEND")
+image_urls = PresignedUrlCache(
+    s3, S3_BUCKET_NAME, store=caches[_shared_cache] if _shared_cache else None
+)
+
+# Browser cache lifetime for the image download redirect
+IMAGE_REDIRECT_MAX_AGE = 300
+
+# Limits enforced by the presigned upload policy
+MAX_IMAGE_BYTES = 10 * 1024 * 1024
+ALLOWED_IMAGE_TYPES = {"image/jpeg", "image/png", "image/gif", "image/webp"}
 
 
 # utility helper for sqs and sns
@@ -50,41 +119,131 @@ def sns_topic_arn():
     return arn
 
 
+def refresh_sns_topic_arn():
+    """Resolve the SNS topic ARN again, e.g. after the topic was recreated."""
+    forget_resolved()
+    return sns_topic_arn()
+
+
+def kitchen_stats():
+    """Dashboard counters (a Table per call, since resources are per-thread)."""
+    return KitchenStats(ddb.resource.Table(STATS_TABLE))
+
+
+def utc_now():
+    """ISO-8601 UTC timestamp; sorts chronologically as a string."""
+    return datetime.now(timezone.utc).isoformat(timespec="microseconds")
+
+
+def encode_cursor(key):
+    """LastEvaluatedKey -> opaque URL-safe cursor."""
+    if not key:
+        return None
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode()
+
+
+def decode_cursor(cursor, key_names):
+    """
+    Cursor -> ExclusiveStartKey (None if missing). Raises ValueError unless
+    it holds exactly the string attributes `key_names`, since any other
+    shape would reach DynamoDB and fail there.
+    """
+    if not cursor:
+        return None
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except ValueError:
+        raise ValueError("Invalid cursor") from None
+    if (not isinstance(key, dict) or set(key) != set(key_names)
+            or not all(isinstance(v, str) and v for v in key.values())):
+        raise ValueError("Invalid cursor")
+    return key
+
+
+def newest_orders(status, limit):
+    """Newest orders with one status: one page from the status index."""
+    page, _ = ddb.query_page(
+        "Orders",
+        Key("order_status").eq(status),
+        index_name=ORDERS_STATUS_INDEX,
+        limit=limit,
+        scan_forward=False
+    )
+    return page
+
+
+def merge_newest(pages, limit):
+    orders = [o for page in pages for o in page]
+    orders.sort(key=lambda o: o.get("created_at", ""), reverse=True)
+    return orders[:limit]
+
+
+async def run_aws(fn, *args, **kwargs):
+    """Run a blocking AWS call on the bounded executor (inside the request's trace)."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(aws_executor, tracing.propagate(functools.partial(fn, *args, **kwargs)))
+
+
+def async_login_required(view):
+    """
+    login_required for async views. Django's own decorator handles
+    coroutine views only from 5.1 (earlier it returns the unawaited
+    coroutine), so on older versions the check is done here, with the user
+    loaded off the event loop.
+    """
+    if django.VERSION >= (5, 1):
+        return login_required(view)
+
+    @functools.wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        is_authenticated = await sync_to_async(lambda: request.user.is_authenticated)()
+        if not is_authenticated:
+            return redirect_to_login(request.get_full_path())
+        return await view(request, *args, **kwargs)
+    return wrapper
+
+
+def send_order_message(body):
+    """Send to the orders queue, re-resolving its URL once if it has gone away."""
+    try:
+        return sqs.send_message(sqs_queue_url(), body)
+    except ClientError as e:
+        if not is_not_found(e):
+            raise
+        forget_resolved()
+        return sqs.send_message(sqs_queue_url(), body)
+
+
 # logic for dashboard view
-@login_required
-def dashboard(request):
+@async_login_required
+async def dashboard(request):
     """
-    Loads:
-    - All orders
-    - Inventory items
+    Loads, concurrently:
+    - Order count and low-stock alerts (qty < 5) from the Stats item
+    - The most recent orders (one page per status)
     - Recipes for name mapping & simulator dropdown
-    - Low-stock alerts (qty < 5)
 
     Sends data to dashboard page for display.
     """
-    orders = ddb.scan("Orders")
-    inventory = ddb.scan("Inventory")
+    stats, recipes, *pages = await asyncio.gather(
+        run_aws(lambda: kitchen_stats().read()),
+        run_aws(recipe_cache.all),
+        *(run_aws(newest_orders, status, DEFAULT_PAGE_SIZE) for status in ORDER_STATUSES)
+    )
+    orders = merge_newest(pages, DEFAULT_PAGE_SIZE)
 
     # Map recipe_id → recipe_name for easy readability
-    recipes = ddb.scan("Recipes")
     recipe_lookup = {r["recipe_id"]: r["name"] for r in recipes}
 
     # Attach readable recipe names to orders
     for o in orders:
         o["recipe_name"] = recipe_lookup.get(o.get("recipe"), "Unknown")
 
-    # Detect low stock items
-    low_stock = [
-        item for item in inventory
-        if str(item.get("qty", item.get("quantity", 999999))).isdigit()
-        and int(item.get("qty", item.get("quantity", 999999))) < 5
-    ]
-
-    return render(request, "dashboard.html", {
+    return await sync_to_async(render)(request, "dashboard.html", {
+        "total_orders": stats["total_orders"],
         "orders": orders,
-        "inventory": inventory,
         "recipes": recipes,     # used by custom lib UI dropdown to select item
-        "low_stock": low_stock,
+        "low_stock": stats["low_stock"],
     })
 
 
@@ -95,11 +254,11 @@ def simulator_data(request):
     if not recipe_id:
         return JsonResponse({"error": "Missing recipe_id"}, status=400)
 
-    recipe = ddb.get("Recipes", {"recipe_id": recipe_id})
+    recipe = recipe_cache.get(recipe_id)
     if not recipe:
         return JsonResponse({"error": "Recipe not found"}, status=404)
 
-    inventory = ddb.scan("Inventory")
+    inventory = inventory_snapshot.dicts()
 
     # Library computations
     max_prod = max_production(recipe["ingredients"], inventory)
@@ -119,74 +278,327 @@ def simulator_data(request):
     })
 
 
+@login_required
+def menu_capacity(request):
+    """
+    Max producible portions for every recipe in one vectorized pass.
+    Optional ?plan=balanced|lp adds a mixed production plan.
+    """
+    strategy = request.GET.get("plan")
+    if strategy not in (None, "balanced", "lp"):
+        return JsonResponse({"error": "plan must be 'balanced' or 'lp'"}, status=400)
+
+    engine = CapacityEngine(recipe_cache.all(), inventory_snapshot.dicts())
+    return JsonResponse({
+        **engine.summary(strategy),
+        "inventory_version": inventory_snapshot.version,
+    })
+
+
 # order management page view
 @login_required
 def orders_list(request):
     """
-    Shows list of all orders with recipe names.
+    Shows one page of orders with recipe names.
+
+    Filtering by status is a keyset-paginated Query on the status index
+    (newest first); "All" pages through the table with Scan. `cursor`
+    carries the position of the next page. A full order_id in `search` is
+    a direct lookup; a partial one reads on until a page of matches is found.
     """
-    orders = ddb.scan("Orders")
-    recipe_lookup = {r["recipe_id"]: r["name"] for r in ddb.scan("Recipes")}
+    status = request.GET.get("status")
+    search = request.GET.get("search")
+    try:
+        page_size = min(max(int(request.GET.get("page_size", DEFAULT_PAGE_SIZE)), 1), MAX_PAGE_SIZE)
+    except ValueError:
+        page_size = DEFAULT_PAGE_SIZE
+    try:
+        start_key = decode_cursor(request.GET.get("cursor"), STATUS_CURSOR_KEYS if status else SCAN_CURSOR_KEYS)
+    except ValueError as e:
+        return HttpResponseBadRequest(str(e))
+    if start_key and status and start_key["order_status"] != status:
+        return HttpResponseBadRequest("Invalid cursor")
+
+    # order_ids are lowercase UUIDs
+    needle = search.strip().lower() if search else ""
+
+    if needle and is_order_id(needle):
+        order = ddb.get("Orders", {"order_id": needle})
+        orders = [order] if order and status in (None, "", order.get("order_status")) else []
+        last_key = None
+    elif needle:
+        orders, last_key = search_orders(needle, status, page_size, start_key)
+    elif status:
+        orders, last_key = ddb.query_page(
+            "Orders",
+            Key("order_status").eq(status),
+            index_name=ORDERS_STATUS_INDEX,
+            limit=page_size,
+            start_key=start_key,
+            scan_forward=False,
+        )
+    else:
+        orders, last_key = ddb.scan_page("Orders", limit=page_size, start_key=start_key)
 
     # Attach readable recipe names
+    recipe_lookup = recipe_cache.names()
     for o in orders:
         o["recipe_name"] = recipe_lookup.get(o.get("recipe"), "Unknown")
 
-    # Optional status filter
-    status = request.GET.get("status")
-    if status:
-        orders = [o for o in orders if o.get("order_status") == status]
+    next_query = None
+    if last_key:
+        params = request.GET.copy()
+        params["cursor"] = encode_cursor(last_key)
+        next_query = params.urlencode()
 
-    # Optional order_id search filter
-    search = request.GET.get("search")
-    if search:
-        orders = [o for o in orders if search.lower() in o.get("order_id", "").lower()]
+    params = request.GET.copy()
+    params.pop("cursor", None)
+    first_query = params.urlencode()
 
     return render(request, "orders_list.html", {
         "orders": orders,
         "status": status,
-        "search": search
+        "search": search,
+        "next_query": next_query,
+        "first_query": first_query,
+        "paged": bool(start_key),
     })
 
+def is_order_id(text):
+    try:
+        return str(uuid.UUID(text)) == text
+    except ValueError:
+        return False
+
+
+def search_orders(needle, status, page_size, start_key):
+    """
+    One page of orders whose order_id contains `needle`, newest first within
+    a status. DynamoDB filters after reading, so pages are read until
+    `page_size` orders match; the returned key points just past the last
+    order returned.
+    """
+    filters = {"FilterExpression": Attr("order_id").contains(needle)}
+    found = []
+    while True:
+        if status:
+            items, start_key = ddb.query_page(
+                "Orders",
+                Key("order_status").eq(status),
+                index_name=ORDERS_STATUS_INDEX,
+                start_key=start_key,
+                scan_forward=False,
+                **filters
+            )
+        else:
+            items, start_key = ddb.scan_page("Orders", start_key=start_key, **filters)
+        found += items
+        if len(found) >= page_size or not start_key:
+            break
+
+    if len(found) > page_size:
+        found = found[:page_size]
+        key_names = STATUS_CURSOR_KEYS if status else SCAN_CURSOR_KEYS
+        start_key = {k: found[-1][k] for k in key_names}
+    return found, start_key
+
+
 # creting order and processing order
-@login_required
-def create_order(request):
+@async_login_required
+async def create_order(request):
     """
     Creates a new order:
     1. Saves to DynamoDB
-    2. Sends to SQS for async processing
+    2. Once saved, concurrently sends to SQS for async processing and
+       bumps the dashboard counters
+
+    (A failed save queues nothing, so the order Lambda never sees a message
+    without its row.)
     """
     if request.method == "POST":
-        form = CreateOrderForm(request.POST)
+        form = await run_aws(bound_order_form, request.POST)
         if form.is_valid():
             order_id = str(uuid.uuid4())
             recipe_id = form.cleaned_data['recipe']
 
             # Save order to DB
-            ddb.put("Orders", {
+            await run_aws(ddb.put, "Orders", {
                 "order_id": order_id,
                 "recipe": recipe_id,
-                "order_status": "PENDING"
+                "order_status": "PENDING",
+                "created_at": utc_now()
             })
-
-            # Push event to SQS
-            sqs.send_message(
-                sqs_queue_url(),
-                json.dumps({"order_id": order_id, "recipe": recipe_id})
+            await asyncio.gather(
+                # Push event to SQS
+                run_aws(send_order_message, json.dumps({"order_id": order_id, "recipe": recipe_id})),
+                run_aws(lambda: kitchen_stats().order_created()),
             )
 
             return redirect("orders_list")
 
     else:
-        form = CreateOrderForm()
+        form = await run_aws(CreateOrderForm)
+
+    return await sync_to_async(render)(request, "create_order.html", {"form": form})
+
+
+def bound_order_form(data):
+    """Build and validate a CreateOrderForm (loads recipes, so runs off the event loop)."""
+    form = CreateOrderForm(data)
+    form.is_valid()
+    return form
+
+
+@login_required
+@require_POST
+def bulk_create_orders(request):
+    """
+    Bulk order intake for aggregator integrations.
+    Body is a JSON list of recipe_ids; orders are written with
+    BatchWriteItem and queued with SendMessageBatch.
+    """
+    try:
+        recipe_ids = json.loads(request.body)
+    except ValueError:
+        return JsonResponse({"error": "Body must be a JSON list of recipe_ids"}, status=400)
+    if (not isinstance(recipe_ids, list) or not recipe_ids
+            or not all(isinstance(r, str) for r in recipe_ids)):
+        return JsonResponse({"error": "Body must be a JSON list of recipe_ids"}, status=400)
+    if len(recipe_ids) > BULK_ORDER_LIMIT:
+        return JsonResponse({"error": f"At most {BULK_ORDER_LIMIT} orders per request"}, status=400)
+
+    known = recipe_cache.names()
+    unknown = sorted({str(r) for r in recipe_ids if r not in known})
+    if unknown:
+        return JsonResponse({"error": "Unknown recipe_ids", "recipe_ids": unknown}, status=400)
+
+    created_at = utc_now()
+    orders = [
+        {"order_id": str(uuid.uuid4()), "recipe": recipe_id, "order_status": "PENDING", "created_at": created_at}
+        for recipe_id in recipe_ids
+    ]
+
+    # Save orders to DB
+    ddb.batch_write("Orders", puts=orders)
+    kitchen_stats().order_created(len(orders))
+
+    # Push events to SQS in batches of 10
+    with BufferedProducer(sqs, sqs_queue_url()) as producer:
+        for o in orders:
+            producer.send(json.dumps({"order_id": o["order_id"], "recipe": o["recipe"]}))
+
+    unsent = producer.failed
+    if unsent and any(isinstance(e, ClientError) and is_not_found(e) for e in producer.errors):
+        # the queue has gone away (e.g. recreated): re-resolve its URL and resend once
+        forget_resolved()
+        try:
+            unsent = sqs.send_messages_batch(sqs_queue_url(), unsent)
+        except ClientError as e:
+            print(f"Error sending message batch: {e}")
+
+    failed = [json.loads(body)["order_id"] for body in unsent]
+    return JsonResponse({
+        "order_ids": [o["order_id"] for o in orders],
+        "failed_to_queue": failed
+    }, status=201)
+
+
+@login_required
+def archived_orders(request):
+    """
+    Historical lookup in the S3 order archive (JSON).
+
+    ?from=YYYY-MM-DD&to=YYYY-MM-DD bound the creation dates read (default: the
+    single `from` day; `from` defaults to ORDER_ARCHIVE["AFTER_DAYS"] ago);
+    optional status, order_id and recipe filter the orders; limit caps the result.
+    """
+    try:
+        default_day = datetime.now(timezone.utc).date() - timedelta(days=settings.ORDER_ARCHIVE["AFTER_DAYS"])
+        start = date.fromisoformat(request.GET.get("from") or default_day.isoformat())
+        end = date.fromisoformat(request.GET.get("to") or start.isoformat())
+        limit = min(max(int(request.GET.get("limit", ARCHIVE_DEFAULT_LIMIT)), 1), ARCHIVE_MAX_LIMIT)
+    except ValueError:
+        return JsonResponse({"error": "from/to must be YYYY-MM-DD and limit a number"}, status=400)
+    if end < start or (end - start).days >= MAX_LOOKUP_DAYS:
+        return JsonResponse({"error": f"to must be within {MAX_LOOKUP_DAYS} days after from"}, status=400)
+
+    status = request.GET.get("status")
+    if status and status not in ARCHIVED_STATUSES:
+        return JsonResponse({"error": f"status must be one of {', '.join(ARCHIVED_STATUSES)}"}, status=400)
+    match = {k: request.GET[k] for k in ("order_id", "recipe") if request.GET.get(k)}
+
+    found = order_archive.find(start, end, statuses=[status] if status else None, **match)
+    orders = list(itertools.islice(found, limit + 1))
+    return JsonResponse({
+        "orders": orders[:limit],
+        "truncated": len(orders) > limit,
+    })
+
+
+@login_required
+def export_orders(request):
+    """
+    Streams Orders as CSV or NDJSON (?format=csv|ndjson, ?gzip=1).
+    Optional ?status= (a Query on the status index) and ?from=/?to=
+    (YYYY-MM-DD, inclusive) filter server-side.
+    """
+    status = request.GET.get("status")
+    if status and status not in ORDER_STATUSES:
+        return JsonResponse({"error": f"status must be one of {', '.join(ORDER_STATUSES)}"}, status=400)
+    try:
+        since = exports.parse_day(request.GET.get("from"))
+        until = exports.parse_day(request.GET.get("to"), end=True)
+    except ValueError:
+        return JsonResponse({"error": "from/to must be YYYY-MM-DD"}, status=400)
+    return export_response(request, "orders", status=status, since=since, until=until,
+                           recipe_names=recipe_cache.names())
+
+
+@login_required
+def export_inventory(request):
+    """Streams Inventory as CSV or NDJSON (?format=csv|ndjson, ?gzip=1)."""
+    return export_response(request, "inventory")
+
+
+def export_response(request, dataset, **filters):
+    """
+    StreamingHttpResponse over a paginated read of `dataset`; constant memory.
+    Under ASGI the content must be an async iterator (Django would otherwise
+    collect a sync one into a list first), so chunks are pulled one at a time
+    on the AWS executor.
+    """
+    fmt = request.GET.get("format", "csv")
+    if fmt not in exports.FORMATS:
+        return JsonResponse({"error": f"format must be one of {', '.join(exports.FORMATS)}"}, status=400)
+    compress = request.GET.get("gzip") in ("1", "true")
+
+    rows = exports.iter_rows(ddb, dataset, **filters)
+    chunks = exports.export_chunks(rows, dataset, fmt, compress)
+    response = StreamingHttpResponse(
+        stream_async(chunks) if isinstance(request, ASGIRequest) else chunks,
+        content_type="application/gzip" if compress else exports.FORMATS[fmt],
+    )
+    response["Content-Disposition"] = f'attachment; filename="{exports.filename(dataset, fmt, compress)}"'
+    return response
 
-    return render(request, "create_order.html", {"form": form})
+
+async def stream_async(chunks):
+    """Async iterator over a blocking one, one next() per chunk off the event loop."""
+    chunks = iter(chunks)
+    while True:
+        chunk = await run_aws(next, chunks, None)
+        if chunk is None:
+            return
+        yield chunk
 
 
 @login_required
 def delete_order(request, order_id):
     """Deletes order from DynamoDB."""
-    ddb.delete("Orders", {"order_id": order_id})
+    resp = ddb.delete("Orders", {"order_id": order_id}, ReturnValues="ALL_OLD")
+    old = resp.get("Attributes")
+    if old:
+        kitchen_stats().order_deleted(old.get("order_status", "UNKNOWN"))
     return redirect("orders_list")
 
 
@@ -194,7 +606,7 @@ def delete_order(request, order_id):
 @login_required
 def inventory_list(request):
     """Displays all items."""
-    inventory = ddb.scan("Inventory")
+    inventory = inventory_snapshot.items()
     return render(request, "inventory.html", {"inventory": inventory})
 
 
@@ -207,11 +619,16 @@ def add_inventory(request):
             qty = form.cleaned_data["qty"]
             item_id = str(uuid.uuid4())
 
-            ddb.put("Inventory", {"item_id": item_id, "name": name, "qty": qty})
+            inventory_snapshot.put(item_id, name, qty)
+            kitchen_stats().item_stock(item_id, name, qty)
 
-            # Send low stock alert
+            # Send low stock alert in the background, deduped per item
             if qty < 5:
-                sns.publish(sns_topic_arn(), f"Low stock alert: {name} has qty {qty}")
+                alerts = LowStockAlerts(
+                    sns.client, sns_topic_arn(), ddb.resource.Table("Inventory"), refresh_topic=refresh_sns_topic_arn
+                )
+                alerts.add(item_id, name, qty)
+                alerts.flush(background=True)
 
             return redirect("inventory_list")
 
@@ -232,11 +649,9 @@ def edit_inventory(request, item_id): # edit all the items listed in the invento
         if form.is_valid():
             qty = form.cleaned_data["qty"]
 
-            ddb.put("Inventory", {
-                "item_id": item_id,
-                "name": item["name"],   # Name is immutable, cannot be changes as we can only change the qty
-                "qty": qty
-            })
+            # Name is immutable, cannot be changes as we can only change the qty
+            if inventory_snapshot.set_qty(item_id, qty):
+                kitchen_stats().item_stock(item_id, item["name"], qty)
 
             return redirect("inventory_list")
 
@@ -253,7 +668,8 @@ def edit_inventory(request, item_id): # edit all the items listed in the invento
 @login_required
 def delete_inventory(request, item_id):
     """Removes an item from inventory."""
-    ddb.delete("Inventory", {"item_id": item_id})
+    inventory_snapshot.delete(item_id)
+    kitchen_stats().item_removed(item_id)
     return redirect("inventory_list")
 
 
@@ -261,10 +677,46 @@ def delete_inventory(request, item_id):
 @login_required
 def recipe_list(request):
     """Shows all recipes."""
-    recipes = ddb.scan("Recipes")
+    recipes = recipe_cache.all()
     return render(request, "recipes.html", {"recipes": recipes})
 
 
+def recipe_image_key(form, request, recipe_id, current=None):
+    """
+    S3 key for a submitted recipe form's image.
+
+    Browsers upload straight to S3 (see recipe_upload_policy) and submit the
+    key; clients that post the file itself get a managed multipart upload.
+    Every upload gets a new key, never overwriting an image that browsers
+    may still have cached under its old URL.
+    """
+    image_file = request.FILES.get("image")
+    if image_file:
+        filename = get_valid_filename(os.path.basename(image_file.name)) or "image"
+        s3_key = f"recipes/{recipe_id}/{uuid.uuid4()}/{filename}"
+        s3.upload_fileobj(S3_BUCKET_NAME, s3_key, image_file, image_file.content_type)
+        return s3_key
+    return form.cleaned_data.get("s3_key") or current
+
+
+@login_required
+@require_POST
+def recipe_upload_policy(request):
+    """
+    Issues a presigned POST so the browser can upload a recipe image
+    straight to S3, limited to one key, one image type and MAX_IMAGE_BYTES.
+    """
+    content_type = request.POST.get("content_type", "")
+    if content_type not in ALLOWED_IMAGE_TYPES:
+        return JsonResponse({"error": "Unsupported image type"}, status=400)
+
+    filename = get_valid_filename(os.path.basename(request.POST.get("filename", ""))) or "image"
+    key = f"{UPLOAD_KEY_PREFIX}{uuid.uuid4()}/{filename}"
+    post = s3.presigned_post(S3_BUCKET_NAME, key, content_type, MAX_IMAGE_BYTES)
+
+    return JsonResponse({"url": post["url"], "fields": post["fields"], "key": key})
+
+
 @login_required
 def add_recipe(request):
     """
@@ -277,21 +729,12 @@ def add_recipe(request):
             recipe_id = str(uuid.uuid4())
             name = form.cleaned_data['name']
             ingredients = form.cleaned_data['ingredients']
-            image_file = request.FILES.get('image')
-
-            # Upload image to S3
-            s3_key = None
-            if image_file:
-                s3_key = f"recipes/{recipe_id}/{image_file.name}"
-                s3_client.put_object(
-                    Bucket=S3_BUCKET_NAME,
-                    Key=s3_key,
-                    Body=image_file,
-                    ContentType=image_file.content_type
-                )
 
-            # Save recipe to DB
-            ddb.put("Recipes", {
+            # Image already uploaded by the browser, or sent through Django
+            s3_key = recipe_image_key(form, request, recipe_id)
+
+            # Save recipe to DB (and cache)
+            recipe_cache.put({
                 "recipe_id": recipe_id,
                 "name": name,
                 "ingredients": ingredients,
@@ -311,28 +754,18 @@ def edit_recipe(request, recipe_id):
     """
     Edit a recipe including S3 image re-upload.
     """
-    recipe = ddb.get("Recipes", {"recipe_id": recipe_id})
+    recipe = recipe_cache.get(recipe_id)
 
     if request.method == "POST":
         form = RecipeForm(request.POST, request.FILES)
         if form.is_valid():
             name = form.cleaned_data["name"]
             ingredients = form.cleaned_data["ingredients"]
-            image_file = request.FILES.get('image')
-
-            s3_key = recipe.get("s3_key")
 
             # Replace image if a new one is uploaded
-            if image_file:
-                s3_key = f"recipes/{recipe_id}/{image_file.name}"
-                s3_client.put_object(
-                    Bucket=S3_BUCKET_NAME,
-                    Key=s3_key,
-                    Body=image_file,
-                    ContentType=image_file.content_type
-                )
+            s3_key = recipe_image_key(form, request, recipe_id, recipe.get("s3_key"))
 
-            ddb.put("Recipes", {
+            recipe_cache.put({
                 "recipe_id": recipe_id,
                 "name": name,
                 "ingredients": ingredients,
@@ -355,23 +788,48 @@ def edit_recipe(request, recipe_id):
 @login_required
 def delete_recipe(request, recipe_id):
     """Delete recipe from DynamoDB."""
-    ddb.delete("Recipes", {"recipe_id": recipe_id})
+    recipe_cache.delete(recipe_id)
     return redirect("recipe_list")
 
 
 @login_required
 def download_recipe_file(request, recipe_id):
     """
-    Generates a temporary (presigned) URL so the user can download
-    the recipe image stored in S3.
+    Redirects to a temporary (presigned) URL so the user can download
+    the recipe image stored in S3. The URL is reused until shortly before
+    it expires, so the browser can cache both the redirect and the image.
     """
-    recipe = ddb.get("Recipes", {"recipe_id": recipe_id})
+    recipe = recipe_cache.get(recipe_id)
     if not recipe or not recipe.get("s3_key"):
         return redirect("recipe_list")
 
-    presigned_url = s3_client.generate_presigned_url(
-        "get_object",
-        Params={"Bucket": S3_BUCKET_NAME, "Key": recipe['s3_key']},
-        ExpiresIn=300
+    presigned_url, expires_in = image_urls.get_url(recipe["s3_key"])
+    response = redirect(presigned_url)
+
+    # short enough that a replaced image shows up soon after an edit
+    max_age = min(expires_in - image_urls.refresh_before, IMAGE_REDIRECT_MAX_AGE)
+    patch_cache_control(response, private=True, max_age=max(max_age, 0))
+    return response
+
+
+# monitoring
+def internal_client(request):
+    """True if the request comes from settings.METRICS_ALLOWED_NETWORKS."""
+    try:
+        address = ipaddress.ip_address(request.META.get("REMOTE_ADDR", ""))
+    except ValueError:
+        return False
+    return any(address in ipaddress.ip_network(n) for n in getattr(settings, "METRICS_ALLOWED_NETWORKS", ()))
+
+
+def metrics(request):
+    """
+    AWS call and per-view totals in Prometheus text format. Open to the
+    scraper on an internal network (no login) and to signed-in staff.
+    """
+    if not (internal_client(request) or request.user.is_staff):
+        return HttpResponseForbidden()
+    return HttpResponse(
+        tracing.registry.prometheus(),
+        content_type="text/plain; version=0.0.4; charset=utf-8"
     )
-    return redirect(presigned_url)
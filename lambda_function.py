@@ -1,6 +1,15 @@
 import json
+import os
+import threading
+import time
 from decimal import Decimal
-import boto3
+from boto3.dynamodb.conditions import Key
+from botocore.exceptions import ClientError
+
+from aws_lib.dynamodb_client import DynamoDBClient
+from aws_lib.kitchen_stats import KitchenStats, STATS_TABLE
+from aws_lib.sns_utils import LowStockAlerts
+from aws_lib import backend, tracing
 
 AWS_REGION = "us-east-1"
 
@@ -9,17 +18,58 @@ ORDERS_TABLE = "Orders"
 INVENTORY_TABLE = "Inventory"
 RECIPES_TABLE = "Recipes"
 
+# GSI on Inventory.name (see infra_setup.create_table)
+INVENTORY_NAME_INDEX = "name-index"
+
+# Orders planned together per transaction (TransactWriteItems allows 100 items)
+PLAN_MAX_ORDERS = 25
+
+# Finished orders get an expires_at (epoch seconds) for the Orders table TTL.
+# Keep it well past the archive job's age (ORDER_ARCHIVE["AFTER_DAYS"]) so
+# orders are archived before DynamoDB drops them.
+ORDER_TTL_DAYS = int(os.getenv("ORDER_TTL_DAYS", "90"))
+
 # SNS topic ARN for low-stock alerts
 SNS_TOPIC_ARN = "arn:aws:sns:us-east-1:326603068904:LowStockAlerts"
 
-# AWS Clients
-dynamodb = boto3.resource("dynamodb", region_name=AWS_REGION)
-sqs = boto3.client("sqs", region_name=AWS_REGION)
-sns = boto3.client("sns", region_name=AWS_REGION)
 
-orders_table = dynamodb.Table(ORDERS_TABLE)
-inventory_table = dynamodb.Table(INVENTORY_TABLE)
-recipes_table = dynamodb.Table(RECIPES_TABLE)
+class PerThread:
+    """
+    Proxy to an object built on first use in each thread. boto3 resources
+    and their Tables are not thread-safe, and run_order_worker calls
+    lambda_handler from several consumer threads (Lambda itself uses one).
+    """
+
+    def __init__(self, build):
+        self._build = build
+        self._local = threading.local()
+
+    def __getattr__(self, name):
+        obj = getattr(self._local, "obj", None)
+        if obj is None:
+            obj = self._local.obj = self._build()
+        return getattr(obj, name)
+
+
+# AWS Clients (traced; AWS_BACKEND selects real AWS or the local stand-ins).
+# Low-level clients are thread-safe and shared; the resource is per thread.
+dynamodb = PerThread(lambda: backend.resource("dynamodb", region_name=AWS_REGION))
+sqs = backend.client("sqs", region_name=AWS_REGION)
+sns = backend.client("sns", region_name=AWS_REGION)
+
+# Wrapper for the chunked, retrying batch reads (pools its resource per thread)
+ddb = DynamoDBClient()
+
+orders_table = PerThread(lambda: dynamodb.Table(ORDERS_TABLE))
+inventory_table = PerThread(lambda: dynamodb.Table(INVENTORY_TABLE))
+recipes_table = PerThread(lambda: dynamodb.Table(RECIPES_TABLE))
+
+# Dashboard counters, bumped after every committed order status transition
+stats = KitchenStats(PerThread(lambda: dynamodb.Table(STATS_TABLE)))
+
+# Inventory names never change, so name -> item_id is cached for the container's lifetime
+item_ids_by_name = {}
+
 
 # to convert dynamodb decimal
 def to_int(value):
@@ -27,88 +77,428 @@ def to_int(value):
         return int(value)
     return value
 
+
+def load_item_ids_from_scan():
+    """Fallback when the name index is missing: build the whole name map in one scan."""
+    scan_kwargs = {"ProjectionExpression": "item_id, #n", "ExpressionAttributeNames": {"#n": "name"}}
+    while True:
+        resp = inventory_table.scan(**scan_kwargs)
+        for item in resp.get("Items", []):
+            item_ids_by_name.setdefault(item["name"], item["item_id"])
+        if "LastEvaluatedKey" not in resp:
+            return
+        scan_kwargs["ExclusiveStartKey"] = resp["LastEvaluatedKey"]
+
+
+def resolve_item_ids(names):
+    """Map ingredient names to Inventory item_ids via the name index."""
+    for name in names:
+        if name in item_ids_by_name:
+            continue
+        try:
+            resp = inventory_table.query(
+                IndexName=INVENTORY_NAME_INDEX,
+                KeyConditionExpression=Key("name").eq(name)
+            )
+        except ClientError as e:
+            if e.response["Error"]["Code"] != "ValidationException":
+                raise
+            print(f"Index {INVENTORY_NAME_INDEX} not found, falling back to a scan.")
+            load_item_ids_from_scan()
+            break
+        items = resp.get("Items", [])
+        if items:
+            item_ids_by_name[name] = items[0]["item_id"]
+
+    return {name: item_ids_by_name[name] for name in names if name in item_ids_by_name}
+
+
+def fetch_ingredients(names, consistent_read=False):
+    """
+    Fetch the inventory rows for every ingredient name with BatchGetItem
+    (100 keys per call, UnprocessedKeys retried with backoff).
+    Returns {name: item}; names with no inventory row are left out.
+    """
+    found, pending = {}, list(names)
+    for _ in range(2):
+        ids = resolve_item_ids(pending)
+        if not ids:
+            break
+
+        items = ddb.batch_get(
+            INVENTORY_TABLE, [{"item_id": i} for i in set(ids.values())], consistent_read=consistent_read
+        )
+        items_by_id = {item["item_id"]: item for item in items}
+
+        pending = []
+        for name, item_id in ids.items():
+            if item_id in items_by_id:
+                found[name] = items_by_id[item_id]
+            else:
+                # item was deleted since we cached its id; look the name up
+                # again in case it was re-added under a new one
+                item_ids_by_name.pop(name, None)
+                pending.append(name)
+        if not pending:
+            break
+    return found
+
+def order_expiry():
+    """TTL timestamp for an order finishing now."""
+    return Decimal(int(time.time()) + ORDER_TTL_DAYS * 86400)
+
+
+def set_order_status(order_id, status, count_stats=True):
+    """
+    Move a PENDING order to `status` with a conditional update, then bump the
+    dashboard counters (unless `count_stats` is False, for callers that bump
+    them once per batch). Returns False if it is no longer PENDING or no
+    longer exists (deleted after it was queued).
+    """
+    try:
+        orders_table.update_item(
+            Key={"order_id": order_id},
+            UpdateExpression="SET order_status = :s, expires_at = :expires",
+            ConditionExpression="order_status = :pending",
+            ExpressionAttributeValues={":s": status, ":pending": "PENDING", ":expires": order_expiry()},
+            ReturnValuesOnConditionCheckFailure="ALL_OLD",
+        )
+    except ClientError as e:
+        if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+            raise
+        if "Item" not in e.response:
+            print(f"Order {order_id} no longer exists, skipping.")
+        return False
+    if count_stats:
+        stats.order_finished(status)
+    return True
+
+
+def deduct_ingredients(order_id, ingredients_needed, retry_stale=True):
+    """
+    Check and deduct a recipe's ingredients in one TransactWriteItems call.
+
+    Every ingredient gets a conditional `qty >= :needed` decrement, and the
+    order is moved PENDING -> COMPLETED in the same transaction, so
+    concurrent invocations cannot oversell stock or double-process an order.
+
+    Returns (committed, failed_ingredient):
+    - (True, None)   inventory deducted, order COMPLETED
+    - (False, name)  `name` is missing or short on stock; nothing was written
+    - (False, None)  the order is no longer PENDING (e.g. SQS redelivery)
+                     or no longer exists
+
+    A cached item_id whose row was deleted is dropped and the names are
+    resolved again once (`retry_stale`), in case the ingredient was re-added.
+    """
+    names = list(ingredients_needed)
+    ids = resolve_item_ids(names)
+    for name in names:
+        if name not in ids:
+            return False, name
+
+    transact_items = [
+        {
+            "Update": {
+                "TableName": INVENTORY_TABLE,
+                "Key": {"item_id": ids[name]},
+                "UpdateExpression": "SET qty = qty - :needed",
+                "ConditionExpression": "qty >= :needed",
+                "ExpressionAttributeValues": {":needed": Decimal(ingredients_needed[name])},
+                "ReturnValuesOnConditionCheckFailure": "ALL_OLD",
+            }
+        }
+        for name in names
+    ]
+    transact_items.append({
+        "Update": {
+            "TableName": ORDERS_TABLE,
+            "Key": {"order_id": order_id},
+            "UpdateExpression": "SET order_status = :done, expires_at = :expires",
+            "ConditionExpression": "order_status = :pending",
+            "ExpressionAttributeValues": {":done": "COMPLETED", ":pending": "PENDING", ":expires": order_expiry()},
+            "ReturnValuesOnConditionCheckFailure": "ALL_OLD",
+        }
+    })
+
+    try:
+        dynamodb.meta.client.transact_write_items(TransactItems=transact_items)
+    except ClientError as e:
+        if e.response["Error"]["Code"] != "TransactionCanceledException":
+            raise
+        reasons = e.response.get("CancellationReasons", [])
+        for name, reason in zip(names, reasons):
+            if reason.get("Code") == "ConditionalCheckFailed":
+                if "Item" not in reason:
+                    # item was deleted since we cached its id
+                    item_ids_by_name.pop(name, None)
+                    if retry_stale:
+                        return deduct_ingredients(order_id, ingredients_needed, retry_stale=False)
+                return False, name
+        if len(reasons) > len(names) and reasons[len(names)].get("Code") == "ConditionalCheckFailed":
+            # the web app writes the order before queueing it, so a missing
+            # row was deleted meanwhile: nothing to do
+            return False, None
+        raise
+
+    stats.order_finished("COMPLETED")
+    return True, None
+
+
+def fetch_recipes(recipe_ids):
+    """
+    Fetch each distinct recipe once with BatchGetItem (100 keys per call,
+    UnprocessedKeys retried with backoff). Returns {recipe_id: recipe}.
+    """
+    keys = [{"recipe_id": r} for r in recipe_ids]
+    if not keys:
+        return {}
+    return {recipe["recipe_id"]: recipe for recipe in ddb.batch_get(RECIPES_TABLE, keys)}
+
+
+def alert_low_stock(names):
+    """
+    Send one coalesced batch of alerts for named ingredients now below 5 and
+    record them in the dashboard low-stock set. (Deductions only lower qty,
+    so items at or above 5 were never in the set.) Read strongly consistent:
+    an eventually consistent read can still return the qty from before this
+    batch's deduction and miss the alert.
+    """
+    alerts = LowStockAlerts(sns, SNS_TOPIC_ARN, inventory_table)
+    for item_name, inv_item in fetch_ingredients(list(names), consistent_read=True).items():
+        new_qty = to_int(inv_item.get("qty", 0))
+        if new_qty < 5:
+            stats.item_stock(inv_item["item_id"], item_name, new_qty)
+            alerts.add(inv_item["item_id"], item_name, new_qty)
+    alerts.flush()
+
+
+def process_order(order_id, recipe):
+    """Process one order. Returns True if inventory was deducted."""
+    if not recipe:
+        print(f"Recipe for order {order_id} not found. Marking order failed.")
+        set_order_status(order_id, "FAILED")
+        return False
+
+    # Check + deduct inventory and complete the order atomically
+    committed, failed_item = deduct_ingredients(order_id, recipe["ingredients"])
+
+    if committed:
+        print(f"Order {order_id} completed successfully.")
+    elif failed_item:
+        set_order_status(order_id, "FAILED")
+        print(f"Order {order_id} failed due to insufficient inventory of {failed_item}.")
+    else:
+        print(f"Order {order_id} is no longer PENDING, skipping.")
+    return committed
+
+
+def plan_fulfillment(orders, stock):
+    """
+    Decide which orders a single inventory snapshot can satisfy.
+
+    `orders` is [(order_id, ingredients)] in arrival order, where ingredients
+    is a recipe's {name: qty} dict; `stock` is {name: qty}. Orders are
+    accepted first-come-first-served until an ingredient runs short.
+
+    Returns (accepted_order_ids, {rejected_order_id: short_ingredient},
+    {ingredient: total_qty_to_deduct}).
+    """
+    remaining = dict(stock)
+    accepted, rejected, demand = [], {}, {}
+
+    for order_id, ingredients in orders:
+        short = next(
+            (name for name, qty in ingredients.items()
+             if name not in remaining or remaining[name] < qty),
+            None
+        )
+        if short is not None:
+            rejected[order_id] = short
+            continue
+
+        for name, qty in ingredients.items():
+            remaining[name] -= qty
+            demand[name] = demand.get(name, 0) + qty
+        accepted.append(order_id)
+
+    return accepted, rejected, demand
+
+
+def commit_plan(accepted, demand, item_ids):
+    """
+    Apply a fulfillment plan in one TransactWriteItems call: one conditional
+    decrement per distinct ingredient plus PENDING -> COMPLETED for each
+    accepted order. Returns False if the transaction was cancelled (stock
+    moved since the snapshot, or an order was already processed).
+    """
+    transact_items = [
+        {
+            "Update": {
+                "TableName": INVENTORY_TABLE,
+                "Key": {"item_id": item_ids[name]},
+                "UpdateExpression": "SET qty = qty - :needed",
+                "ConditionExpression": "qty >= :needed",
+                "ExpressionAttributeValues": {":needed": Decimal(qty)},
+            }
+        }
+        for name, qty in demand.items()
+    ]
+    expires = order_expiry()
+    transact_items += [
+        {
+            "Update": {
+                "TableName": ORDERS_TABLE,
+                "Key": {"order_id": order_id},
+                "UpdateExpression": "SET order_status = :done, expires_at = :expires",
+                "ConditionExpression": "order_status = :pending",
+                "ExpressionAttributeValues": {":done": "COMPLETED", ":pending": "PENDING", ":expires": expires},
+            }
+        }
+        for order_id in accepted
+    ]
+    if len(transact_items) > 100:
+        return False
+
+    try:
+        dynamodb.meta.client.transact_write_items(TransactItems=transact_items)
+    except ClientError as e:
+        if e.response["Error"]["Code"] != "TransactionCanceledException":
+            raise
+        return False
+    stats.order_finished("COMPLETED", len(accepted))
+    return True
+
+
+def fulfil_orders(orders):
+    """
+    Fulfil a group of orders against one inventory snapshot.
+
+    `orders` is [(message_id, order_id, recipe)] in arrival order. Returns
+    (ingredient names deducted, message_ids that hit an unexpected error).
+    """
+    names = {name for _, _, recipe in orders for name in recipe["ingredients"]}
+    # Strongly consistent: rejected orders are marked FAILED for good, so the
+    # snapshot must not miss stock added just before this batch
+    snapshot = fetch_ingredients(list(names), consistent_read=True)
+    stock = {name: to_int(item.get("qty", 0)) for name, item in snapshot.items()}
+
+    accepted, rejected, demand = plan_fulfillment(
+        [(order_id, recipe["ingredients"]) for _, order_id, recipe in orders], stock
+    )
+
+    if accepted and not commit_plan(accepted, demand, {n: snapshot[n]["item_id"] for n in demand}):
+        # The snapshot went stale; settle each order with its own transaction
+        deducted, failures = set(), []
+        for message_id, order_id, recipe in orders:
+            try:
+                if process_order(order_id, recipe):
+                    deducted.update(recipe["ingredients"])
+            except Exception as e:
+                print(f"Error processing order {order_id}: {e}")
+                failures.append(message_id)
+        return deducted, failures
+
+    for order_id in accepted:
+        print(f"Order {order_id} completed successfully.")
+
+    failures, failed_count = [], 0
+    for message_id, order_id, _ in orders:
+        if order_id not in rejected:
+            continue
+        try:
+            if set_order_status(order_id, "FAILED", count_stats=False):
+                failed_count += 1
+            print(f"Order {order_id} failed due to insufficient inventory of {rejected[order_id]}.")
+        except Exception as e:
+            print(f"Error processing order {order_id}: {e}")
+            failures.append(message_id)
+    if failed_count:
+        stats.order_finished("FAILED", failed_count)
+
+    return set(demand), failures
+
+
 # lambda handler
 def lambda_handler(event, context):
+    """
+    Process a batch of SQS order messages.
+
+    Each distinct recipe is fetched once per batch, then orders are planned
+    together against one inventory snapshot so the batch costs one
+    decrement per distinct ingredient rather than per order. Messages that
+    hit an unexpected error are returned in `batchItemFailures` (the event
+    source mapping must enable ReportBatchItemFailures) so only they are
+    redelivered; orders that fail for business reasons are marked FAILED
+    and consumed.
+    """
     print("Received event:", json.dumps(event))
-    
+    with tracing.stage("invocation") as summary:
+        result = handle_batch(event)
+        summary["orders"] = len(event.get("Records", []))
+        summary["failed"] = len(result["batchItemFailures"])
+    return result
+
+
+def handle_batch(event):
+    """Parse, plan and commit one SQS batch; returns the Lambda response."""
+    # (message_id, order_id, recipe_id) in arrival order
+    received, seen = [], set()
     for record in event.get("Records", []):
         try:
             body = json.loads(record["body"])
-            order_id = body.get("order_id")
-            recipe_id = body.get("recipe")
-            if not order_id or not recipe_id:
-                print("Missing order_id or recipe_id in message.")
-                continue
-
-            # Fetch recipe
-            recipe_resp = recipes_table.get_item(Key={"recipe_id": recipe_id})
-            recipe = recipe_resp.get("Item")
-            if not recipe:
-                print(f"Recipe {recipe_id} not found. Marking order failed.")
-                orders_table.update_item(
-                    Key={"order_id": order_id},
-                    UpdateExpression="SET order_status = :s",
-                    ExpressionAttributeValues={":s": "FAILED"}
-                )
-                continue
-
-            # Check inventory
-            success = True
-            for item_name, qty_needed in recipe["ingredients"].items():
-                inv_items = [i for i in inventory_table.scan()['Items'] if i['name'] == item_name]
-                if not inv_items:
-                    success = False
-                    print(f"Inventory item {item_name} not found.")
-                    break
-
-                inv_item = inv_items[0]
-                current_qty = to_int(inv_item.get("qty", 0))
-                if current_qty < qty_needed:
-                    success = False
-                    print(f"Not enough {item_name}. Needed {qty_needed}, available {current_qty}")
-                    break
-
-            # Deduct inventory if available
-            if success:
-                for item_name, qty_needed in recipe["ingredients"].items():
-                    inv_items = [i for i in inventory_table.scan()['Items'] if i['name'] == item_name]
-                    inv_item = inv_items[0]
-                    new_qty = to_int(inv_item.get("qty", 0)) - qty_needed
-
-                    inventory_table.update_item(
-                        Key={"item_id": inv_item['item_id']},
-                        UpdateExpression="SET qty = :q",
-                        ExpressionAttributeValues={":q": Decimal(new_qty)}
-                    )
-
-                    # Low stock SNS alert
-                    if new_qty < 5:
-                        sns.publish(
-                            TopicArn=SNS_TOPIC_ARN,
-                            Message=f"Low stock alert: {item_name} has qty {new_qty}"
-                        )
-
-                orders_table.update_item(
-                    Key={"order_id": order_id},
-                    UpdateExpression="SET order_status = :s",
-                    ExpressionAttributeValues={":s": "COMPLETED"}
-                )
-                print(f"Order {order_id} completed successfully.")
-            else:
-                orders_table.update_item(
-                    Key={"order_id": order_id},
-                    UpdateExpression="SET order_status = :s",
-                    ExpressionAttributeValues={":s": "FAILED"}
-                )
-                print(f"Order {order_id} failed due to insufficient inventory.")
+        except (KeyError, ValueError):
+            print(f"Malformed message {record.get('messageId')}, dropping.")
+            continue
+
+        order_id = body.get("order_id")
+        recipe_id = body.get("recipe")
+        if not order_id or not recipe_id:
+            print("Missing order_id or recipe_id in message.")
+            continue
+        if order_id in seen:
+            print(f"Duplicate message for order {order_id}, dropping.")
+            continue
+        seen.add(order_id)
+        received.append((record["messageId"], order_id, recipe_id))
 
+    try:
+        with tracing.stage("fetch_recipes"):
+            recipes = fetch_recipes({recipe_id for _, _, recipe_id in received})
+    except Exception as e:
+        print(f"Error fetching recipes: {e}")
+        return {"batchItemFailures": [{"itemIdentifier": m} for m, _, _ in received]}
+
+    orders, failures = [], []
+    for message_id, order_id, recipe_id in received:
+        if recipe_id in recipes:
+            orders.append((message_id, order_id, recipes[recipe_id]))
+            continue
+        try:
+            process_order(order_id, None)
+        except Exception as e:
+            print(f"Error processing order {order_id}: {e}")
+            failures.append(message_id)
+
+    deducted = set()
+    for start in range(0, len(orders), PLAN_MAX_ORDERS):
+        chunk = orders[start:start + PLAN_MAX_ORDERS]
+        try:
+            with tracing.stage("fulfil_orders", orders=len(chunk)):
+                names, failed = fulfil_orders(chunk)
         except Exception as e:
-            print(f"Error processing record: {e}")
-            if "order_id" in locals():
-                orders_table.update_item(
-                    Key={"order_id": order_id},
-                    UpdateExpression="SET order_status = :s",
-                    ExpressionAttributeValues={":s": "FAILED"}
-                )
-
-    return {"statusCode": 200, "body": json.dumps("Processed all messages.")}
+            print(f"Error fulfilling orders: {e}")
+            names, failed = set(), [m for m, _, _ in chunk]
+        deducted |= names
+        failures += failed
+
+    # Low stock SNS alerts, once per batch
+    if deducted:
+        try:
+            with tracing.stage("alert_low_stock", ingredients=len(deducted)):
+                alert_low_stock(deducted)
+        except Exception as e:
+            print(f"Error sending low stock alerts: {e}")
+
+    print(f"Processed {len(received)} orders, {len(failures)} failed.")
+    return {"batchItemFailures": [{"itemIdentifier": m} for m in failures]}